@@ -0,0 +1,200 @@
+"""Admission control against a simulated queue during an agent slowdown.
+
+Simulates an hour of traffic second by second. Many regular users and one
+heavy user send updates to a queue, and processors drain it at a rate set
+by the agent turn time. In the middle of the hour, turns slow down six-fold.
+The same arrivals run without admission control and with it. The
+controller sees the queue only through ``LoadMonitor``, backed by fake SQS
+and CloudWatch clients that report the simulated depth, the turn time and
+the queue age a minute late. Reports queue waits, decisions per kind of
+user, and the cost of a decision. With ``--check``, exits non-zero when a
+decision costs more than the budget.
+
+Usage:
+    python benchmarks/admission.py [--users N] [--heavy-rate R] [--seed N]
+        [--check] [--json]
+"""
+
+import argparse
+import json
+import os
+import random
+import sys
+import time
+from collections import deque
+from pathlib import Path
+from typing import Any, Deque, Dict, List, Optional
+
+BENCHMARKS = Path(__file__).resolve().parent
+ROOT = BENCHMARKS.parent
+sys.path.insert(0, str(ROOT / "src"))
+sys.path.insert(0, str(ROOT))
+
+from tests.support.fakes import FakeCloudWatch  # noqa: E402
+from tests.support.workload import LAMBDA_ENV  # noqa: E402
+
+DURATION = 3600
+SLOWDOWN = (900, 2100)
+SLOTS = 10
+HEAVY_USER = 1
+# Microseconds a decision may take, a small fraction of an SQS call
+BUDGET_US = 50.0
+
+
+class SimulatedQueue:
+    """FIFO queue drained by processors whose speed follows the turn time."""
+
+    def __init__(self, turn_seconds: float, slowdown: float):
+        self.normal_turn = turn_seconds
+        self.slowdown = slowdown
+        self.now = 0.0
+        self.waiting: Deque[float] = deque()
+        self.waits: List[float] = []
+        self._capacity = 0.0
+        # Mean wait of the messages processed in each past minute
+        self._minutes: List[float] = []
+        self._minute_waits: List[float] = []
+
+    def turn_seconds(self, at: float) -> float:
+        return self.normal_turn * (self.slowdown if SLOWDOWN[0] <= at < SLOWDOWN[1] else 1)
+
+    def put(self) -> None:
+        self.waiting.append(self.now)
+
+    def drain(self) -> None:
+        """Process what the processors can finish in one second."""
+        self._capacity += SLOTS / self.turn_seconds(self.now)
+        while self._capacity >= 1 and self.waiting:
+            self._capacity -= 1
+            wait = self.now - self.waiting.popleft()
+            self.waits.append(wait)
+            self._minute_waits.append(wait)
+        if not self.waiting:
+            self._capacity = min(self._capacity, 1.0)
+        if int(self.now) % 60 == 59:
+            waits = self._minute_waits
+            self._minutes.append(sum(waits) / len(waits) if waits else 0.0)
+            self._minute_waits = []
+
+    def get_queue_attributes(self, QueueUrl: str, AttributeNames: List[str]) -> Dict[str, Any]:
+        return {"Attributes": {"ApproximateNumberOfMessages": str(len(self.waiting))}}
+
+    def latest_metric(self, name: str) -> Optional[float]:
+        """Metrics as CloudWatch reports them, one minute behind."""
+        if name == "BedrockTotal":
+            return self.turn_seconds(max(0.0, self.now - 60)) * 1000
+        if name == "QueueAge" and len(self._minutes) >= 2:
+            return self._minutes[-2] * 1000
+        return None
+
+
+def percentile(values: List[float], q: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return round(ordered[min(len(ordered) - 1, int(q * (len(ordered) - 1)))], 1)
+
+
+def simulate(args: argparse.Namespace, admission: bool) -> Dict[str, Any]:
+    from sibyl_telegram_interface.handlers.admission import ADMIT, DEGRADE, AdmissionController, LoadMonitor
+
+    rng = random.Random(args.seed)
+    queue = SimulatedQueue(args.turn_seconds, args.slowdown)
+    clock = lambda: queue.now  # noqa: E731
+    # Refreshes finish at once on the simulated clock
+    monitor = LoadMonitor(
+        queue, "simulated", FakeCloudWatch(queue.latest_metric), clock=clock, spawn=lambda refresh: refresh()
+    )
+    controller = AdmissionController(monitor, enabled=admission, slots=SLOTS, clock=clock)
+
+    decisions = {kind: {"admit": 0, "degrade": 0, "shed": 0} for kind in ("regular", "heavy")}
+    enqueued = {"regular": 0, "heavy": 0}
+    notices = 0
+    for second in range(DURATION):
+        queue.now = float(second)
+        senders = [user for user in range(2, args.users + 2) if rng.random() < args.user_rate]
+        senders += [HEAVY_USER] * (int(args.heavy_rate) + (rng.random() < args.heavy_rate % 1))
+        rng.shuffle(senders)
+        for user in senders:
+            kind = "heavy" if user == HEAVY_USER else "regular"
+            decision, notice = controller.decide(user, user)
+            decisions[kind][decision] += 1
+            notices += notice is not None
+            if decision in (ADMIT, DEGRADE):
+                queue.put()
+                enqueued[kind] += 1
+        queue.drain()
+
+    return {
+        "wait_p50_s": percentile(queue.waits, 0.50),
+        "wait_p95_s": percentile(queue.waits, 0.95),
+        "wait_max_s": percentile(queue.waits, 1.0),
+        "backlog_at_end": len(queue.waiting),
+        "heavy_share_of_queue": round(enqueued["heavy"] / max(1, sum(enqueued.values())), 3),
+        "decisions": decisions,
+        "notices": notices,
+        "monitor_refreshes": monitor.refreshes,
+    }
+
+
+def decision_cost_us(runs: int) -> float:
+    """Get the mean microseconds per decision with a warm estimate."""
+    from sibyl_telegram_interface.handlers.admission import AdmissionController, LoadMonitor
+
+    queue = SimulatedQueue(5.0, 1.0)
+    monitor = LoadMonitor(
+        queue, "simulated", FakeCloudWatch(queue.latest_metric), refresh_seconds=3600, spawn=lambda refresh: refresh()
+    )
+    controller = AdmissionController(monitor, enabled=True, user_rate=1e9, user_burst=1e9)
+    controller.decide(0, 0)
+    started = time.perf_counter()
+    for index in range(runs):
+        controller.decide(index % 1000, index % 1000)
+    return (time.perf_counter() - started) / runs * 1e6
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--users", type=int, default=180, help="regular users")
+    parser.add_argument("--user-rate", type=float, default=1 / 120, help="updates per second per regular user")
+    parser.add_argument("--heavy-rate", type=float, default=1.0, help="updates per second of the heavy user")
+    parser.add_argument("--turn-seconds", type=float, default=5.0, help="agent turn time outside the slowdown")
+    parser.add_argument("--slowdown", type=float, default=6.0, help="turn time factor during the slowdown")
+    parser.add_argument("--seed", type=int, default=1, help="random seed")
+    parser.add_argument("--check", action="store_true", help="fail when a decision is over budget")
+    parser.add_argument("--json", action="store_true", help="print results as JSON")
+    args = parser.parse_args()
+
+    for key, value in LAMBDA_ENV.items():
+        os.environ.setdefault(key, value)
+    os.environ.setdefault("POWERTOOLS_LOG_LEVEL", "ERROR")
+
+    report = {
+        "without_admission": simulate(args, admission=False),
+        "with_admission": simulate(args, admission=True),
+        "decision_us": round(decision_cost_us(100000), 2),
+        "budget_us": BUDGET_US,
+    }
+
+    if args.json:
+        print(json.dumps(report, indent=2))
+    else:
+        for name in ("without_admission", "with_admission"):
+            result = report[name]
+            print(
+                f"{name}: wait p50 {result['wait_p50_s']} s, p95 {result['wait_p95_s']} s, "
+                f"max {result['wait_max_s']} s, backlog at end {result['backlog_at_end']}, "
+                f"heavy user share {result['heavy_share_of_queue']}"
+            )
+            for kind, counts in result["decisions"].items():
+                print(f"    {kind:8} {counts}")
+        print(f"decision: {report['decision_us']} us (budget {BUDGET_US} us)")
+
+    if args.check and report["decision_us"] > BUDGET_US:
+        print("Admission decision over budget", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,95 @@
+"""Webhook source validations per second.
+
+Checks a mix of Telegram and foreign IPv4 addresses against the Telegram
+ranges in three ways: parsing every CIDR on every request, as
+``TelegramBot.validate_telegram_ip`` did before ``IPAllowlist``, a bisect
+lookup in a precompiled ``IPAllowlist``, and comparing the
+``X-Telegram-Bot-Api-Secret-Token`` header instead. ``--ranges`` pads the
+list with extra networks to show how each check scales with its length.
+
+Usage:
+    python benchmarks/allowlist.py [--validations N] [--ranges N] [--json]
+"""
+
+import argparse
+import ipaddress
+import json
+import sys
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, List
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT / "src"))
+
+from sibyl_telegram_interface.config import settings  # noqa: E402
+from sibyl_telegram_interface.telegram.allowlist import IPAllowlist, verify_secret_token  # noqa: E402
+
+SECRET = "s3cr3t-webhook-token_0123456789"
+
+
+def parse_per_request(ranges: List[str]) -> Callable[[str], bool]:
+    """Get the check ``TelegramBot.validate_telegram_ip`` made before the allowlist."""
+    def validate(ip_address: str) -> bool:
+        try:
+            request_ip = ipaddress.ip_address(ip_address)
+            return any(request_ip in ipaddress.ip_network(range_) for range_ in ranges)
+        except ValueError:
+            return False
+    return validate
+
+
+def addresses(count: int) -> List[str]:
+    """Get addresses of which every other one is inside 149.154.160.0/20."""
+    return [
+        f"149.154.{160 + index % 16}.{index % 250 + 1}" if index % 2 else f"203.0.{index % 256}.{index % 250 + 1}"
+        for index in range(count)
+    ]
+
+
+def rate(check: Callable[[str], bool], inputs: List[str]) -> Dict[str, Any]:
+    started = time.perf_counter()
+    accepted = sum(1 for value in inputs if check(value))
+    elapsed = time.perf_counter() - started
+    return {
+        "validations_per_s": round(len(inputs) / elapsed),
+        "us_per_validation": round(elapsed / len(inputs) * 1e6, 3),
+        "accepted": accepted,
+    }
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--validations", type=int, default=100000, help="checks per variant")
+    parser.add_argument("--ranges", type=int, default=0, help="extra networks added to the list")
+    parser.add_argument("--json", action="store_true", help="print results as JSON")
+    args = parser.parse_args()
+
+    ranges = settings.TELEGRAM_IP_RANGES.split(",")
+    ranges += [f"10.{index // 256}.{index % 256}.0/24" for index in range(args.ranges)]
+    inputs = addresses(args.validations)
+    allowlist = IPAllowlist(ranges)
+    tokens = [SECRET if index % 2 else "wrong-token" for index in range(args.validations)]
+
+    report = {
+        "ranges": len(ranges),
+        "parse per request": rate(parse_per_request(ranges), inputs),
+        "IPAllowlist": rate(allowlist.__contains__, inputs),
+        "secret token": rate(lambda token: verify_secret_token(token, SECRET), tokens),
+    }
+
+    if args.json:
+        print(json.dumps(report, indent=2))
+    else:
+        print(f"{report['ranges']} networks")
+        for name in ("parse per request", "IPAllowlist", "secret token"):
+            result = report[name]
+            print(
+                f"{name:18} {result['validations_per_s']:>10}/s  "
+                f"{result['us_per_validation']:>8} us/validation  accepted {result['accepted']}"
+            )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
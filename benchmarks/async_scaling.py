@@ -0,0 +1,148 @@
+"""Concurrency scaling of the thread-pool and asyncio processors.
+
+Runs the same batch through ``message_processor.process_batch`` and
+``process_batch_async`` for a range of chat counts and concurrency limits.
+Telegram is an HTTP stub on localhost and the Bedrock agent is a fake that
+streams its answer with a fixed delay, so the wall time of a batch shows how
+many replies each variant keeps in flight. Reports wall time, replies per
+second and the peak number of threads in the process, the stub's included.
+
+Usage:
+    python benchmarks/async_scaling.py [--chats 10,50,100]
+        [--concurrency 10,50,100] [--first-chunk S] [--chunks N]
+        [--chunk-interval S] [--telegram-latency S] [--json]
+"""
+
+import argparse
+import asyncio
+import contextlib
+import io
+import json
+import os
+import sys
+import threading
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, List
+
+BENCHMARKS = Path(__file__).resolve().parent
+ROOT = BENCHMARKS.parent
+sys.path.insert(0, str(ROOT / "src"))
+sys.path.insert(0, str(ROOT))
+
+from tests.support.fakes import FakeAgentRuntime, FakeLambdaContext, TelegramStub, install_fake_sibyl_core_sdk  # noqa: E402
+from tests.support.workload import BOT_TOKEN, LAMBDA_ENV, batch  # noqa: E402
+
+LAMBDA_TIMEOUT = 900
+
+
+class ThreadSampler:
+    """Samples the number of live threads in the background and keeps the peak."""
+
+    def __init__(self, interval: float = 0.005):
+        self.interval = interval
+        self.peak = threading.active_count()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._sample, daemon=True)
+
+    def __enter__(self) -> "ThreadSampler":
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self._stop.set()
+        self._thread.join()
+
+    def _sample(self) -> None:
+        while not self._stop.wait(self.interval):
+            self.peak = max(self.peak, threading.active_count())
+
+
+def measure(run: Callable[[], List[str]], chats: int) -> Dict[str, Any]:
+    from sibyl_telegram_interface.utils.deadline import Deadline, deadline_scope
+    deadline = Deadline.from_context(FakeLambdaContext(LAMBDA_TIMEOUT))
+    # Metric flushes print EMF documents
+    with ThreadSampler() as sampler, deadline_scope(deadline), contextlib.redirect_stdout(io.StringIO()):
+        started = time.perf_counter()
+        failed = run()
+        elapsed = time.perf_counter() - started
+    return {
+        "wall_ms": round(elapsed * 1000, 1),
+        "replies_per_s": round((chats - len(failed)) / elapsed, 1),
+        "peak_threads": sampler.peak,
+        "failed": len(failed),
+    }
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--chats", default="10,50,100", help="comma-separated chats per batch")
+    parser.add_argument("--concurrency", default="10,50,100", help="comma-separated concurrency limits")
+    parser.add_argument("--first-chunk", type=float, default=0.5, help="agent seconds to first chunk")
+    parser.add_argument("--chunks", type=int, default=5, help="agent chunks per answer")
+    parser.add_argument("--chunk-interval", type=float, default=0.05, help="agent seconds between chunks")
+    parser.add_argument("--telegram-latency", type=float, default=0.02, help="Bot API stub seconds per call")
+    parser.add_argument("--json", action="store_true", help="print results as JSON")
+    args = parser.parse_args()
+
+    for key, value in LAMBDA_ENV.items():
+        os.environ.setdefault(key, value)
+    os.environ.setdefault("POWERTOOLS_LOG_LEVEL", "WARNING")
+    os.environ.setdefault("POWERTOOLS_METRICS_NAMESPACE", "Benchmark")
+    # Lift the Bot API pacing, which would otherwise bound both variants alike
+    os.environ.setdefault("TELEGRAM_GLOBAL_RATE", "100000")
+    os.environ.setdefault("TELEGRAM_GLOBAL_BURST", "100000")
+    os.environ.setdefault("TELEGRAM_POOL_SIZE", "100")
+    install_fake_sibyl_core_sdk()
+
+    telegram = TelegramStub(latency=args.telegram_latency).start()
+    from sibyl_telegram_interface.config import settings
+    settings.TELEGRAM_API_BASE = telegram.url
+    from sibyl_telegram_interface.handlers import message_processor
+    from sibyl_telegram_interface.telegram.bot import get_bot
+    message_processor.bedrock.client = FakeAgentRuntime(
+        first_chunk_latency=args.first_chunk,
+        chunk_interval=args.chunk_interval,
+        chunks=args.chunks,
+    )
+    bot = get_bot(BOT_TOKEN)
+
+    report: List[Dict[str, Any]] = []
+    try:
+        # Warm up the connection pool and the lazily built clients
+        measure(lambda: message_processor.process_batch(bot, batch(2)), 2)
+        for chats in (int(value) for value in args.chats.split(",")):
+            for concurrency in (int(value) for value in args.concurrency.split(",")):
+                report.append({
+                    "chats": chats,
+                    "concurrency": concurrency,
+                    "threads": measure(
+                        lambda: message_processor.process_batch(bot, batch(chats), concurrency), chats
+                    ),
+                    "asyncio": measure(
+                        lambda: asyncio.run(
+                            message_processor.process_batch_async(bot, batch(chats), concurrency)
+                        ),
+                        chats,
+                    ),
+                })
+    finally:
+        telegram.stop()
+
+    if args.json:
+        print(json.dumps({"async_io_threads": settings.ASYNC_IO_THREADS, "runs": report}, indent=2))
+    else:
+        for entry in report:
+            line = f"chats={entry['chats']:<4} concurrency={entry['concurrency']:<4}"
+            for variant in ("threads", "asyncio"):
+                result = entry[variant]
+                line += (
+                    f" | {variant}: {result['wall_ms']:>8} ms {result['replies_per_s']:>7}/s "
+                    f"peak {result['peak_threads']:>3} threads"
+                )
+            print(line)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,117 @@
+"""Throughput per invocation of the processor by batch size and concurrency.
+
+Processes ``--records`` SQS records, one message per chat, through
+``message_processor.process_batch`` the way Lambda would deliver them: one
+record per invocation, as with ``BatchSize: 1``, and ``--batch-size`` records
+per invocation, processed one after another and concurrently. Telegram is
+the HTTP stub and the Bedrock agent streams a fake answer. Reports
+invocations, time per invocation, records per second of invocation time
+and the total invocation time, which Lambda bills.
+
+Usage:
+    python benchmarks/batching.py [--records N] [--batch-size N]
+        [--first-chunk S] [--chunks N] [--json]
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import sys
+import time
+from pathlib import Path
+from typing import Any, Dict
+
+BENCHMARKS = Path(__file__).resolve().parent
+ROOT = BENCHMARKS.parent
+sys.path.insert(0, str(ROOT / "src"))
+sys.path.insert(0, str(ROOT))
+
+from async_scaling import LAMBDA_TIMEOUT  # noqa: E402
+from loadtest import summarize  # noqa: E402
+from tests.support.fakes import FakeAgentRuntime, FakeLambdaContext, TelegramStub, install_fake_sibyl_core_sdk  # noqa: E402
+from tests.support.workload import BOT_TOKEN, LAMBDA_ENV, batch  # noqa: E402
+
+
+def run_scenario(bot: Any, records: int, batch_size: int, concurrency: int) -> Dict[str, Any]:
+    from sibyl_telegram_interface.handlers import message_processor
+    from sibyl_telegram_interface.utils.deadline import Deadline, deadline_scope
+
+    durations = []
+    failed = 0
+    for start in range(0, records, batch_size):
+        deadline = Deadline.from_context(FakeLambdaContext(LAMBDA_TIMEOUT))
+        started = time.perf_counter()
+        with deadline_scope(deadline):
+            failed += len(message_processor.process_batch(bot, batch(min(batch_size, records - start)), concurrency))
+        durations.append(time.perf_counter() - started)
+    total = sum(durations)
+    return {
+        "invocations": len(durations),
+        "invocation": summarize(durations),
+        "records_per_invocation_s": round((records - failed) / total, 2),
+        "invocation_s_total": round(total, 2),
+        "failed": failed,
+    }
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--records", type=int, default=50, help="SQS records to process")
+    parser.add_argument("--batch-size", type=int, default=10, help="records per batched invocation")
+    parser.add_argument("--first-chunk", type=float, default=0.5, help="agent seconds to first chunk")
+    parser.add_argument("--chunks", type=int, default=5, help="agent chunks per answer")
+    parser.add_argument("--chunk-interval", type=float, default=0.05, help="agent seconds between chunks")
+    parser.add_argument("--telegram-latency", type=float, default=0.02, help="Bot API stub seconds per call")
+    parser.add_argument("--json", action="store_true", help="print results as JSON")
+    args = parser.parse_args()
+
+    for key, value in LAMBDA_ENV.items():
+        os.environ.setdefault(key, value)
+    os.environ.setdefault("POWERTOOLS_LOG_LEVEL", "WARNING")
+    os.environ.setdefault("POWERTOOLS_METRICS_NAMESPACE", "Benchmark")
+    os.environ.setdefault("RESPONSE_CACHE_TTL", "0")
+    install_fake_sibyl_core_sdk()
+
+    telegram = TelegramStub(latency=args.telegram_latency).start()
+    from sibyl_telegram_interface.config import settings
+    settings.TELEGRAM_API_BASE = telegram.url
+    from sibyl_telegram_interface.handlers import message_processor
+    from sibyl_telegram_interface.telegram.bot import get_bot
+    message_processor.bedrock.client = FakeAgentRuntime(
+        first_chunk_latency=args.first_chunk,
+        chunk_interval=args.chunk_interval,
+        chunks=args.chunks,
+    )
+    bot = get_bot(BOT_TOKEN)
+
+    scenarios = {
+        "batch 1": (1, 1),
+        f"batch {args.batch_size} sequential": (args.batch_size, 1),
+        f"batch {args.batch_size} concurrent": (args.batch_size, settings.PROCESSOR_MAX_CONCURRENCY),
+    }
+    report: Dict[str, Any] = {}
+    # Metric flushes print EMF documents
+    with contextlib.redirect_stdout(io.StringIO()):
+        # Warm up the connection pool and the lazily built clients
+        run_scenario(bot, 2, 2, 2)
+        for name, (batch_size, concurrency) in scenarios.items():
+            report[name] = run_scenario(bot, args.records, batch_size, concurrency)
+    telegram.stop()
+
+    if args.json:
+        print(json.dumps(report, indent=2))
+    else:
+        for name, result in report.items():
+            print(
+                f"{name:24} invocations {result['invocations']:>4}  "
+                f"per invocation p50 {result['invocation']['p50_ms']:>8} ms  "
+                f"{result['records_per_invocation_s']:>6} records/s  "
+                f"total {result['invocation_s_total']:>6} s  failed {result['failed']}"
+            )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
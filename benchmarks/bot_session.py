@@ -0,0 +1,95 @@
+"""Per-call latency of Bot API calls with and without the pooled session.
+
+Sends ``--calls`` sendMessage calls to the Telegram stub, once with a
+module-level ``requests.post`` per call, which opens a new connection every
+time, and once through ``TelegramBot``, which reuses keep-alive connections
+from the process-wide session. Each call goes to its own chat so the send
+scheduler does not pace them. The stub speaks plain HTTP on localhost, so
+the TLS handshake and network round trips that a new connection to
+api.telegram.org costs come on top of the difference shown here.
+
+Usage:
+    python benchmarks/bot_session.py [--calls N] [--telegram-latency S] [--json]
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import sys
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, List
+
+import requests
+
+BENCHMARKS = Path(__file__).resolve().parent
+ROOT = BENCHMARKS.parent
+sys.path.insert(0, str(ROOT / "src"))
+sys.path.insert(0, str(ROOT))
+
+from loadtest import summarize  # noqa: E402
+from tests.support.fakes import TelegramStub  # noqa: E402
+from tests.support.workload import BOT_TOKEN, LAMBDA_ENV  # noqa: E402
+
+
+def measure(calls: int, send: Callable[[int], Dict[str, Any]]) -> Dict[str, Any]:
+    latencies: List[float] = []
+    failures = 0
+    for index in range(calls):
+        started = time.perf_counter()
+        response = send(300000 + index)
+        latencies.append(time.perf_counter() - started)
+        if not response.get("ok"):
+            failures += 1
+    return dict(summarize(latencies), failures=failures)
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--calls", type=int, default=500, help="sendMessage calls per variant")
+    parser.add_argument("--telegram-latency", type=float, default=0.0, help="Bot API stub seconds per call")
+    parser.add_argument("--json", action="store_true", help="print results as JSON")
+    args = parser.parse_args()
+
+    for key, value in LAMBDA_ENV.items():
+        os.environ.setdefault(key, value)
+    os.environ.setdefault("POWERTOOLS_LOG_LEVEL", "ERROR")
+    os.environ.setdefault("POWERTOOLS_METRICS_NAMESPACE", "Benchmark")
+    # Lift the global pacing, which would otherwise bound both variants
+    os.environ.setdefault("TELEGRAM_GLOBAL_RATE", "100000")
+    os.environ.setdefault("TELEGRAM_GLOBAL_BURST", "100000")
+
+    telegram = TelegramStub(latency=args.telegram_latency).start()
+    from sibyl_telegram_interface.config import settings
+    settings.TELEGRAM_API_BASE = telegram.url
+    from sibyl_telegram_interface.telegram.bot import get_bot
+    url = f"{telegram.url}/bot{BOT_TOKEN}/sendMessage"
+
+    def post(chat_id: int) -> Dict[str, Any]:
+        return requests.post(url, json={"chat_id": chat_id, "text": "Hello"}, timeout=10).json()
+
+    def pooled(chat_id: int) -> Dict[str, Any]:
+        return get_bot(BOT_TOKEN).send_message(chat_id, "Hello", parse_mode=None)
+
+    report: Dict[str, Any] = {}
+    # Metric flushes print EMF documents
+    with contextlib.redirect_stdout(io.StringIO()):
+        report["requests.post"] = measure(args.calls, post)
+        report["pooled session"] = measure(args.calls, pooled)
+    telegram.stop()
+
+    if args.json:
+        print(json.dumps(report, indent=2))
+    else:
+        for name, result in report.items():
+            print(
+                f"{name:15} p50 {result['p50_ms']:>7} ms  p95 {result['p95_ms']:>7} ms  "
+                f"p99 {result['p99_ms']:>7} ms  mean {result['mean_ms']:>7} ms  failures {result['failures']}"
+            )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
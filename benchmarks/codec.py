@@ -0,0 +1,148 @@
+"""Parse and serialize time per update, and queue payload size.
+
+Runs ``--updates`` webhook bodies of realistic private-chat messages through
+the webhook's decode and enqueue serialization and the processor's decode,
+in three ways: the pydantic ``TelegramMessage`` holding the raw message
+that the pipeline used before ``TelegramUpdate`` (skipped when pydantic is
+not installed), ``TelegramUpdate`` with the stdlib ``json`` fallback, and
+``TelegramUpdate`` with orjson (skipped when orjson is not installed).
+Reports microseconds per update for each side and bytes per payload.
+
+Usage:
+    python benchmarks/codec.py [--updates N] [--json]
+"""
+
+import argparse
+import json
+import sys
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+BENCHMARKS = Path(__file__).resolve().parent
+ROOT = BENCHMARKS.parent
+sys.path.insert(0, str(ROOT / "src"))
+
+from sibyl_telegram_interface.telegram.models import TelegramUpdate  # noqa: E402
+from sibyl_telegram_interface.utils import json_codec  # noqa: E402
+
+
+def webhook_body(index: int) -> str:
+    """Build the body Telegram posts for a text message in a private chat."""
+    user = {
+        "id": 100000 + index,
+        "is_bot": False,
+        "first_name": "Ada",
+        "last_name": "Lovelace",
+        "username": f"ada{index}",
+        "language_code": "en",
+    }
+    return json.dumps({
+        "update_id": 500000000 + index,
+        "message": {
+            "message_id": index + 1,
+            "from": user,
+            "chat": {key: user[key] for key in ("id", "first_name", "last_name", "username")} | {"type": "private"},
+            "date": 1700000000 + index,
+            "text": f"Can you summarize what we discussed about the quarterly report, item {index}?",
+        },
+    })
+
+
+def pydantic_pipeline() -> Optional[Tuple[Callable[[str], str], Callable[[str], Any]]]:
+    """Get the webhook and processor steps of the pydantic model, if pydantic is installed."""
+    try:
+        from pydantic import BaseModel, Field
+    except ImportError:
+        return None
+
+    class TelegramMessage(BaseModel):
+        message: Dict[str, Any] = Field(..., description="Telegram message object")
+        user_id: int = Field(..., description="Telegram user ID")
+        chat_id: int = Field(..., description="Telegram chat ID")
+
+    dump = getattr(TelegramMessage, "model_dump", None) or TelegramMessage.dict
+
+    def webhook(body: str) -> str:
+        update = json.loads(body)
+        raw_message = update.get("message", {})
+        message = TelegramMessage(
+            message=raw_message,
+            user_id=raw_message.get("from", {}).get("id"),
+            chat_id=raw_message.get("chat", {}).get("id"),
+        )
+        return json.dumps({"update_id": update.get("update_id"), "message": dump(message)})
+
+    def processor(payload: str) -> Any:
+        data = json.loads(payload)
+        return data["message"]["chat_id"], data["message"]["message"].get("text", "")
+
+    return webhook, processor
+
+
+def update_pipeline() -> Tuple[Callable[[str], str], Callable[[str], Any]]:
+    """Get the webhook and processor steps of ``TelegramUpdate`` with the current codec."""
+    def webhook(body: str) -> str:
+        return json_codec.dumps(TelegramUpdate.from_update(json_codec.loads(body)).to_wire())
+
+    def processor(payload: str) -> Any:
+        update = TelegramUpdate.from_wire(json_codec.loads(payload))
+        return update.chat_id, update.text
+
+    return webhook, processor
+
+
+def measure(steps: Tuple[Callable[[str], str], Callable[[str], Any]], bodies: List[str]) -> Dict[str, Any]:
+    webhook, processor = steps
+    started = time.perf_counter()
+    payloads = [webhook(body) for body in bodies]
+    webhook_s = time.perf_counter() - started
+    started = time.perf_counter()
+    for payload in payloads:
+        processor(payload)
+    processor_s = time.perf_counter() - started
+    return {
+        "webhook_us": round(webhook_s / len(bodies) * 1e6, 2),
+        "processor_us": round(processor_s / len(bodies) * 1e6, 2),
+        "total_us": round((webhook_s + processor_s) / len(bodies) * 1e6, 2),
+        "bytes_per_payload": round(sum(len(payload.encode()) for payload in payloads) / len(payloads), 1),
+    }
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--updates", type=int, default=50000, help="updates per variant")
+    parser.add_argument("--json", action="store_true", help="print results as JSON")
+    args = parser.parse_args()
+
+    bodies = [webhook_body(index) for index in range(args.updates)]
+    report: Dict[str, Any] = {"body_bytes": round(sum(len(body) for body in bodies) / len(bodies), 1)}
+    pydantic_steps = pydantic_pipeline()
+    if pydantic_steps is not None:
+        report["pydantic message"] = measure(pydantic_steps, bodies)
+
+    orjson = json_codec.orjson
+    json_codec.orjson = None
+    try:
+        report["TelegramUpdate, json"] = measure(update_pipeline(), bodies)
+    finally:
+        json_codec.orjson = orjson
+    if orjson is not None:
+        report["TelegramUpdate, orjson"] = measure(update_pipeline(), bodies)
+
+    if args.json:
+        print(json.dumps(report, indent=2))
+    else:
+        print(f"webhook body {report['body_bytes']} bytes")
+        for name, result in report.items():
+            if name == "body_bytes":
+                continue
+            print(
+                f"{name:24} webhook {result['webhook_us']:>7} us  processor {result['processor_us']:>7} us  "
+                f"total {result['total_us']:>7} us  {result['bytes_per_payload']:>6} bytes/payload"
+            )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
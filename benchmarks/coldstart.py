@@ -0,0 +1,112 @@
+"""Cold-start profile for the Lambda entry points.
+
+Imports each handler module in a fresh interpreter with ``-X importtime`` and
+reports the total init time and the slowest top-level imports. With
+``--check``, exits non-zero when a handler exceeds its budget in
+``coldstart_budget.json``.
+
+Usage:
+    python benchmarks/coldstart.py [--check] [--top N] [--runs N] [--json]
+"""
+
+import argparse
+import json
+import os
+import re
+import statistics
+import subprocess
+import sys
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+ROOT = Path(__file__).resolve().parent.parent
+BUDGET_FILE = Path(__file__).resolve().parent / "coldstart_budget.json"
+sys.path.insert(0, str(ROOT))
+
+from tests.support.workload import LAMBDA_ENV  # noqa: E402
+
+HANDLERS = {
+    "webhook": "sibyl_telegram_interface.handlers.lambda_handler",
+    "processor": "sibyl_telegram_interface.handlers.message_processor",
+    "setup": "sibyl_telegram_interface.handlers.webhook_setup",
+}
+
+IMPORTTIME_LINE = re.compile(r"import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)")
+
+INIT_SNIPPET = (
+    "import time, importlib, sys; "
+    "start = time.perf_counter(); "
+    "importlib.import_module(sys.argv[1]); "
+    "print((time.perf_counter() - start) * 1000)"
+)
+
+
+def profile_handler(module: str) -> Tuple[float, List[Tuple[str, float]]]:
+    """Import a handler in a fresh interpreter.
+
+    Returns:
+        Init time in milliseconds and (module, cumulative ms) for each
+        top-level import
+    """
+    env = dict(os.environ, **LAMBDA_ENV)
+    env["PYTHONPATH"] = os.pathsep.join(
+        filter(None, [str(ROOT / "src"), env.get("PYTHONPATH")])
+    )
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", INIT_SNIPPET, module],
+        capture_output=True,
+        text=True,
+        env=env,
+        check=True,
+    )
+    init_ms = float(result.stdout.strip().splitlines()[-1])
+
+    top_level = []
+    for line in result.stderr.splitlines():
+        match = IMPORTTIME_LINE.match(line)
+        # Nesting depth is encoded as two spaces per level after the "|"
+        if match and len(match.group(3)) <= 1:
+            top_level.append((match.group(4), int(match.group(2)) / 1000))
+    return init_ms, top_level
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--check", action="store_true", help="fail when over budget")
+    parser.add_argument("--top", type=int, default=8, help="slowest imports to show")
+    parser.add_argument("--runs", type=int, default=3, help="fresh interpreters per handler")
+    parser.add_argument("--json", action="store_true", help="print results as JSON")
+    args = parser.parse_args()
+
+    budget: Dict[str, float] = json.loads(BUDGET_FILE.read_text())
+    report = {}
+    over_budget = []
+    for name, module in HANDLERS.items():
+        runs = [profile_handler(module) for _ in range(args.runs)]
+        init_ms = statistics.median(run[0] for run in runs)
+        imports = sorted(runs[-1][1], key=lambda item: item[1], reverse=True)[:args.top]
+        report[name] = {
+            "module": module,
+            "init_ms": round(init_ms, 1),
+            "budget_ms": budget.get(name),
+            "top_imports_ms": {mod: round(ms, 1) for mod, ms in imports},
+        }
+        if name in budget and init_ms > budget[name]:
+            over_budget.append(name)
+
+    if args.json:
+        print(json.dumps(report, indent=2))
+    else:
+        for name, entry in report.items():
+            print(f"{name}: {entry['init_ms']} ms (budget {entry['budget_ms']} ms)")
+            for mod, ms in entry["top_imports_ms"].items():
+                print(f"    {ms:8.1f} ms  {mod}")
+
+    if args.check and over_budget:
+        print(f"Over cold-start budget: {', '.join(over_budget)}", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,133 @@
+"""Bedrock calls saved by update deduplication under replayed deliveries.
+
+Processes ``--records`` SQS records, one message per chat, through
+``message_processor.process_batch`` in batches of ``--batch-size``, with a
+share ``--replay`` of them delivered a second time in a later batch, as after
+a webhook retry or an SQS redelivery. Runs once with the processor's dedup
+store and once with a store that claims every update. Telegram is the HTTP
+stub and the Bedrock agent streams a fake answer. Reports agent calls,
+replies sent, Bedrock calls saved and the total processing time.
+
+Usage:
+    python benchmarks/dedup.py [--records N] [--replay SHARE] [--batch-size N]
+        [--first-chunk S] [--json]
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import random
+import sys
+import time
+from pathlib import Path
+from typing import Any, Dict, List
+
+BENCHMARKS = Path(__file__).resolve().parent
+ROOT = BENCHMARKS.parent
+sys.path.insert(0, str(ROOT / "src"))
+sys.path.insert(0, str(ROOT))
+
+from tests.support.fakes import FakeAgentRuntime, TelegramStub, install_fake_sibyl_core_sdk  # noqa: E402
+from tests.support.workload import BOT_TOKEN, LAMBDA_ENV, batch  # noqa: E402
+
+
+class NoDedupStore:
+    """Store that claims every update, as without deduplication."""
+
+    def begin(self, update_id: int) -> str:
+        from sibyl_telegram_interface.services.dedup import CLAIMED
+        return CLAIMED
+
+    def complete(self, update_id: int) -> None:
+        pass
+
+    def release(self, update_id: int) -> None:
+        pass
+
+
+def deliveries(args: argparse.Namespace) -> List[List[Dict[str, Any]]]:
+    """Build the batches, with replayed records one batch after their first delivery."""
+    records = batch(args.records)
+    replayed = {
+        record["messageId"] for record in random.Random(args.seed).sample(records, int(len(records) * args.replay))
+    }
+    batches: List[List[Dict[str, Any]]] = []
+    previous: List[Dict[str, Any]] = []
+    for start in range(0, len(records), args.batch_size):
+        first = records[start:start + args.batch_size]
+        batches.append([record for record in previous if record["messageId"] in replayed] + first)
+        previous = first
+    batches.append([record for record in previous if record["messageId"] in replayed])
+    return batches
+
+
+def run_scenario(args: argparse.Namespace, bot: Any, telegram: TelegramStub, store: Any) -> Dict[str, Any]:
+    from sibyl_telegram_interface.handlers import message_processor
+
+    agent = FakeAgentRuntime(first_chunk_latency=args.first_chunk, chunk_interval=0, chunks=1)
+    message_processor.bedrock.client = agent
+    message_processor.dedup_store = store
+    sent = telegram.calls.get("sendMessage", 0)
+    started = time.perf_counter()
+    delivered = 0
+    for records in deliveries(args):
+        delivered += len(records)
+        message_processor.process_batch(bot, records)
+    return {
+        "deliveries": delivered,
+        "agent_calls": agent.calls,
+        "replies": telegram.calls.get("sendMessage", 0) - sent,
+        "elapsed_s": round(time.perf_counter() - started, 2),
+    }
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--records", type=int, default=200, help="distinct SQS records")
+    parser.add_argument("--replay", type=float, default=0.2, help="share of records delivered twice")
+    parser.add_argument("--batch-size", type=int, default=10, help="records per invocation")
+    parser.add_argument("--first-chunk", type=float, default=0.05, help="agent seconds to first chunk")
+    parser.add_argument("--seed", type=int, default=1, help="seed choosing the replayed records")
+    parser.add_argument("--json", action="store_true", help="print results as JSON")
+    args = parser.parse_args()
+
+    for key, value in LAMBDA_ENV.items():
+        os.environ.setdefault(key, value)
+    os.environ.setdefault("POWERTOOLS_LOG_LEVEL", "WARNING")
+    os.environ.setdefault("POWERTOOLS_METRICS_NAMESPACE", "Benchmark")
+    os.environ.setdefault("RESPONSE_CACHE_TTL", "0")
+    install_fake_sibyl_core_sdk()
+
+    telegram = TelegramStub(latency=0).start()
+    from sibyl_telegram_interface.config import settings
+    settings.TELEGRAM_API_BASE = telegram.url
+    from sibyl_telegram_interface.services.dedup import InMemoryDedupStore
+    from sibyl_telegram_interface.telegram.bot import get_bot
+    bot = get_bot(BOT_TOKEN)
+
+    # Metric flushes print EMF documents
+    with contextlib.redirect_stdout(io.StringIO()):
+        report = {
+            "no dedup": run_scenario(args, bot, telegram, NoDedupStore()),
+            "dedup": run_scenario(args, bot, telegram, InMemoryDedupStore()),
+        }
+    telegram.stop()
+    report["bedrock_calls_saved"] = report["no dedup"]["agent_calls"] - report["dedup"]["agent_calls"]
+
+    if args.json:
+        print(json.dumps(report, indent=2))
+    else:
+        for name in ("no dedup", "dedup"):
+            result = report[name]
+            print(
+                f"{name:10} deliveries {result['deliveries']:>5}  agent calls {result['agent_calls']:>5}  "
+                f"replies {result['replies']:>5}  {result['elapsed_s']:>6} s"
+            )
+        print(f"Bedrock calls saved: {report['bedrock_calls_saved']}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,133 @@
+"""Enqueue throughput and ack latency of updates to SQS.
+
+Enqueues ``--updates`` synthetic updates from ``--concurrency`` producers to
+a fake SQS queue whose calls take ``--sqs-latency`` seconds, in three ways:
+one ``SendMessage`` per update with the full message as the body, as the
+webhook did before ``UpdateQueue``; ``UpdateQueue`` flushed after every
+update, as one webhook invocation does; and ``UpdateQueue`` flushed once per
+``--batch`` updates, as a polled batch is. The ack latency of an update is
+the time from its arrival until the call that enqueued it returns. Reports
+throughput, p50/p99 ack latency, SQS calls and bytes per payload.
+
+Usage:
+    python benchmarks/enqueue.py [--updates N] [--concurrency N] [--batch N]
+        [--sqs-latency S] [--json]
+"""
+
+import argparse
+import json
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Any, Callable, Dict, List
+
+BENCHMARKS = Path(__file__).resolve().parent
+ROOT = BENCHMARKS.parent
+sys.path.insert(0, str(ROOT / "src"))
+sys.path.insert(0, str(ROOT))
+
+from loadtest import summarize  # noqa: E402
+from tests.support.fakes import FakeSQS  # noqa: E402
+from tests.support.workload import synthetic_trace  # noqa: E402
+
+from sibyl_telegram_interface.services.queue import UpdateQueue  # noqa: E402
+from sibyl_telegram_interface.telegram.models import TelegramUpdate  # noqa: E402
+
+QUEUE_URL = "https://sqs.us-east-1.amazonaws.com/000000000000/queue"
+
+
+class SlowSQS(FakeSQS):
+    """Fake queue whose calls take a fixed time, with ``SendMessage`` as well."""
+
+    def __init__(self, latency: float):
+        super().__init__()
+        self.latency = latency
+        self.payload_bytes = 0
+
+    def send_message(self, QueueUrl: str, MessageBody: str, **kwargs: Any) -> Dict[str, Any]:
+        self.send_message_batch(QueueUrl, [{"Id": "0", "MessageBody": MessageBody}])
+        return {"MessageId": "msg"}
+
+    def send_message_batch(self, QueueUrl: str, Entries: List[Dict[str, Any]]) -> Dict[str, Any]:
+        time.sleep(self.latency)
+        with self._lock:
+            self.payload_bytes += sum(len(entry["MessageBody"].encode()) for entry in Entries)
+        return super().send_message_batch(QueueUrl, Entries)
+
+
+def run_scenario(
+    args: argparse.Namespace,
+    batch: int,
+    enqueue: Callable[[SlowSQS, List[Dict[str, Any]]], None]
+) -> Dict[str, Any]:
+    sqs = SlowSQS(args.sqs_latency)
+    updates = list(synthetic_trace(args.updates, args.chats))
+    for update in updates:
+        update["message"]["date"] = int(time.time())
+    acks: List[float] = []
+    lock = threading.Lock()
+
+    def produce(group: List[Dict[str, Any]]) -> None:
+        started = time.perf_counter()
+        enqueue(sqs, group)
+        elapsed = time.perf_counter() - started
+        with lock:
+            acks.extend([elapsed] * len(group))
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.concurrency) as executor:
+        list(executor.map(produce, [updates[i:i + batch] for i in range(0, len(updates), batch)]))
+    elapsed = time.perf_counter() - started
+    return {
+        "throughput_per_s": round(len(updates) / elapsed, 1),
+        "ack": summarize(acks),
+        "sqs_calls": sqs.batches,
+        "bytes_per_payload": round(sqs.payload_bytes / sqs.sent, 1),
+    }
+
+
+def send_message_per_update(sqs: SlowSQS, updates: List[Dict[str, Any]]) -> None:
+    for update in updates:
+        sqs.send_message(QueueUrl=QUEUE_URL, MessageBody=json.dumps({"message": update["message"]}))
+
+
+def update_queue(sqs: SlowSQS, updates: List[Dict[str, Any]]) -> None:
+    queue = UpdateQueue(QUEUE_URL, sqs)
+    for update in updates:
+        model = TelegramUpdate.from_update(update)
+        queue.put(model.to_wire(), chat_id=model.chat_id, update_id=model.update_id)
+    queue.flush()
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--updates", type=int, default=2000, help="updates to enqueue")
+    parser.add_argument("--chats", type=int, default=200, help="chats the updates are spread over")
+    parser.add_argument("--concurrency", type=int, default=20, help="concurrent producers")
+    parser.add_argument("--batch", type=int, default=10, help="updates per flush of a polled batch")
+    parser.add_argument("--sqs-latency", type=float, default=0.01, help="seconds per SQS call")
+    parser.add_argument("--json", action="store_true", help="print results as JSON")
+    args = parser.parse_args()
+
+    report = {
+        "send_message": run_scenario(args, 1, send_message_per_update),
+        "queue, flush per update": run_scenario(args, 1, update_queue),
+        f"queue, flush per {args.batch}": run_scenario(args, args.batch, update_queue),
+    }
+
+    if args.json:
+        print(json.dumps(report, indent=2))
+    else:
+        for name, result in report.items():
+            print(
+                f"{name:24} {result['throughput_per_s']:>8}/s  ack p50 {result['ack']['p50_ms']:>7} ms "
+                f"p99 {result['ack']['p99_ms']:>7} ms  sqs calls {result['sqs_calls']:>5}  "
+                f"{result['bytes_per_payload']:>6} bytes/payload"
+            )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,150 @@
+"""Tail latency of agent calls with and without failover and hedging.
+
+Sends agent requests through ``Bedrock.invoke_agent`` from concurrent
+workers against two fake endpoints. Time to the first chunk follows a
+distribution with a slow tail, and a share of calls is throttled. The same
+load runs against a single endpoint, two endpoints with failover only, and
+two endpoints with hedging. Reports p50/p95/p99 latency, failures, and agent
+calls per request.
+
+Usage:
+    python benchmarks/hedging.py [--requests N] [--workers N] [--tail-rate P]
+        [--throttle-rate P] [--hedge-percentile Q] [--seed N] [--json]
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import random
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Any, Callable, Dict, List
+
+BENCHMARKS = Path(__file__).resolve().parent
+ROOT = BENCHMARKS.parent
+sys.path.insert(0, str(ROOT / "src"))
+sys.path.insert(0, str(ROOT))
+
+from loadtest import summarize  # noqa: E402
+from tests.support.fakes import FakeAgentRuntime  # noqa: E402
+from tests.support.workload import LAMBDA_ENV  # noqa: E402
+
+
+def latency_distribution(args: argparse.Namespace, seed: int) -> Callable[[], float]:
+    """Get a sampler of first-chunk latencies: mostly around ``--median``, sometimes ``--tail`` times slower."""
+    rng = random.Random(seed)
+    lock = threading.Lock()
+
+    def sample() -> float:
+        with lock:
+            latency = rng.lognormvariate(0, 0.25) * args.median
+            if rng.random() < args.tail_rate:
+                latency *= args.tail
+        return latency
+
+    return sample
+
+
+def run_scenario(args: argparse.Namespace, endpoints: int, hedge_percentile: float) -> Dict[str, Any]:
+    from sibyl_telegram_interface.services.bedrock import Bedrock
+    from sibyl_telegram_interface.services.resilience import AgentEndpoint, AgentRouter, HedgeBudget
+
+    fakes = [
+        FakeAgentRuntime(
+            first_chunk_latency=latency_distribution(args, args.seed + index),
+            chunk_interval=0.01,
+            chunks=3,
+            throttle_rate=args.throttle_rate,
+            seed=args.seed + 100 + index,
+        )
+        for index in range(endpoints)
+    ]
+    router = AgentRouter(
+        [
+            AgentEndpoint(f"region-{index}", "agent", "alias", client_factory=lambda region, fake=fake: fake)
+            for index, fake in enumerate(fakes)
+        ],
+        hedge_percentile=hedge_percentile,
+        hedge_min_delay=0.0,
+        hedge_budget=HedgeBudget(ratio=args.hedge_ratio),
+    )
+    bedrock = Bedrock(router=router)
+
+    latencies: List[float] = []
+    failures = 0
+    lock = threading.Lock()
+
+    def request(index: int) -> None:
+        nonlocal failures
+        started = time.perf_counter()
+        try:
+            bedrock.invoke_agent(user_id=str(index), prompt=f"Question {index}", chat_id=index)
+        except Exception:
+            with lock:
+                failures += 1
+            return
+        with lock:
+            latencies.append(time.perf_counter() - started)
+
+    with ThreadPoolExecutor(max_workers=args.workers) as executor:
+        list(executor.map(request, range(args.requests)))
+
+    calls = sum(fake.calls for fake in fakes)
+    return dict(
+        summarize(latencies),
+        failures=failures,
+        throttled=sum(fake.throttled for fake in fakes),
+        agent_calls_per_request=round(calls / args.requests, 3),
+    )
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=600, help="agent requests per scenario")
+    parser.add_argument("--workers", type=int, default=16, help="concurrent requests")
+    parser.add_argument("--median", type=float, default=0.1, help="median seconds to first chunk")
+    parser.add_argument("--tail", type=float, default=15, help="slowdown of tail requests")
+    parser.add_argument("--tail-rate", type=float, default=0.03, help="share of tail requests")
+    parser.add_argument("--throttle-rate", type=float, default=0.02, help="share of throttled calls")
+    parser.add_argument("--hedge-percentile", type=float, default=0.95, help="hedge after this percentile")
+    parser.add_argument("--hedge-ratio", type=float, default=0.1, help="maximum share of hedged requests")
+    parser.add_argument("--seed", type=int, default=1, help="random seed")
+    parser.add_argument("--json", action="store_true", help="print results as JSON")
+    args = parser.parse_args()
+
+    for key, value in LAMBDA_ENV.items():
+        os.environ.setdefault(key, value)
+    os.environ.setdefault("POWERTOOLS_LOG_LEVEL", "ERROR")
+    os.environ.setdefault("POWERTOOLS_METRICS_NAMESPACE", "Benchmark")
+    os.environ.setdefault("RESPONSE_CACHE_TTL", "0")
+
+    scenarios = {
+        "single": (1, 0.0),
+        "failover": (2, 0.0),
+        "hedged": (2, args.hedge_percentile),
+    }
+    report: Dict[str, Any] = {}
+    # Metric flushes print EMF documents
+    with contextlib.redirect_stdout(io.StringIO()):
+        for name, (endpoints, hedge_percentile) in scenarios.items():
+            report[name] = run_scenario(args, endpoints, hedge_percentile)
+
+    if args.json:
+        print(json.dumps(report, indent=2))
+    else:
+        for name, result in report.items():
+            print(
+                f"{name:9} p50 {result['p50_ms']:>8} ms  p95 {result['p95_ms']:>8} ms  "
+                f"p99 {result['p99_ms']:>8} ms  failures {result['failures']:>3}  "
+                f"calls/request {result['agent_calls_per_request']}"
+            )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
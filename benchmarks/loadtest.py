@@ -0,0 +1,335 @@
+"""End-to-end load test of the webhook and processor handlers.
+
+Replays a synthetic or recorded update trace against both Lambda handlers
+in-process at a target rate. Telegram is an HTTP stub on localhost; SQS, SSM,
+the Bedrock agent and the Sibyl Core SDK are fakes from ``fakes.py``. Reports
+throughput, p50/p95/p99 latency of the webhook, the processor batches and
+end to end, cold versus warm init, and optionally allocations, as JSON that
+can be compared across commits with ``--compare``.
+
+Usage:
+    python benchmarks/loadtest.py [--updates N] [--rate R] [--chats N]
+        [--burst N] [--trace FILE] [--processors N] [--batch-window S] [--first-chunk S] [--chunks N]
+        [--chunk-interval S] [--telegram-latency S] [--admission] [--allocations]
+        [--output FILE] [--compare FILE]
+"""
+
+import argparse
+import contextlib
+import importlib
+import io
+import json
+import os
+import subprocess
+import sys
+import threading
+import time
+import tracemalloc
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional
+
+BENCHMARKS = Path(__file__).resolve().parent
+ROOT = BENCHMARKS.parent
+sys.path.insert(0, str(ROOT / "src"))
+sys.path.insert(0, str(ROOT))
+
+from coldstart import HANDLERS, profile_handler  # noqa: E402
+from tests.support.fakes import (  # noqa: E402
+    FakeAgentRuntime,
+    FakeCloudWatch,
+    FakeLambdaContext,
+    FakeSQS,
+    FakeSSM,
+    TelegramStub,
+    install_fake_sibyl_core_sdk,
+)
+from tests.support.workload import BOT_TOKEN, LAMBDA_ENV, TELEGRAM_IP, synthetic_trace  # noqa: E402
+
+SQS_BATCH_SIZE = 10
+LAMBDA_TIMEOUT = 60
+
+# Metrics compared by --compare, and whether higher is better
+COMPARED = {
+    ("throughput_per_s",): True,
+    ("webhook", "p95_ms"): False,
+    ("webhook", "p99_ms"): False,
+    ("processor", "p95_ms"): False,
+    ("end_to_end", "p50_ms"): False,
+    ("end_to_end", "p95_ms"): False,
+    ("end_to_end", "p99_ms"): False,
+}
+
+
+def summarize(seconds: List[float]) -> Dict[str, float]:
+    """Get count, mean and p50/p95/p99/max in milliseconds."""
+    if not seconds:
+        return {"count": 0}
+    ordered = sorted(seconds)
+
+    def percentile(q: float) -> float:
+        return round(ordered[min(len(ordered) - 1, int(round(q * (len(ordered) - 1))))] * 1000, 2)
+
+    return {
+        "count": len(ordered),
+        "mean_ms": round(sum(ordered) / len(ordered) * 1000, 2),
+        "p50_ms": percentile(0.50),
+        "p95_ms": percentile(0.95),
+        "p99_ms": percentile(0.99),
+        "max_ms": round(ordered[-1] * 1000, 2),
+    }
+
+
+def recorded_trace(path: Path) -> Iterator[Dict[str, Any]]:
+    """Read updates from a file with one Bot API update JSON per line."""
+    with path.open() as lines:
+        for line in lines:
+            if line.strip():
+                yield json.loads(line)
+
+
+def webhook_event(update: Dict[str, Any]) -> Dict[str, Any]:
+    """Build a Lambda function URL event delivering an update."""
+    if "message" in update:
+        update["message"]["date"] = int(time.time())
+    return {
+        "headers": {"x-forwarded-port": "443", "content-type": "application/json"},
+        "requestContext": {"http": {"sourceIp": TELEGRAM_IP}},
+        "body": json.dumps(update),
+    }
+
+
+def git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True, text=True, check=True, cwd=ROOT,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+class LoadTest:
+    """Drives the handlers with fakes wired in place of their clients."""
+
+    def __init__(self, args: argparse.Namespace):
+        self.args = args
+        self.telegram = TelegramStub(latency=args.telegram_latency).start()
+        self.sqs = FakeSQS()
+        self.agent = FakeAgentRuntime(
+            first_chunk_latency=args.first_chunk,
+            chunk_interval=args.chunk_interval,
+            chunks=args.chunks,
+        )
+        self.arrivals: Dict[int, float] = {}
+        self.webhook_latencies: List[float] = []
+        self.webhook_errors = 0
+        self.batch_latencies: List[float] = []
+        self.end_to_end: List[float] = []
+        self.failed_records = 0
+        self.first_invocation: Dict[str, float] = {}
+        self._lock = threading.Lock()
+        self._producing = True
+
+    def load_handlers(self) -> Dict[str, float]:
+        """Import the handlers and wire the fakes in, returning import times in ms."""
+        install_fake_sibyl_core_sdk()
+        from sibyl_telegram_interface.config import settings
+        settings.TELEGRAM_API_BASE = self.telegram.url
+
+        import_ms = {}
+        for name in ("webhook", "processor"):
+            started = time.perf_counter()
+            importlib.import_module(HANDLERS[name])
+            import_ms[name] = round((time.perf_counter() - started) * 1000, 1)
+
+        from sibyl_telegram_interface.handlers import lambda_handler, message_processor
+        from sibyl_telegram_interface.utils import ssm
+        ssm._CLIENT = FakeSSM({settings.BOT_TOKEN_PARAM_PATH: BOT_TOKEN})
+        lambda_handler._sqs_client = self.sqs
+        lambda_handler.get_admission().monitor._cloudwatch = FakeCloudWatch()
+        message_processor.bedrock.client = self.agent
+        message_processor._sqs_client = self.sqs
+        self.webhook = lambda_handler.lambda_handler
+        self.processor = message_processor.lambda_handler
+        return import_ms
+
+    def run(self, trace: Iterator[Dict[str, Any]]) -> float:
+        """Replay the trace and wait until every queued update is processed.
+
+        Returns:
+            Wall-clock seconds from the first update to the last reply
+        """
+        processors = [
+            threading.Thread(target=self._process_loop, daemon=True)
+            for _ in range(self.args.processors)
+        ]
+        started = time.perf_counter()
+        for thread in processors:
+            thread.start()
+
+        with ThreadPoolExecutor(max_workers=self.args.webhook_workers) as executor:
+            for index, update in enumerate(trace):
+                delay = started + index / self.args.rate - time.perf_counter()
+                if delay > 0:
+                    time.sleep(delay)
+                executor.submit(self._deliver, update)
+        self._producing = False
+        for thread in processors:
+            thread.join()
+        return time.perf_counter() - started
+
+    def _deliver(self, update: Dict[str, Any]) -> None:
+        event = webhook_event(update)
+        started = time.perf_counter()
+        with self._lock:
+            self.arrivals[update.get("update_id")] = started
+        response = self.webhook(event, FakeLambdaContext(LAMBDA_TIMEOUT))
+        elapsed = time.perf_counter() - started
+        with self._lock:
+            self.first_invocation.setdefault("webhook_ms", round(elapsed * 1000, 2))
+            self.webhook_latencies.append(elapsed)
+            if response.get("statusCode") != 200:
+                self.webhook_errors += 1
+
+    def _process_loop(self) -> None:
+        while self._producing or len(self.sqs):
+            records = self.sqs.receive(SQS_BATCH_SIZE, wait=0.05, window=self.args.batch_window)
+            if not records:
+                continue
+            started = time.perf_counter()
+            response = self.processor({"Records": records}, FakeLambdaContext(LAMBDA_TIMEOUT))
+            finished = time.perf_counter()
+            failed = {item["itemIdentifier"] for item in response.get("batchItemFailures", [])}
+            with self._lock:
+                self.first_invocation.setdefault("processor_batch_ms", round((finished - started) * 1000, 2))
+                self.batch_latencies.append(finished - started)
+                self.failed_records += len(failed)
+                for record in records:
+                    if record["messageId"] in failed:
+                        continue
+                    update_id = json.loads(record["body"]).get("u")
+                    if update_id in self.arrivals:
+                        self.end_to_end.append(finished - self.arrivals[update_id])
+
+    def stop(self) -> None:
+        self.telegram.stop()
+
+
+def allocation_report(snapshot: tracemalloc.Snapshot, updates: int, top: int = 5) -> Dict[str, Any]:
+    """Summarize allocations made by the package during the replay."""
+    package = str(ROOT / "src")
+    stats = [
+        stat for stat in snapshot.statistics("lineno")
+        if stat.traceback[0].filename.startswith(package)
+    ]
+    current, peak = tracemalloc.get_traced_memory()
+    return {
+        "peak_kb": round(peak / 1024, 1),
+        "retained_kb": round(current / 1024, 1),
+        "retained_bytes_per_update": round(current / updates, 1) if updates else 0,
+        "top_sites_kb": {
+            f"{os.path.relpath(stat.traceback[0].filename, package)}:{stat.traceback[0].lineno}":
+                round(stat.size / 1024, 1)
+            for stat in sorted(stats, key=lambda stat: stat.size, reverse=True)[:top]
+        },
+    }
+
+
+def compare(report: Dict[str, Any], baseline: Dict[str, Any]) -> None:
+    """Print the change of the compared metrics against a previous report."""
+    print(f"Compared with {baseline.get('commit')}:")
+    for path, higher_is_better in COMPARED.items():
+        current, previous = report, baseline
+        for key in path:
+            current = current.get(key, {}) if isinstance(current, dict) else {}
+            previous = previous.get(key, {}) if isinstance(previous, dict) else {}
+        if not isinstance(current, (int, float)) or not isinstance(previous, (int, float)) or not previous:
+            continue
+        change = (current - previous) / previous * 100
+        worse = change < 0 if higher_is_better else change > 0
+        print(f"    {'.'.join(path):24} {previous:>10} -> {current:>10} ({change:+.1f}%{' worse' if worse else ''})")
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--updates", type=int, default=200, help="synthetic updates to send")
+    parser.add_argument("--rate", type=float, default=20, help="updates per second")
+    parser.add_argument("--chats", type=int, default=50, help="chats the synthetic updates are spread over")
+    parser.add_argument("--burst", type=int, default=1, help="synthetic messages each chat sends in a row")
+    parser.add_argument("--trace", type=Path, help="replay updates from a JSON lines file instead")
+    parser.add_argument("--processors", type=int, default=4, help="concurrent processor invocations")
+    parser.add_argument("--batch-window", type=float, default=0.0, help="seconds a processor gathers a batch")
+    parser.add_argument("--webhook-workers", type=int, default=16, help="concurrent webhook invocations")
+    parser.add_argument("--first-chunk", type=float, default=0.5, help="agent seconds to first chunk")
+    parser.add_argument("--chunk-interval", type=float, default=0.05, help="agent seconds between chunks")
+    parser.add_argument("--chunks", type=int, default=10, help="chunks per agent answer")
+    parser.add_argument("--telegram-latency", type=float, default=0.0, help="Bot API seconds per call")
+    parser.add_argument("--admission", action="store_true", help="apply webhook admission control")
+    parser.add_argument("--allocations", action="store_true", help="trace allocations (slows the run)")
+    parser.add_argument("--no-fresh-init", action="store_true", help="skip fresh-interpreter init timing")
+    parser.add_argument("--output", type=Path, help="write the JSON report to a file")
+    parser.add_argument("--compare", type=Path, help="previous JSON report to compare against")
+    args = parser.parse_args()
+
+    for key, value in LAMBDA_ENV.items():
+        os.environ.setdefault(key, value)
+    os.environ.setdefault("POWERTOOLS_LOG_LEVEL", "WARNING")
+    os.environ.setdefault("POWERTOOLS_METRICS_NAMESPACE", "LoadTest")
+    # Per-user quotas would shed the synthetic chats' bursts
+    os.environ.setdefault("ADMISSION_ENABLED", "true" if args.admission else "false")
+
+    fresh_init = {}
+    if not args.no_fresh_init:
+        for name in ("webhook", "processor"):
+            fresh_init[name] = round(profile_handler(HANDLERS[name])[0], 1)
+
+    test = LoadTest(args)
+    trace = recorded_trace(args.trace) if args.trace else synthetic_trace(args.updates, args.chats, args.burst)
+    # Metrics are flushed to stdout after every invocation
+    with contextlib.redirect_stdout(io.StringIO()):
+        import_ms = test.load_handlers()
+        if args.allocations:
+            tracemalloc.start()
+        elapsed = test.run(trace)
+        snapshot = tracemalloc.take_snapshot() if args.allocations else None
+    test.stop()
+
+    processed = len(test.end_to_end)
+    report: Dict[str, Any] = {
+        "commit": git_commit(),
+        "config": {
+            key: str(value) if isinstance(value, Path) else value
+            for key, value in vars(args).items() if key not in ("output", "compare")
+        },
+        "updates": len(test.webhook_latencies),
+        "processed": processed,
+        "failed_records": test.failed_records,
+        "elapsed_s": round(elapsed, 2),
+        "throughput_per_s": round(processed / elapsed, 2) if elapsed else 0.0,
+        "init": {
+            "fresh_interpreter_ms": fresh_init,
+            "in_process_import_ms": import_ms,
+            "first_invocation": test.first_invocation,
+        },
+        "webhook": dict(summarize(test.webhook_latencies[1:]), errors=test.webhook_errors),
+        "processor": dict(summarize(test.batch_latencies[1:]), batches=len(test.batch_latencies)),
+        "end_to_end": summarize(test.end_to_end),
+        "telegram_calls": test.telegram.calls,
+        "agent_calls": test.agent.calls,
+    }
+    if snapshot is not None:
+        report["allocations"] = allocation_report(snapshot, len(test.webhook_latencies))
+        tracemalloc.stop()
+
+    output = json.dumps(report, indent=2)
+    if args.output:
+        args.output.write_text(output + "\n")
+    print(output)
+    if args.compare:
+        compare(report, json.loads(args.compare.read_text()))
+    return 0 if processed == report["updates"] and not test.webhook_errors else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,201 @@
+"""Webhook against getUpdates ingestion of a burst of updates.
+
+Delivers one burst of updates twice: as webhook requests to the webhook
+handler, one request per update from up to ``--connections`` concurrent
+connections, as Telegram does, and through ``UpdatePoller`` fetching from
+the Telegram stub's ``getUpdates`` and handing batches to ``ingest_batch``.
+Both enqueue to a fake SQS queue. Each Bot API call takes ``--rtt``, and a
+webhook request needs half of it to reach the handler. Reports HTTP requests
+(webhook deliveries or getUpdates calls), SQS calls, and the time from an
+update's arrival at Telegram to its enqueue. ``--enqueue-failures`` makes
+the first SQS calls fail, to show that unconfirmed batches are fetched
+again. Exits non-zero if an update was not enqueued or was left
+unconfirmed.
+
+Usage:
+    python benchmarks/polling.py [--updates N] [--rate R] [--connections N]
+        [--rtt S] [--enqueue-failures N] [--json]
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Any, Dict, List
+
+BENCHMARKS = Path(__file__).resolve().parent
+ROOT = BENCHMARKS.parent
+sys.path.insert(0, str(ROOT / "src"))
+sys.path.insert(0, str(ROOT))
+
+from botocore.exceptions import ClientError  # noqa: E402
+
+from loadtest import LAMBDA_TIMEOUT, LoadTest, summarize, webhook_event  # noqa: E402
+from tests.support.fakes import FakeLambdaContext, FakeSQS  # noqa: E402
+from tests.support.workload import BOT_TOKEN, LAMBDA_ENV, synthetic_trace  # noqa: E402
+
+# Offset of the polling run's update IDs, so the two runs do not overlap
+POLLING_UPDATE_IDS = 1000000
+
+
+class TimedSQS(FakeSQS):
+    """Records when each update is enqueued, and fails the first calls if asked."""
+
+    def __init__(self, failures: int = 0):
+        super().__init__()
+        self.failures = failures
+        self.enqueued: Dict[int, float] = {}
+
+    def send_message_batch(self, QueueUrl: str, Entries: List[Dict[str, Any]]) -> Dict[str, Any]:
+        if self.failures:
+            self.failures -= 1
+            raise ClientError({"Error": {"Code": "ServiceUnavailable", "Message": "Injected"}}, "SendMessageBatch")
+        response = super().send_message_batch(QueueUrl, Entries)
+        now = time.perf_counter()
+        with self._lock:
+            for entry in Entries:
+                self.enqueued.setdefault(json.loads(entry["MessageBody"])["u"], now)
+        return response
+
+
+def trace(args: argparse.Namespace, offset: int = 0) -> List[Dict[str, Any]]:
+    updates = list(synthetic_trace(args.updates, args.chats))
+    for update in updates:
+        update["update_id"] += offset
+        update["message"]["date"] = int(time.time())
+    return updates
+
+
+def report(sqs: TimedSQS, arrivals: Dict[int, float], http_requests: int) -> Dict[str, Any]:
+    return {
+        "http_requests": http_requests,
+        "sqs_calls": sqs.batches,
+        "enqueued": len(sqs.enqueued),
+        "duplicates": sqs.sent - len(sqs.enqueued),
+        "arrival_to_enqueue": summarize([sqs.enqueued[key] - arrivals[key] for key in sqs.enqueued]),
+    }
+
+
+def run_webhook(test: LoadTest, args: argparse.Namespace) -> Dict[str, Any]:
+    """Deliver each update as its own webhook request."""
+    from sibyl_telegram_interface.handlers import lambda_handler
+
+    sqs = TimedSQS(args.enqueue_failures)
+    lambda_handler.get_update_queue().client = sqs
+    arrivals: Dict[int, float] = {}
+    requests = 0
+    lock = threading.Lock()
+
+    def deliver(update: Dict[str, Any]) -> None:
+        nonlocal requests
+        # Telegram retries a failed delivery, here without backing off
+        while True:
+            time.sleep(args.rtt / 2)
+            response = lambda_handler.lambda_handler(webhook_event(update), FakeLambdaContext(LAMBDA_TIMEOUT))
+            with lock:
+                requests += 1
+            if response["statusCode"] == 200:
+                return
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.connections) as executor:
+        for index, update in enumerate(trace(args)):
+            delay = started + index / args.rate - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            arrivals[update["update_id"]] = time.perf_counter()
+            executor.submit(deliver, update)
+    return report(sqs, arrivals, requests)
+
+
+def run_polling(test: LoadTest, args: argparse.Namespace) -> Dict[str, Any]:
+    """Push updates to the stub and ingest them with a poller."""
+    from sibyl_telegram_interface.handlers import lambda_handler
+    from sibyl_telegram_interface.telegram.bot import get_bot
+    from sibyl_telegram_interface.telegram.polling import UpdatePoller
+
+    sqs = TimedSQS(args.enqueue_failures)
+    lambda_handler.get_update_queue().client = sqs
+    bot = get_bot(BOT_TOKEN)
+    bot.delete_webhook()
+    calls_before = test.telegram.calls.get("getUpdates", 0)
+    poller = UpdatePoller(
+        bot, lambda updates: lambda_handler.ingest_batch(bot, updates), timeout=5, retry_delay=0.05
+    )
+    thread = threading.Thread(target=poller.run)
+    thread.start()
+
+    arrivals: Dict[int, float] = {}
+    updates = trace(args, POLLING_UPDATE_IDS)
+    started = time.perf_counter()
+    for index, update in enumerate(updates):
+        delay = started + index / args.rate - time.perf_counter()
+        if delay > 0:
+            time.sleep(delay)
+        arrivals[update["update_id"]] = time.perf_counter()
+        test.telegram.push(update)
+    while len(sqs.enqueued) < len(updates) and time.perf_counter() - started < 60:
+        time.sleep(0.01)
+    poller.stop()
+    # The stop takes effect when the long poll in flight returns
+    test.telegram.push({"update_id": POLLING_UPDATE_IDS + args.updates + 1})
+    thread.join()
+    polls = test.telegram.calls.get("getUpdates", 0) - calls_before
+    return dict(
+        report(sqs, arrivals, polls),
+        left_unconfirmed=sum(update["update_id"] in arrivals for update in test.telegram.pending),
+    )
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--updates", type=int, default=1000, help="updates in the burst")
+    parser.add_argument("--rate", type=float, default=500, help="updates per second during the burst")
+    parser.add_argument("--chats", type=int, default=200, help="chats the updates are spread over")
+    parser.add_argument("--connections", type=int, default=40, help="concurrent webhook deliveries")
+    parser.add_argument("--rtt", type=float, default=0.05, help="seconds of round trip to Telegram")
+    parser.add_argument("--enqueue-failures", type=int, default=0, help="SQS calls that fail at the start")
+    parser.add_argument("--json", action="store_true", help="print results as JSON")
+    args = parser.parse_args()
+    args.telegram_latency = args.rtt
+    args.first_chunk = args.chunk_interval = 0.0
+    args.chunks = 1
+
+    for key, value in LAMBDA_ENV.items():
+        os.environ.setdefault(key, value)
+    os.environ.setdefault("POWERTOOLS_LOG_LEVEL", "CRITICAL")
+    os.environ.setdefault("POWERTOOLS_METRICS_NAMESPACE", "Benchmark")
+    # Per-user quotas would shed the synthetic chats' bursts
+    os.environ.setdefault("ADMISSION_ENABLED", "false")
+
+    test = LoadTest(args)
+    results: Dict[str, Any] = {}
+    # Metrics are flushed to stdout after every invocation
+    with contextlib.redirect_stdout(io.StringIO()):
+        test.load_handlers()
+        results["webhook"] = run_webhook(test, args)
+        results["polling"] = run_polling(test, args)
+    test.stop()
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+    else:
+        for name, result in results.items():
+            latency = result["arrival_to_enqueue"]
+            print(
+                f"{name:8} http requests {result['http_requests']:>5}  sqs calls {result['sqs_calls']:>5}  "
+                f"enqueued {result['enqueued']:>5} (+{result['duplicates']} duplicates)  "
+                f"arrival to enqueue p50 {latency.get('p50_ms')} ms p99 {latency.get('p99_ms')} ms"
+            )
+    complete = all(result["enqueued"] == args.updates for result in results.values())
+    return 0 if complete and results["polling"]["left_unconfirmed"] == 0 else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
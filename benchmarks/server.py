@@ -0,0 +1,209 @@
+"""Server mode against the Lambda handlers on the same trace.
+
+Replays one synthetic trace twice in-process: through the webhook and
+processor handlers with a fake SQS queue, as ``loadtest.py`` does, and
+through the server mode's ASGI app, which queues updates in-process and
+answers them with a worker pool. Both use the Telegram stub and fakes from
+``fakes.py``. Reports webhook and end-to-end latency, throughput and CPU time
+per update. Lambda invocation overhead and cold starts come on top of the
+handler numbers; see ``coldstart.py``.
+
+Usage:
+    python benchmarks/server.py [--updates N] [--rate R] [--chats N] [--burst N]
+        [--processors N] [--workers N] [--first-chunk S] [--json]
+"""
+
+import argparse
+import asyncio
+import contextlib
+import io
+import json
+import os
+import sys
+import time
+from pathlib import Path
+from typing import Any, Dict, Iterator, List
+
+BENCHMARKS = Path(__file__).resolve().parent
+ROOT = BENCHMARKS.parent
+sys.path.insert(0, str(ROOT / "src"))
+sys.path.insert(0, str(ROOT))
+
+from loadtest import LoadTest, summarize  # noqa: E402
+from tests.support.fakes import FakeAgentRuntime  # noqa: E402
+from tests.support.workload import LAMBDA_ENV, TELEGRAM_IP, synthetic_trace  # noqa: E402
+
+# Offset of the server run's update IDs, so the dedup store does not skip them
+SERVER_UPDATE_IDS = 1000000
+
+
+def offset_trace(trace: Iterator[Dict[str, Any]], offset: int) -> Iterator[Dict[str, Any]]:
+    for update in trace:
+        update["update_id"] += offset
+        yield update
+
+
+def run_lambda(test: LoadTest, args: argparse.Namespace) -> Dict[str, Any]:
+    cpu = time.process_time()
+    elapsed = test.run(synthetic_trace(args.updates, args.chats, args.burst))
+    cpu = time.process_time() - cpu
+    return {
+        "elapsed_s": round(elapsed, 2),
+        "throughput_per_s": round(len(test.end_to_end) / elapsed, 2),
+        "cpu_ms_per_update": round(cpu / args.updates * 1000, 2),
+        "webhook": dict(summarize(test.webhook_latencies), errors=test.webhook_errors),
+        "end_to_end": summarize(test.end_to_end),
+        "agent_calls": test.agent.calls,
+    }
+
+
+async def run_server(test: LoadTest, args: argparse.Namespace) -> Dict[str, Any]:
+    from sibyl_telegram_interface.handlers.server import UpdateServer, WebhookApp
+    from sibyl_telegram_interface.services.queue import LocalUpdateQueue
+
+    class TimedQueue(LocalUpdateQueue):
+        """Remembers the update IDs each chat was last taken with."""
+
+        def take(self, chat_id: Any) -> Any:
+            items = super().take(chat_id)
+            taken[chat_id] = [payload.get("u") for payload, _ in items]
+            return items
+
+    class TimedServer(UpdateServer):
+        """Records when the updates of each taken chat are done."""
+
+        async def _process(self, chat_id: Any) -> None:
+            await super()._process(chat_id)
+            finished = time.perf_counter()
+            end_to_end.extend(
+                finished - arrivals[update_id] for update_id in taken.pop(chat_id, []) if update_id in arrivals
+            )
+
+    taken: Dict[Any, List[int]] = {}
+    server = TimedServer(workers=args.workers)
+    server.queue = TimedQueue(server.queue.maxsize, on_ready=server._on_ready)
+    app = WebhookApp(server)
+    arrivals: Dict[int, float] = {}
+    end_to_end: List[float] = []
+    webhook: List[float] = []
+    errors = 0
+
+    async def post(update: Dict[str, Any]) -> None:
+        nonlocal errors
+        update["message"]["date"] = int(time.time())
+        body = json.dumps(update).encode()
+        scope = {
+            "type": "http",
+            "method": "POST",
+            "path": "/",
+            "headers": [(b"content-type", b"application/json"), (b"x-forwarded-port", b"443")],
+            "client": (TELEGRAM_IP, 40000),
+            "server": ("127.0.0.1", 8443),
+        }
+        messages = [{"type": "http.request", "body": body, "more_body": False}]
+        status: List[int] = []
+
+        async def receive() -> Dict[str, Any]:
+            return messages.pop(0)
+
+        async def send(message: Dict[str, Any]) -> None:
+            if message["type"] == "http.response.start":
+                status.append(message["status"])
+
+        started = time.perf_counter()
+        arrivals[update["update_id"]] = started
+        await app(scope, receive, send)
+        webhook.append(time.perf_counter() - started)
+        if status != [200]:
+            errors += 1
+
+    await server.start()
+    cpu = time.process_time()
+    started = time.perf_counter()
+    deliveries = []
+    trace = offset_trace(synthetic_trace(args.updates, args.chats, args.burst), SERVER_UPDATE_IDS)
+    for index, update in enumerate(trace):
+        delay = started + index / args.rate - time.perf_counter()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        deliveries.append(asyncio.create_task(post(update)))
+    await asyncio.gather(*deliveries)
+    while len(server.queue):
+        await asyncio.sleep(0.01)
+    elapsed = time.perf_counter() - started
+    cpu = time.process_time() - cpu
+    await server.stop()
+
+    return {
+        "elapsed_s": round(elapsed, 2),
+        "throughput_per_s": round(len(end_to_end) / elapsed, 2),
+        "cpu_ms_per_update": round(cpu / args.updates * 1000, 2),
+        "webhook": dict(summarize(webhook), errors=errors),
+        "end_to_end": summarize(end_to_end),
+        "agent_calls": test.agent.calls,
+    }
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--updates", type=int, default=300, help="synthetic updates per run")
+    parser.add_argument("--rate", type=float, default=10, help="updates per second")
+    parser.add_argument("--chats", type=int, default=100, help="chats the updates are spread over")
+    parser.add_argument("--burst", type=int, default=1, help="messages each chat sends in a row")
+    parser.add_argument("--processors", type=int, default=4, help="concurrent processor invocations")
+    parser.add_argument("--workers", type=int, default=32, help="chats the server answers at once")
+    parser.add_argument("--first-chunk", type=float, default=0.5, help="agent seconds to first chunk")
+    parser.add_argument("--chunk-interval", type=float, default=0.05, help="agent seconds between chunks")
+    parser.add_argument("--chunks", type=int, default=10, help="chunks per agent answer")
+    parser.add_argument("--json", action="store_true", help="print results as JSON")
+    args = parser.parse_args()
+    args.telegram_latency = 0.0
+    args.webhook_workers = 16
+    args.batch_window = 0.0
+
+    for key, value in LAMBDA_ENV.items():
+        os.environ.setdefault(key, value)
+    os.environ.setdefault("POWERTOOLS_LOG_LEVEL", "WARNING")
+    os.environ.setdefault("POWERTOOLS_METRICS_NAMESPACE", "Benchmark")
+    # Per-user quotas would shed the synthetic chats' bursts
+    os.environ.setdefault("ADMISSION_ENABLED", "false")
+    # The server takes all of a chat's queued updates at once and would merge
+    # more of them than SQS batches do; compare the same agent work
+    os.environ.setdefault("COALESCE_WINDOW_SECONDS", "0")
+    # Both runs send the same prompts
+    os.environ.setdefault("RESPONSE_CACHE_TTL", "0")
+
+    test = LoadTest(args)
+    report: Dict[str, Any] = {}
+    # Metrics are flushed to stdout after every invocation
+    with contextlib.redirect_stdout(io.StringIO()):
+        test.load_handlers()
+        report["lambda"] = run_lambda(test, args)
+
+        from sibyl_telegram_interface.handlers import message_processor
+        test.agent = FakeAgentRuntime(
+            first_chunk_latency=args.first_chunk,
+            chunk_interval=args.chunk_interval,
+            chunks=args.chunks,
+        )
+        message_processor.bedrock.client = test.agent
+        report["server"] = asyncio.run(run_server(test, args))
+    test.stop()
+
+    if args.json:
+        print(json.dumps(report, indent=2))
+    else:
+        for name, result in report.items():
+            print(
+                f"{name:7} throughput {result['throughput_per_s']:>7}/s  "
+                f"webhook p50 {result['webhook'].get('p50_ms')} ms p99 {result['webhook'].get('p99_ms')} ms  "
+                f"e2e p50 {result['end_to_end'].get('p50_ms')} ms p99 {result['end_to_end'].get('p99_ms')} ms  "
+                f"cpu {result['cpu_ms_per_update']} ms/update  errors {result['webhook']['errors']}"
+            )
+    failed = any(result["webhook"]["errors"] or result["end_to_end"].get("count") != args.updates
+                 for result in report.values())
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
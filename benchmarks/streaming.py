@@ -0,0 +1,116 @@
+"""Time to first token of streamed replies against buffered ones.
+
+Answers ``--replies`` prompts through ``Bedrock`` against a fake
+``bedrock-agent-runtime`` event stream and the Telegram stub, once buffered
+(``invoke_agent`` then one ``send_long_message``) and once streamed through
+``LiveMessage``. Each reply goes to its own chat so per-chat pacing does not
+add up. Both run for a multi-chunk answer and for a single-chunk one, as a
+cached answer is. Reports time until the user first sees text, time until
+the reply is complete, and Bot API calls per reply.
+
+Usage:
+    python benchmarks/streaming.py [--replies N] [--first-chunk S]
+        [--chunk-interval S] [--chunks N] [--json]
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import sys
+import time
+from pathlib import Path
+from typing import Any, Dict, List
+
+BENCHMARKS = Path(__file__).resolve().parent
+ROOT = BENCHMARKS.parent
+sys.path.insert(0, str(ROOT / "src"))
+sys.path.insert(0, str(ROOT))
+
+from loadtest import summarize  # noqa: E402
+from tests.support.fakes import FakeAgentRuntime, TelegramStub  # noqa: E402
+from tests.support.workload import BOT_TOKEN, LAMBDA_ENV  # noqa: E402
+
+
+def run_mode(args: argparse.Namespace, telegram: TelegramStub, chunks: int, streamed: bool) -> Dict[str, Any]:
+    from sibyl_telegram_interface.services.bedrock import Bedrock
+    from sibyl_telegram_interface.telegram.bot import get_bot
+    from sibyl_telegram_interface.telegram.live_message import LiveMessage
+
+    bedrock = Bedrock()
+    bedrock.client = FakeAgentRuntime(
+        first_chunk_latency=args.first_chunk, chunk_interval=args.chunk_interval, chunks=chunks
+    )
+    bot = get_bot(BOT_TOKEN)
+    calls_before = dict(telegram.calls)
+    first_text: List[float] = []
+    complete: List[float] = []
+
+    for index in range(args.replies):
+        chat_id = 200000 + index
+        started = time.perf_counter()
+        if streamed:
+            reply = LiveMessage(bot, chat_id)
+            for chunk in bedrock.stream_agent(user_id=str(index), prompt=f"Question {index}", chat_id=chat_id):
+                reply.append(chunk)
+                if reply.message_id is not None and len(first_text) == index:
+                    first_text.append(time.perf_counter() - started)
+            reply.finish()
+        else:
+            text = bedrock.invoke_agent(user_id=str(index), prompt=f"Question {index}", chat_id=chat_id)
+            bot.send_long_message(chat_id, text, parse_mode="HTML")
+        complete.append(time.perf_counter() - started)
+        if len(first_text) == index:
+            first_text.append(complete[-1])
+
+    calls = {
+        method: round((count - calls_before.get(method, 0)) / args.replies, 2)
+        for method, count in telegram.calls.items()
+        if count != calls_before.get(method, 0)
+    }
+    return {"first_text": summarize(first_text), "complete": summarize(complete), "calls_per_reply": calls}
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--replies", type=int, default=20, help="replies per mode")
+    parser.add_argument("--first-chunk", type=float, default=0.5, help="agent seconds to first chunk")
+    parser.add_argument("--chunk-interval", type=float, default=0.15, help="agent seconds between chunks")
+    parser.add_argument("--chunks", type=int, default=10, help="chunks of a streamed answer")
+    parser.add_argument("--json", action="store_true", help="print results as JSON")
+    args = parser.parse_args()
+
+    for key, value in LAMBDA_ENV.items():
+        os.environ.setdefault(key, value)
+    os.environ.setdefault("POWERTOOLS_LOG_LEVEL", "ERROR")
+    os.environ.setdefault("POWERTOOLS_METRICS_NAMESPACE", "Benchmark")
+    os.environ.setdefault("RESPONSE_CACHE_TTL", "0")
+
+    from sibyl_telegram_interface.config import settings
+    telegram = TelegramStub().start()
+    settings.TELEGRAM_API_BASE = telegram.url
+
+    report: Dict[str, Any] = {}
+    # Metric flushes print EMF documents
+    with contextlib.redirect_stdout(io.StringIO()):
+        for chunks in (args.chunks, 1):
+            for streamed in (False, True):
+                name = f"{'streamed' if streamed else 'buffered'}/{chunks} chunk{'s' if chunks > 1 else ''}"
+                report[name] = run_mode(args, telegram, chunks, streamed)
+    telegram.stop()
+
+    if args.json:
+        print(json.dumps(report, indent=2))
+    else:
+        for name, result in report.items():
+            calls = ", ".join(f"{method} {count}" for method, count in sorted(result["calls_per_reply"].items()))
+            print(
+                f"{name:20} first text p50 {result['first_text']['p50_ms']:>8} ms  "
+                f"complete p50 {result['complete']['p50_ms']:>8} ms  calls/reply: {calls}"
+            )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,108 @@
+"""Overhead of the telemetry helpers per Lambda invocation.
+
+Replays the spans and metrics each handler records for a typical invocation,
+including the EMF flush done by ``telemetry.log_metrics``, and reports the
+cost in milliseconds. With ``--check``, exits non-zero when a handler's
+telemetry exceeds its budget.
+
+Usage:
+    python benchmarks/telemetry_overhead.py [--check] [--runs N] [--json]
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import statistics
+import sys
+import time
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT / "src"))
+os.environ.setdefault("POWERTOOLS_METRICS_NAMESPACE", "Benchmark")
+
+from sibyl_telegram_interface.utils import telemetry  # noqa: E402
+
+# Records per processor batch and Bot API calls per streamed reply
+BATCH_SIZE = 10
+SENDS_PER_REPLY = 8
+
+# (metric, is_span) in the order a handler records them
+WEBHOOK: List[Tuple[str, bool]] = [
+    ("SSMFetch", True),
+    ("IPValidation", True),
+    ("SQSEnqueue", True),
+    ("UpdatesAgent", False),
+    ("WebhookLatency", False),
+]
+PROCESSOR: List[Tuple[str, bool]] = (
+    [("QueueAge", False)] * BATCH_SIZE
+    + (
+        [("BedrockTimeToFirstChunk", False)]
+        + [("TelegramSend", True)] * SENDS_PER_REPLY
+        + [("BedrockTotal", False), ("EndToEndLatency", False)]
+    ) * BATCH_SIZE
+)
+
+# Milliseconds of telemetry allowed per invocation
+BUDGET_MS = {"webhook": 0.5, "processor": 2.0}
+
+
+def invocation(events: List[Tuple[str, bool]]) -> None:
+    for name, is_span in events:
+        if is_span:
+            with telemetry.span(name):
+                pass
+        else:
+            telemetry.record(name, 1.0)
+
+
+def time_invocation(events: List[Tuple[str, bool]]) -> float:
+    """Get the milliseconds one invocation spends on telemetry, flush included."""
+    handler = telemetry.log_metrics(lambda event, context: invocation(events))
+    with contextlib.redirect_stdout(io.StringIO()):
+        started = time.perf_counter()
+        handler({}, None)
+        return (time.perf_counter() - started) * 1000
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--check", action="store_true", help="fail when over budget")
+    parser.add_argument("--runs", type=int, default=200, help="invocations per handler")
+    parser.add_argument("--json", action="store_true", help="print results as JSON")
+    args = parser.parse_args()
+
+    report: Dict[str, Dict[str, float]] = {}
+    over_budget = []
+    for name, events in (("webhook", WEBHOOK), ("processor", PROCESSOR)):
+        per_invocation = statistics.median(time_invocation(events) for _ in range(args.runs))
+        report[name] = {
+            "events": len(events),
+            "ms_per_invocation": round(per_invocation, 3),
+            "us_per_event": round(per_invocation * 1000 / len(events), 2),
+            "budget_ms": BUDGET_MS[name],
+        }
+        if per_invocation > BUDGET_MS[name]:
+            over_budget.append(name)
+
+    if args.json:
+        print(json.dumps(report, indent=2))
+    else:
+        for name, entry in report.items():
+            print(
+                f"{name}: {entry['ms_per_invocation']} ms for {entry['events']} events, "
+                f"{entry['us_per_event']} us/event (budget {entry['budget_ms']} ms)"
+            )
+
+    if args.check and over_budget:
+        print(f"Over telemetry budget: {', '.join(over_budget)}", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
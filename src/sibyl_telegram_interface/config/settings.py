@@ -11,3 +11,159 @@ MAX_MESSAGE_LENGTH = 4096
 
 # Environment
 ENVIRONMENT = os.getenv("ENVIRONMENT", "dev")
+
+# Streaming replies: minimum seconds between edits of a live message and
+# minimum new characters before an edit is worth sending
+LIVE_EDIT_MIN_INTERVAL = float(os.getenv("LIVE_EDIT_MIN_INTERVAL", "1.0"))
+LIVE_EDIT_MIN_CHARS = int(os.getenv("LIVE_EDIT_MIN_CHARS", "40"))
+
+# Maximum number of chats processed concurrently within one SQS batch
+PROCESSOR_MAX_CONCURRENCY = int(os.getenv("PROCESSOR_MAX_CONCURRENCY", "10"))
+
+# Telegram Bot API HTTP client
+TELEGRAM_POOL_SIZE = int(os.getenv("TELEGRAM_POOL_SIZE", "10"))
+TELEGRAM_CONNECT_TIMEOUT = float(os.getenv("TELEGRAM_CONNECT_TIMEOUT", "3.05"))
+TELEGRAM_READ_TIMEOUT = float(os.getenv("TELEGRAM_READ_TIMEOUT", "10"))
+TELEGRAM_MAX_RETRIES = int(os.getenv("TELEGRAM_MAX_RETRIES", "2"))
+TELEGRAM_BACKOFF_BASE = float(os.getenv("TELEGRAM_BACKOFF_BASE", "0.5"))
+# Longest wait before a retry; a 429 asking for longer is returned to the caller
+TELEGRAM_MAX_RETRY_WAIT = float(os.getenv("TELEGRAM_MAX_RETRY_WAIT", "5"))
+
+# SSM parameter cache: seconds a value stays fresh, and seconds a stale value
+# is served after a failed refresh before trying again
+PARAMETER_CACHE_TTL = float(os.getenv("PARAMETER_CACHE_TTL", "300"))
+PARAMETER_CACHE_ERROR_BACKOFF = float(os.getenv("PARAMETER_CACHE_ERROR_BACKOFF", "10"))
+
+# Webhook source validation. Ranges are comma-separated CIDRs; when the SSM
+# parameter path is set, ranges are loaded from it and hot-reloaded.
+TELEGRAM_IP_RANGES = os.getenv("TELEGRAM_IP_RANGES", "149.154.160.0/20,91.108.4.0/22")
+TELEGRAM_IP_RANGES_PARAM_PATH = os.getenv("TELEGRAM_IP_RANGES_PARAM_PATH", "")
+TRUSTED_PROXY_HOPS = int(os.getenv("TRUSTED_PROXY_HOPS", "0"))
+# SSM parameter holding the webhook secret token; empty disables the check
+WEBHOOK_SECRET_PARAM_PATH = os.getenv("WEBHOOK_SECRET_PARAM_PATH", "")
+
+# Sibyl Core user lookup cache (entries, seconds, seconds for not-found users)
+USER_CACHE_SIZE = int(os.getenv("USER_CACHE_SIZE", "1024"))
+USER_CACHE_TTL = float(os.getenv("USER_CACHE_TTL", "300"))
+USER_CACHE_NEGATIVE_TTL = float(os.getenv("USER_CACHE_NEGATIVE_TTL", "30"))
+
+# Update deduplication. With a table name, claims are shared through DynamoDB;
+# otherwise they only cover the current warm container. A claim must outlast
+# the processor invocation holding it (its Timeout) and lapse before SQS
+# redelivers the record (the queue's VisibilityTimeout).
+DEDUP_TABLE_NAME = os.getenv("DEDUP_TABLE_NAME", "")
+DEDUP_CACHE_SIZE = int(os.getenv("DEDUP_CACHE_SIZE", "10000"))
+DEDUP_LEASE_SECONDS = float(os.getenv("DEDUP_LEASE_SECONDS", "60"))
+DEDUP_TTL_SECONDS = float(os.getenv("DEDUP_TTL_SECONDS", "86400"))
+
+# Agent response cache, off by default (TTL 0). Entries are keyed on the
+# session and prompt only, so enable it only for agents whose answers do not
+# depend on earlier turns: a repeated "yes" would get the previous answer.
+RESPONSE_CACHE_TTL = float(os.getenv("RESPONSE_CACHE_TTL", "0"))
+RESPONSE_CACHE_SIZE = int(os.getenv("RESPONSE_CACHE_SIZE", "512"))
+
+# Outbound pacing per Telegram's limits: about 1 message/second per chat and
+# 30/second overall. Sends wait at most TELEGRAM_MAX_QUEUE_DELAY seconds.
+TELEGRAM_CHAT_RATE = float(os.getenv("TELEGRAM_CHAT_RATE", "1"))
+TELEGRAM_CHAT_BURST = float(os.getenv("TELEGRAM_CHAT_BURST", "3"))
+TELEGRAM_GLOBAL_RATE = float(os.getenv("TELEGRAM_GLOBAL_RATE", "30"))
+TELEGRAM_GLOBAL_BURST = float(os.getenv("TELEGRAM_GLOBAL_BURST", "30"))
+TELEGRAM_MAX_QUEUE_DELAY = float(os.getenv("TELEGRAM_MAX_QUEUE_DELAY", "10"))
+
+# Agent sessions: a new session starts after SESSION_IDLE_SECONDS without a
+# turn or after SESSION_MAX_TURNS turns (0 disables either limit). With a
+# table name, the mapping is shared through DynamoDB.
+SESSION_IDLE_SECONDS = float(os.getenv("SESSION_IDLE_SECONDS", "1800"))
+SESSION_MAX_TURNS = int(os.getenv("SESSION_MAX_TURNS", "40"))
+SESSION_TABLE_NAME = os.getenv("SESSION_TABLE_NAME", "")
+SESSION_CACHE_SIZE = int(os.getenv("SESSION_CACHE_SIZE", "4096"))
+
+# Processor deadline, derived from the Lambda remaining time: seconds kept to
+# return the batch response, minimum seconds left to start a record, and
+# seconds left when waiting on the agent stops in favor of a "still
+# thinking" reply and a retry
+DEADLINE_SAFETY_MARGIN = float(os.getenv("DEADLINE_SAFETY_MARGIN", "2"))
+DEADLINE_MIN_START = float(os.getenv("DEADLINE_MIN_START", "15"))
+DEADLINE_REPLY_RESERVE = float(os.getenv("DEADLINE_REPLY_RESERVE", "5"))
+
+# Upper bounds for single calls; within an invocation they are further
+# capped by its deadline
+BEDROCK_CONNECT_TIMEOUT = float(os.getenv("BEDROCK_CONNECT_TIMEOUT", "2"))
+BEDROCK_READ_TIMEOUT = float(os.getenv("BEDROCK_READ_TIMEOUT", "55"))
+SIBYL_CORE_TIMEOUT = float(os.getenv("SIBYL_CORE_TIMEOUT", "3"))
+
+# Telemetry: CloudWatch namespace for EMF metrics, and X-Ray subsegments for
+# spans (needs aws-xray-sdk and active tracing)
+METRICS_NAMESPACE = os.getenv("POWERTOOLS_METRICS_NAMESPACE", "SibylTelegram")
+TRACING_ENABLED = os.getenv("TRACING_ENABLED", "false").lower() == "true"
+METRICS_SERVICE = os.getenv("POWERTOOLS_SERVICE_NAME", "")
+
+# Threads running blocking client calls for the async API
+ASYNC_IO_THREADS = int(os.getenv("ASYNC_IO_THREADS", "32"))
+
+# Message bursts: consecutive plain messages from one sender, sent at most
+# COALESCE_WINDOW_SECONDS apart and delivered in the same batch, are answered
+# as one agent turn of up to COALESCE_MAX_MESSAGES messages (0 disables).
+# Only records of one batch are merged: a burst split across two batches is
+# answered twice. The stack sets this and the SQS batching window from the
+# same BurstWindowSeconds parameter.
+COALESCE_WINDOW_SECONDS = float(os.getenv("COALESCE_WINDOW_SECONDS", "2"))
+COALESCE_MAX_MESSAGES = int(os.getenv("COALESCE_MAX_MESSAGES", "10"))
+
+# Agent endpoints in order of preference, as comma-separated
+# region:agent_id:alias_id (default: AGENT_ID and AGENT_ALIAS_ID in
+# us-east-1). Throttled or failing requests fail over to the next endpoint.
+# A request still waiting for its first chunk after the
+# AGENT_HEDGE_PERCENTILE latency of its endpoint, and at least
+# AGENT_HEDGE_MIN_DELAY seconds, is also sent to the next endpoint, for at
+# most AGENT_HEDGE_MAX_RATIO of requests (percentile 0 disables hedging). An
+# endpoint is skipped for AGENT_CIRCUIT_RESET_SECONDS after
+# AGENT_CIRCUIT_FAILURES consecutive failures.
+AGENT_ENDPOINTS = os.getenv("AGENT_ENDPOINTS", "")
+AGENT_HEDGE_PERCENTILE = float(os.getenv("AGENT_HEDGE_PERCENTILE", "0"))
+AGENT_HEDGE_MIN_DELAY = float(os.getenv("AGENT_HEDGE_MIN_DELAY", "1"))
+AGENT_HEDGE_MAX_RATIO = float(os.getenv("AGENT_HEDGE_MAX_RATIO", "0.05"))
+AGENT_CIRCUIT_FAILURES = int(os.getenv("AGENT_CIRCUIT_FAILURES", "5"))
+AGENT_CIRCUIT_RESET_SECONDS = float(os.getenv("AGENT_CIRCUIT_RESET_SECONDS", "30"))
+
+# Webhook admission control. The expected wait in the queue is estimated
+# from its depth and, in CloudWatch, the recent queue age and agent turn
+# time, refreshed every ADMISSION_REFRESH_SECONDS. Queue depth becomes a
+# wait assuming ADMISSION_PROCESSING_SLOTS records are processed at once and
+# turns take ADMISSION_TURN_SECONDS until CloudWatch reports otherwise.
+# Beyond ADMISSION_DEGRADE_SECONDS of wait, updates are queued with a busy
+# notice (once per chat per ADMISSION_NOTICE_SECONDS); beyond
+# ADMISSION_SHED_SECONDS they are declined. Each user may enqueue
+# ADMISSION_USER_RATE updates per second, in bursts of ADMISSION_USER_BURST;
+# a rate of 0 turns the per-user quota off.
+ADMISSION_ENABLED = os.getenv("ADMISSION_ENABLED", "true").lower() == "true"
+ADMISSION_REFRESH_SECONDS = float(os.getenv("ADMISSION_REFRESH_SECONDS", "15"))
+ADMISSION_PROCESSING_SLOTS = int(os.getenv("ADMISSION_PROCESSING_SLOTS", "10"))
+ADMISSION_TURN_SECONDS = float(os.getenv("ADMISSION_TURN_SECONDS", "10"))
+ADMISSION_DEGRADE_SECONDS = float(os.getenv("ADMISSION_DEGRADE_SECONDS", "60"))
+ADMISSION_SHED_SECONDS = float(os.getenv("ADMISSION_SHED_SECONDS", "300"))
+ADMISSION_NOTICE_SECONDS = float(os.getenv("ADMISSION_NOTICE_SECONDS", "300"))
+ADMISSION_USER_RATE = float(os.getenv("ADMISSION_USER_RATE", "0.2"))
+ADMISSION_USER_BURST = float(os.getenv("ADMISSION_USER_BURST", "10"))
+
+# Server mode, where one long-running process serves the webhook and
+# processes updates from an in-process queue instead of SQS. Each process
+# holds up to SERVER_QUEUE_SIZE updates and answers SERVER_WORKERS chats at
+# once. A failed update is retried after SERVER_RETRY_DELAY seconds, up to
+# SERVER_MAX_ATTEMPTS times. On shutdown, queued updates get
+# SERVER_DRAIN_SECONDS to finish. Metrics are flushed every
+# SERVER_METRICS_INTERVAL seconds.
+SERVER_WORKERS = int(os.getenv("SERVER_WORKERS", "32"))
+SERVER_QUEUE_SIZE = int(os.getenv("SERVER_QUEUE_SIZE", "1000"))
+SERVER_RETRY_DELAY = float(os.getenv("SERVER_RETRY_DELAY", "5"))
+SERVER_MAX_ATTEMPTS = int(os.getenv("SERVER_MAX_ATTEMPTS", "3"))
+SERVER_DRAIN_SECONDS = float(os.getenv("SERVER_DRAIN_SECONDS", "30"))
+SERVER_METRICS_INTERVAL = float(os.getenv("SERVER_METRICS_INTERVAL", "60"))
+
+# Polling ingestion, for running without a public webhook URL. Each
+# getUpdates call waits up to POLL_TIMEOUT seconds for updates and returns
+# at most POLL_LIMIT of them. After a failed call or batch, polling resumes
+# after POLL_RETRY_DELAY seconds.
+POLL_TIMEOUT = int(os.getenv("POLL_TIMEOUT", "25"))
+POLL_LIMIT = int(os.getenv("POLL_LIMIT", "100"))
+POLL_RETRY_DELAY = float(os.getenv("POLL_RETRY_DELAY", "1"))
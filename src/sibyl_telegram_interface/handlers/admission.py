@@ -0,0 +1,293 @@
+"""Admission control for updates entering the queue.
+
+When the agent slows down, the queue grows and replies arrive minutes late.
+The webhook asks an :class:`AdmissionController` before enqueuing an
+update. It accepts the update, accepts it with a notice that the reply will
+take a while, or declines it. The decision uses a cached estimate of the
+queue wait and a token bucket per user. The estimate is refreshed on a
+background thread at most every ``ADMISSION_REFRESH_SECONDS``, so no
+request waits on SQS or CloudWatch; until the first refresh finishes,
+updates are admitted on quotas alone.
+"""
+
+import threading
+import time
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from aws_lambda_powertools import Logger
+
+from ..config import settings
+from ..telegram.scheduler import TokenBucket
+from ..utils.cache import LRUCache
+
+logger = Logger()
+
+ADMIT = "admit"
+DEGRADE = "degrade"
+SHED = "shed"
+
+BUSY_NOTICE = "I'm busier than usual, so my reply may take a few minutes. Your message is in the queue."
+SHED_REPLY = "I'm getting too many messages right now and can't take yours. Please try again in a few minutes."
+QUOTA_REPLY = "You're sending messages faster than I can answer. Please wait a moment before sending more."
+
+# Users and chats tracked before the least recently seen are forgotten
+_MAX_TRACKED = 10000
+
+
+def _start_thread(target: Callable[[], None]) -> None:
+    threading.Thread(target=target, daemon=True).start()
+
+
+class LoadEstimate:
+    """Snapshot of the processor backlog."""
+
+    __slots__ = ("depth", "queue_age", "turn_seconds")
+
+    def __init__(self, depth: int, queue_age: Optional[float], turn_seconds: float):
+        """Initialize the estimate.
+
+        Args:
+            depth: Messages waiting in the queue, including delayed ones
+            queue_age: Recent seconds between enqueue and processing, if known
+            turn_seconds: Recent seconds per agent turn
+        """
+        self.depth = depth
+        self.queue_age = queue_age
+        self.turn_seconds = turn_seconds
+
+    def wait(self, slots: int) -> float:
+        """Get the expected seconds a new update waits before it is processed.
+
+        Args:
+            slots: Records the processors work on at once
+        """
+        drain = self.depth * self.turn_seconds / max(1, slots)
+        return max(drain, self.queue_age or 0.0)
+
+    def __repr__(self) -> str:
+        return (
+            f"LoadEstimate(depth={self.depth!r}, queue_age={self.queue_age!r}, "
+            f"turn_seconds={self.turn_seconds!r})"
+        )
+
+
+class LoadMonitor:
+    """Cached view of the queue depth and the processor's recent latency.
+
+    The depth comes from the queue attributes. The queue age and agent turn
+    time come from the ``QueueAge`` and ``BedrockTotal`` metrics the
+    processor publishes. When a source fails, its previous value is kept.
+    Refreshes run off the caller's thread; in Lambda, one started late in an
+    invocation may only finish when the environment is thawed for the next.
+    """
+
+    def __init__(
+        self,
+        sqs_client: Any,
+        queue_url: str,
+        cloudwatch_client: Optional[Any] = None,
+        refresh_seconds: float = settings.ADMISSION_REFRESH_SECONDS,
+        clock: Callable[[], float] = time.monotonic,
+        spawn: Callable[[Callable[[], None]], None] = _start_thread
+    ):
+        """Initialize the monitor.
+
+        Args:
+            sqs_client: boto3 SQS client
+            queue_url: URL of the update queue
+            cloudwatch_client: boto3 CloudWatch client, created on first use
+                if omitted
+            refresh_seconds: Seconds an estimate is reused
+            clock: Monotonic time source
+            spawn: Runs a refresh, on a new daemon thread by default
+        """
+        self.sqs_client = sqs_client
+        self.queue_url = queue_url
+        self._cloudwatch = cloudwatch_client
+        self.refresh_seconds = refresh_seconds
+        self.clock = clock
+        self.spawn = spawn
+        self.refreshes = 0
+        self._estimate: Optional[LoadEstimate] = None
+        self._expires_at = 0.0
+        self._lock = threading.Lock()
+
+    @property
+    def cloudwatch(self) -> Any:
+        if self._cloudwatch is None:
+            import boto3
+            self._cloudwatch = boto3.client('cloudwatch')
+        return self._cloudwatch
+
+    def estimate(self) -> Optional[LoadEstimate]:
+        """Get the current estimate without waiting for a refresh.
+
+        A stale estimate starts a refresh, one at a time, and is returned
+        meanwhile. Returns None until a first refresh succeeds.
+        """
+        if self.clock() >= self._expires_at and self._lock.acquire(blocking=False):
+            if self.clock() < self._expires_at:
+                self._lock.release()
+            else:
+                try:
+                    self.spawn(self._refresh_and_release)
+                except Exception as e:
+                    self._lock.release()
+                    logger.warning(f"Failed to start load refresh: {str(e)}")
+        return self._estimate
+
+    def _refresh_and_release(self) -> None:
+        try:
+            self._refresh()
+        finally:
+            self._lock.release()
+
+    def _refresh(self) -> None:
+        previous = self._estimate
+        self._expires_at = self.clock() + self.refresh_seconds
+        self.refreshes += 1
+        depth = previous.depth if previous else None
+        try:
+            attributes = self.sqs_client.get_queue_attributes(
+                QueueUrl=self.queue_url,
+                AttributeNames=['ApproximateNumberOfMessages', 'ApproximateNumberOfMessagesDelayed']
+            )['Attributes']
+            depth = (
+                int(attributes.get('ApproximateNumberOfMessages', 0))
+                + int(attributes.get('ApproximateNumberOfMessagesDelayed', 0))
+            )
+        except Exception as e:
+            logger.warning(f"Failed to read queue depth: {str(e)}")
+
+        queue_age = previous.queue_age if previous else None
+        turn_seconds = previous.turn_seconds if previous else settings.ADMISSION_TURN_SECONDS
+        try:
+            latest = self._latest_metrics()
+            if 'QueueAge' in latest:
+                queue_age = latest['QueueAge'] / 1000
+            if 'BedrockTotal' in latest:
+                turn_seconds = latest['BedrockTotal'] / 1000
+        except Exception as e:
+            logger.warning(f"Failed to read processor metrics: {str(e)}")
+
+        if depth is not None:
+            self._estimate = LoadEstimate(depth, queue_age, turn_seconds)
+
+    def _latest_metrics(self) -> Dict[str, float]:
+        """Get the latest per-minute average of the processor's latency metrics, in ms."""
+        dimensions = [{'Name': 'service', 'Value': settings.METRICS_SERVICE}] if settings.METRICS_SERVICE else []
+        end = time.time()
+        response = self.cloudwatch.get_metric_data(
+            MetricDataQueries=[
+                {
+                    'Id': name.lower(),
+                    'Label': name,
+                    'MetricStat': {
+                        'Metric': {
+                            'Namespace': settings.METRICS_NAMESPACE,
+                            'MetricName': name,
+                            'Dimensions': dimensions
+                        },
+                        'Period': 60,
+                        'Stat': 'Average'
+                    }
+                }
+                for name in ('QueueAge', 'BedrockTotal')
+            ],
+            StartTime=end - 300,
+            EndTime=end,
+            ScanBy='TimestampDescending'
+        )
+        return {
+            result['Label']: result['Values'][0]
+            for result in response.get('MetricDataResults', [])
+            if result.get('Values')
+        }
+
+
+class AdmissionController:
+    """Decides whether an update is admitted to the queue."""
+
+    def __init__(
+        self,
+        monitor: Optional[LoadMonitor],
+        enabled: bool = settings.ADMISSION_ENABLED,
+        slots: int = settings.ADMISSION_PROCESSING_SLOTS,
+        degrade_after: float = settings.ADMISSION_DEGRADE_SECONDS,
+        shed_after: float = settings.ADMISSION_SHED_SECONDS,
+        notice_interval: float = settings.ADMISSION_NOTICE_SECONDS,
+        user_rate: float = settings.ADMISSION_USER_RATE,
+        user_burst: float = settings.ADMISSION_USER_BURST,
+        clock: Callable[[], float] = time.monotonic
+    ):
+        """Initialize the controller.
+
+        Args:
+            monitor: Source of backlog estimates; None admits regardless of load
+            enabled: Whether to apply any control at all
+            slots: Records the processors work on at once
+            degrade_after: Expected wait in seconds from which users are warned
+            shed_after: Expected wait in seconds from which updates are declined
+            notice_interval: Minimum seconds between busy notices to a chat,
+                and between quota notices to a user
+            user_rate: Updates per second a user may enqueue; 0 turns the
+                per-user quota off
+            user_burst: Updates a user may enqueue back to back
+            clock: Monotonic time source
+        """
+        self.monitor = monitor
+        self.enabled = enabled
+        self.slots = slots
+        self.degrade_after = degrade_after
+        self.shed_after = shed_after
+        self.user_rate = user_rate
+        self.user_burst = user_burst
+        self.clock = clock
+        if user_rate < 0:
+            raise ValueError(f"user_rate must not be negative, got {user_rate}")
+        # A bucket left alone this long is full again and can be dropped
+        self._users = LRUCache(maxsize=_MAX_TRACKED, ttl=user_burst / user_rate if user_rate else 0, clock=clock)
+        self._notified = LRUCache(maxsize=_MAX_TRACKED, ttl=notice_interval, clock=clock)
+        self._lock = threading.Lock()
+
+    def decide(self, user_id: int, chat_id: int) -> Tuple[str, Optional[str]]:
+        """Decide what to do with a user's update.
+
+        Returns:
+            ADMIT, DEGRADE or SHED, and the text to reply with right away,
+            if any
+        """
+        if not self.enabled:
+            return ADMIT, None
+
+        estimate = self.monitor.estimate() if self.monitor is not None else None
+        wait = estimate.wait(self.slots) if estimate is not None else 0.0
+        if wait >= self.shed_after:
+            return SHED, SHED_REPLY
+
+        if self.user_rate and not self._take_quota(user_id):
+            return SHED, self._notice(("quota", user_id), QUOTA_REPLY)
+
+        if wait >= self.degrade_after:
+            return DEGRADE, self._notice(("busy", chat_id), BUSY_NOTICE)
+        return ADMIT, None
+
+    def _take_quota(self, user_id: int) -> bool:
+        """Take one update from the user's quota, if any is left."""
+        now = self.clock()
+        with self._lock:
+            bucket = self._users.get(user_id)
+            if bucket is None:
+                bucket = TokenBucket(self.user_rate, self.user_burst, now)
+            if bucket.wait_time(now) > 0:
+                return False
+            bucket.take(now)
+            self._users.set(user_id, bucket)
+        return True
+
+    def _notice(self, key: Tuple[str, int], text: str) -> Optional[str]:
+        """Get a notice text unless it was already given for the key within the notice interval."""
+        if key in self._notified:
+            return None
+        self._notified.set(key, True)
+        return text
@@ -1,34 +1,119 @@
 """Handle incoming Telegram webhook requests."""
 
 import json
-from typing import Dict, Any
+import threading
+import time
+from typing import Dict, Any, List, Optional, Tuple
 
 from aws_lambda_powertools import Logger
 import boto3
 import os
 
-from ..telegram.bot import TelegramBot
-from ..telegram.models import TelegramMessage
-from ..utils.ssm import get_bot_token
+from ..telegram.bot import TelegramBot, get_bot
+from ..telegram.models import TelegramUpdate
+from ..telegram.allowlist import verify_secret_token
+from ..services.queue import UpdateQueue
+from .admission import SHED, AdmissionController, LoadMonitor
+from .routing import ROUTE_AGENT, ROUTE_IGNORE, classify_update, webhook_reply
+from ..utils import json_codec, telemetry
+from ..utils.ssm import get_bot_token, get_webhook_secret, invalidate_bot_token
 
 logger = Logger()
-sqs = boto3.client('sqs')
+# Created on first use, so that importing this module (as the local server
+# and poller do) needs no AWS region or credentials
+_sqs_client = None
+_update_queue: Optional[UpdateQueue] = None
+_admission: Optional[AdmissionController] = None
+_clients_lock = threading.Lock()
+
+# Outcomes of an update reported back to Telegram
+STATUS_IGNORED = 'Ignored'
+STATUS_REPLIED = 'Replied'
+STATUS_SHED = 'Shed'
+STATUS_QUEUED = 'Message queued for processing'
+
+def get_sqs_client() -> Any:
+    """Get the shared SQS client, creating it on first use."""
+    global _sqs_client
+    if _sqs_client is None:
+        with _clients_lock:
+            if _sqs_client is None:
+                _sqs_client = boto3.client('sqs')
+    return _sqs_client
+
+def get_update_queue() -> UpdateQueue:
+    """Get the SQS update queue, creating it on first use."""
+    global _update_queue
+    if _update_queue is None:
+        client = get_sqs_client()
+        with _clients_lock:
+            if _update_queue is None:
+                _update_queue = UpdateQueue(os.environ.get('SQS_QUEUE_URL', ''), client)
+    return _update_queue
+
+def get_admission() -> AdmissionController:
+    """Get the admission controller watching the SQS update queue, creating it on first use."""
+    global _admission
+    if _admission is None:
+        queue = get_update_queue()
+        with _clients_lock:
+            if _admission is None:
+                _admission = AdmissionController(LoadMonitor(queue.client, queue.queue_url))
+    return _admission
 
 @logger.inject_lambda_context
+@telemetry.log_metrics
 def lambda_handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
     """Handle incoming Telegram webhook requests."""
+    return handle_webhook(event)
+
+def handle_webhook(
+    event: Dict[str, Any],
+    queue: Optional[Any] = None,
+    controller: Optional[AdmissionController] = None
+) -> Dict[str, Any]:
+    """Validate a webhook request and enqueue the update it carries.
+
+    Args:
+        event: Lambda function URL event, or a request shaped like one
+        queue: Queue the update is put on, the SQS update queue by default
+        controller: Admission control applied before enqueuing
+
+    Returns:
+        Function URL response with the status code and body
+    """
+    started = time.perf_counter()
     try:
-        # Extract request IP and validate
-        request_ip = event.get("headers", {}).get("x-forwarded-for")
-        request_port = event.get("headers", {}).get("x-forwarded-port")
-        bot = TelegramBot(get_bot_token())
-        
-        if not request_ip or not bot.validate_telegram_ip(request_ip):
-            logger.warning(f"Invalid request IP: {request_ip}")
-            return {
-                'statusCode': 403,
-                'body': json.dumps({'error': 'Forbidden'})
-            }
+        headers = event.get("headers", {})
+        request_port = headers.get("x-forwarded-port")
+        with telemetry.span("SSMFetch"):
+            bot = get_bot(get_bot_token(), on_unauthorized=invalidate_bot_token)
+            webhook_secret = get_webhook_secret()
+
+        # Verify the webhook secret token when configured, otherwise fall back
+        # to validating the source IP against Telegram's ranges
+        if webhook_secret:
+            if not verify_secret_token(headers.get("x-telegram-bot-api-secret-token"), webhook_secret):
+                logger.warning("Invalid webhook secret token")
+                return {
+                    'statusCode': 403,
+                    'body': json.dumps({'error': 'Forbidden'})
+                }
+        else:
+            # The source address is the peer itself; only the forwarded
+            # header has trusted proxy hops to skip
+            request_ip = event.get("requestContext", {}).get("http", {}).get("sourceIp")
+            forwarded = not request_ip
+            if forwarded:
+                request_ip = headers.get("x-forwarded-for")
+            with telemetry.span("IPValidation"):
+                valid_ip = bool(request_ip) and bot.validate_telegram_ip(request_ip, forwarded=forwarded)
+            if not valid_ip:
+                logger.warning(f"Invalid request IP: {request_ip}")
+                return {
+                    'statusCode': 403,
+                    'body': json.dumps({'error': 'Forbidden'})
+                }
 
         if not request_port or not bot.validate_telegram_port(request_port):
             logger.warning(f"Invalid request port: {request_port}")
@@ -37,35 +122,23 @@ def lambda_handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
                 'body': json.dumps({'error': 'Forbidden'})
             }
 
-        # Parse and validate the incoming message
-        body = json.loads(event.get('body', '{}'))
-        message = TelegramMessage(
-            message=body.get('message', {}),
-            user_id=body.get('message', {}).get('from', {}).get('id'),
-            chat_id=body.get('message', {}).get('chat', {}).get('id')
-        )
-
-        if not message.validate_message_length():
-            logger.warning(f"Message too long: {len(message)} characters")
-            bot.send_message(message.chat_id, "Error: your message is too long.")
-            return {
-                'statusCode': 400,
-                'body': json.dumps({'error': 'Message too long'})
-            }
+        queue = queue if queue is not None else get_update_queue()
+        controller = controller if controller is not None else get_admission()
+        body = json_codec.loads(event.get('body') or '{}')
+        route, status, reply = route_update(body, queue, controller)
 
-        # Instead of processing here, send to SQS for async processing
-        tg_process_queue_name = os.environ.get('SQS_QUEUE_URL')
-        sqs.send_message(
-            QueueUrl=tg_process_queue_name,
-            MessageBody=json.dumps({
-                'message': message.dict()
-            })
-        )
+        if status == STATUS_QUEUED:
+            # Instead of processing here, send to SQS for async processing
+            with telemetry.span("SQSEnqueue"):
+                queue.flush()
 
         # Immediately return success to Telegram
+        _log_route(route, started)
+        if reply:
+            return webhook_reply(*reply)
         return {
             'statusCode': 200,
-            'body': json.dumps({'status': 'Message queued for processing'})
+            'body': json.dumps({'status': status})
         }
 
     except Exception as e:
@@ -74,3 +147,98 @@ def lambda_handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
             'statusCode': 500,
             'body': json.dumps({'error': 'Internal server error'})
         }
+
+def ingest_batch(
+    bot: TelegramBot,
+    updates: List[Dict[str, Any]],
+    queue: Optional[Any] = None,
+    controller: Optional[AdmissionController] = None
+) -> None:
+    """Route a batch of polled updates and enqueue those for the agent together.
+
+    The queue sends the batch with as few SendMessageBatch calls as it can.
+    Replies that need no agent are sent once the batch is enqueued.
+
+    Args:
+        bot: Bot sending the replies
+        updates: Bot API updates from getUpdates
+        queue: Queue the updates are put on, the SQS update queue by default
+        controller: Admission control applied before enqueuing
+
+    Raises:
+        EnqueueError: If the queue rejected updates; the batch should be
+            fetched again
+    """
+    queue = queue if queue is not None else get_update_queue()
+    controller = controller if controller is not None else get_admission()
+    started = time.perf_counter()
+    routes: List[str] = []
+    replies: List[Tuple[int, str]] = []
+    queued = False
+    for body in updates:
+        try:
+            route, status, reply = route_update(body, queue, controller)
+        except (KeyError, TypeError, ValueError) as e:
+            logger.error(f"Malformed update {body.get('update_id')}: {str(e)}")
+            continue
+        routes.append(route)
+        queued = queued or status == STATUS_QUEUED
+        if reply:
+            replies.append(reply)
+
+    if queued:
+        with telemetry.span("SQSEnqueue"):
+            queue.flush()
+    for route in routes:
+        _log_route(route, started)
+
+    for chat_id, text in replies:
+        try:
+            bot.send_message(chat_id, text)
+        except Exception as e:
+            logger.warning(f"Failed to send reply to chat {chat_id}: {str(e)}")
+
+def route_update(
+    body: Dict[str, Any],
+    queue: Any,
+    controller: AdmissionController
+) -> Tuple[str, str, Optional[Tuple[int, str]]]:
+    """Decide what an update needs and put it on the queue if it needs the agent.
+
+    The queue is not flushed, so the caller can send several updates at once.
+
+    Returns:
+        The route, the status of the update, and the chat and text of a
+        reply to send right away, if any
+    """
+    # Decide whether the update needs the agent at all
+    raw_message = body.get('message') or {}
+    route, reply = classify_update(raw_message)
+
+    if route == ROUTE_IGNORE:
+        return route, STATUS_IGNORED, None
+
+    if route != ROUTE_AGENT:
+        return route, STATUS_REPLIED, (raw_message['chat']['id'], reply)
+
+    update = TelegramUpdate.from_update(body)
+
+    # Keep the backlog bounded and one user from crowding out the others
+    decision, notice = controller.decide(update.user_id, update.chat_id)
+    telemetry.count(f"Admission{decision.capitalize()}")
+    if decision == SHED:
+        logger.info("Update shed", extra={'user_id': update.user_id, 'chat_id': update.chat_id})
+        return route, STATUS_SHED, (update.chat_id, notice) if notice else None
+
+    queue.put(update.to_wire(), chat_id=update.chat_id, update_id=update.update_id)
+    return route, STATUS_QUEUED, (update.chat_id, notice) if notice else None
+
+def _log_route(route: str, started: float) -> None:
+    """Log and record the path an update took and the webhook latency for it."""
+    latency_ms = (time.perf_counter() - started) * 1000
+    telemetry.count(f"Updates{route.capitalize()}")
+    telemetry.record("WebhookLatency", latency_ms)
+    logger.info("Update routed", extra={
+        'route': route,
+        'latency_ms': round(latency_ms, 2)
+    })
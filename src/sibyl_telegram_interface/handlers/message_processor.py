@@ -1,82 +1,502 @@
 """Process Telegram messages from SQS queue."""
 
-import json
-from typing import Dict, Any
-import boto3
+import asyncio
+import contextvars
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Any, List, Tuple
 from botocore.config import Config
 import logging
 
 from aws_lambda_powertools import Logger
 from aws_lambda_powertools.utilities.typing import LambdaContext
-from aws_lambda_powertools.utilities.parameters import get_parameter
 
-from ..telegram.bot import TelegramBot
-from ..telegram.models import TelegramMessage
-from ..config.settings import BOT_TOKEN_PARAM_PATH
-from ..services.sibyl_core import SibylCoreService
-from ..services.bedrock import Bedrock
+from ..telegram.bot import AsyncTelegramBot, TelegramBot, get_bot
+from ..telegram.live_message import LiveMessage
+from ..telegram.models import TelegramUpdate
+from ..config import settings
+from ..config.settings import PROCESSOR_MAX_CONCURRENCY
+from ..services.bedrock import AsyncBedrock, Bedrock
+from ..services.dedup import CLAIMED, STATUS_IN_PROGRESS, UpdateInProgress, create_dedup_store
+from ..services.queue import release_records
+from ..utils import json_codec, telemetry
+from ..utils.aio import run_sync
+from ..utils.deadline import Deadline, DeadlineExceeded, current, deadline_scope
+from .routing import RESET_COMMAND, RESET_REPLY, command_of
+from ..utils.ssm import get_bot_token, invalidate_bot_token
 
-# Configure logging
+# Configure logging. The level comes from POWERTOOLS_LOG_LEVEL, and
+# POWERTOOLS_LOGGER_SAMPLE_RATE turns on debug logs for a share of invocations.
 logger = Logger()
-logger.setLevel(logging.INFO)
 
-# Configure boto3 with performance optimizations
+STILL_THINKING_REPLY = "Still thinking about this one, I'll get back to you shortly."
+
+# Configure boto3 with performance optimizations. The read timeout bounds the
+# wait for the next chunk of an agent stream; the invocation deadline bounds
+# the whole call.
 boto_config = Config(
-    connect_timeout=2,
-    read_timeout=2,
+    connect_timeout=settings.BEDROCK_CONNECT_TIMEOUT,
+    read_timeout=settings.BEDROCK_READ_TIMEOUT,
     parameter_validation=False,  # Skip parameter validation for speed
     retries={'max_attempts': 2}  # Reduce retry attempts
 )
 
-# Initialize clients outside handler for connection reuse
-ssm_client = boto3.client('ssm', config=boto_config)
-sibyl_client = SibylCoreService()
-bedrock = Bedrock()
+# Every message needs Bedrock, so its client is built during init, which
+# Lambda runs with boosted CPU. The Sibyl Core client pulls in the SDK and
+# resolves credentials, so it is only built when first needed.
+bedrock = Bedrock(config=boto_config)
+async_bedrock = AsyncBedrock(bedrock)
+dedup_store = create_dedup_store()
+_sibyl_client = None
+_sqs_client = None
+_clients_lock = threading.Lock()
 
-# Cache for bot token
-_BOT_TOKEN = None
+def get_sibyl_client() -> Any:
+    """Get the Sibyl Core client, importing the SDK on first use."""
+    global _sibyl_client
+    if _sibyl_client is None:
+        with _clients_lock:
+            if _sibyl_client is None:
+                from ..services.sibyl_core import SibylCoreService
+                _sibyl_client = SibylCoreService()
+    return _sibyl_client
 
-def get_cached_bot_token() -> str:
-    """Get bot token with caching."""
-    global _BOT_TOKEN
-    if _BOT_TOKEN is None:
-        _BOT_TOKEN = get_parameter(BOT_TOKEN_PARAM_PATH, decrypt=True)
-    return _BOT_TOKEN
+def get_sqs_client() -> Any:
+    """Get the SQS client used to release records early."""
+    global _sqs_client
+    if _sqs_client is None:
+        with _clients_lock:
+            if _sqs_client is None:
+                import boto3
+                _sqs_client = boto3.client('sqs')
+    return _sqs_client
 
 @logger.inject_lambda_context
+@telemetry.log_metrics
 def lambda_handler(event: Dict[str, Any], context: LambdaContext) -> Dict[str, Any]:
-    """Process messages from SQS queue."""
+    """Process messages from SQS queue.
+
+    Records are processed concurrently across chats and in order within a
+    chat. Failed records are reported individually so SQS only retries those.
+    Processing is bounded by the invocation's remaining time, so the batch
+    response is always returned before the Lambda timeout.
+    """
+    records = event['Records']
+    deadline = Deadline.from_context(context)
+    try:
+        # Bot token and bot are cached across warm invocations
+        bot = get_bot(get_bot_token(), on_unauthorized=invalidate_bot_token)
+    except Exception as e:
+        logger.error(f"Error processing message: {str(e)}")
+        return _batch_response([record['messageId'] for record in records])
+
+    with deadline_scope(deadline):
+        return _batch_response(process_batch(bot, records))
+
+@logger.inject_lambda_context
+@telemetry.log_metrics
+def lambda_handler_async(event: Dict[str, Any], context: LambdaContext) -> Dict[str, Any]:
+    """Process messages from SQS queue on an event loop.
+
+    Same contract as :func:`lambda_handler`, but chats are coroutines and the
+    blocking calls they make share the pool from ``utils.aio``, so a batch
+    can keep more replies in flight than it has threads.
+    """
+    records = event['Records']
+    deadline = Deadline.from_context(context)
     try:
-        # Get bot token once and reuse
-        bot_token = get_cached_bot_token()
-        bot = TelegramBot(bot_token)
-        
-        # Process all messages in batch
-        for record in event['Records']:
-            process_message(bot, json.loads(record['body']))
-            
-        return {'statusCode': 200}
+        bot = get_bot(get_bot_token(), on_unauthorized=invalidate_bot_token)
     except Exception as e:
         logger.error(f"Error processing message: {str(e)}")
-        return {'statusCode': 500}
+        return _batch_response([record['messageId'] for record in records])
+
+    with deadline_scope(deadline):
+        return _batch_response(asyncio.run(process_batch_async(bot, records)))
+
+def process_batch(
+    bot: TelegramBot,
+    records: List[Dict[str, Any]],
+    max_concurrency: int = PROCESSOR_MAX_CONCURRENCY
+) -> List[str]:
+    """Process a batch of SQS records.
+
+    Args:
+        bot: Telegram bot used for replies
+        records: SQS records in arrival order
+        max_concurrency: Maximum number of chats processed at the same time
+
+    Returns:
+        Message IDs of the records that failed and should be retried
+    """
+    chats, failed = _group_by_chat(records)
+    released: List[str] = []
+    if not chats:
+        return failed
+
+    # Workers run in a copy of the caller's context to see its deadline
+    context = contextvars.copy_context()
+    workers = max(1, min(max_concurrency, len(chats)))
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        for chat_failures, chat_released in executor.map(
+            lambda items: context.copy().run(_process_chat, bot, items), chats.values()
+        ):
+            failed.extend(chat_failures)
+            released.extend(chat_released)
+
+    if released:
+        _release(released, records)
+    return failed
+
+def _group_by_chat(
+    records: List[Dict[str, Any]]
+) -> Tuple[Dict[Any, List[Tuple[str, TelegramUpdate]]], List[str]]:
+    """Decode records and group them by chat, keeping arrival order.
+
+    Returns:
+        Message IDs and updates per chat, and the IDs of malformed records
+    """
+    failed: List[str] = []
+    chats: Dict[Any, List[Tuple[str, TelegramUpdate]]] = {}
+    for record in records:
+        try:
+            update = TelegramUpdate.from_wire(json_codec.loads(record['body']))
+        except (ValueError, KeyError, TypeError) as e:
+            logger.error(f"Malformed record {record.get('messageId')}: {str(e)}")
+            failed.append(record['messageId'])
+            continue
+        _record_queue_age(record, update)
+        chats.setdefault(update.chat_id, []).append((record['messageId'], update))
+    return chats, failed
+
+def _process_chat(
+    bot: TelegramBot,
+    items: List[Tuple[str, TelegramUpdate]]
+) -> Tuple[List[str], List[str]]:
+    """Process one chat's records in order.
+
+    Bursts of messages are answered as one agent turn. Once a record fails,
+    the remaining records of the chat are reported as failed without being
+    processed so a retry cannot reorder them. Records that run out of time
+    are also released for immediate redelivery.
+
+    Returns:
+        Message IDs of the failed records, and those of them to release
+    """
+    deadline = current()
+    index = 0
+    for burst in _bursts(items):
+        if deadline is not None and deadline.remaining() < settings.DEADLINE_MIN_START:
+            logger.warning("Not enough time left to start a record", extra={
+                'remaining_seconds': round(deadline.remaining(), 2),
+                'released': len(items) - index
+            })
+            return _ids(items[index:]), _ids(items[index:])
+        try:
+            process_messages(bot, [update for _, update in burst])
+        except DeadlineExceeded:
+            return _ids(items[index:]), _ids(items[index:])
+        except Exception:
+            return _ids(items[index:]), []
+        index += len(burst)
+    return [], []
+
+def _bursts(items: List[Tuple[str, TelegramUpdate]]) -> List[List[Tuple[str, TelegramUpdate]]]:
+    """Split a chat's records into runs that are answered as one agent turn.
+
+    A run goes on while the same sender writes plain messages, each within
+    COALESCE_WINDOW_SECONDS of the previous one, up to COALESCE_MAX_MESSAGES
+    messages and MAX_MESSAGE_LENGTH characters in total. Runs never span
+    batches, so a burst split across two batches gets two answers.
+    """
+    bursts: List[List[Tuple[str, TelegramUpdate]]] = []
+    length = 0
+    for item in items:
+        update = item[1]
+        if bursts and _continues(bursts[-1], update, length):
+            bursts[-1].append(item)
+            length += len(update.text) + 1
+        else:
+            bursts.append([item])
+            length = len(update.text)
+    return bursts
+
+def _continues(burst: List[Tuple[str, TelegramUpdate]], update: TelegramUpdate, length: int) -> bool:
+    """Check whether a message extends a run of messages with the given total length."""
+    previous = burst[-1][1]
+    return (
+        settings.COALESCE_WINDOW_SECONDS > 0
+        and len(burst) < settings.COALESCE_MAX_MESSAGES
+        and length + 1 + len(update.text) <= settings.MAX_MESSAGE_LENGTH
+        and update.user_id == previous.user_id
+        and previous.date is not None and update.date is not None
+        and update.date - previous.date <= settings.COALESCE_WINDOW_SECONDS
+        and not _is_command(previous) and not _is_command(update)
+    )
+
+def _is_command(update: TelegramUpdate) -> bool:
+    """Check whether a message starts with a bot command."""
+    return command_of({'text': update.text, 'entities': update.entities}) is not None
+
+def _ids(items: List[Tuple[str, TelegramUpdate]]) -> List[str]:
+    """Get the message IDs of records."""
+    return [message_id for message_id, _ in items]
+
+def _release(message_ids: List[str], records: List[Dict[str, Any]]) -> None:
+    """Make records visible again right away instead of after their visibility timeout."""
+    ids = set(message_ids)
+    try:
+        not_released = release_records(
+            get_sqs_client(), [record for record in records if record['messageId'] in ids]
+        )
+    except Exception as e:
+        logger.warning(f"Failed to release records: {str(e)}")
+        return
+    if not_released:
+        logger.warning(f"SQS did not release {not_released} record(s)")
+
+def _record_queue_age(record: Dict[str, Any], update: TelegramUpdate) -> None:
+    """Record how long an update waited between Telegram and the processor."""
+    received_ms = record.get('attributes', {}).get('ApproximateFirstReceiveTimestamp')
+    if received_ms and update.date:
+        telemetry.record("QueueAge", int(received_ms) - update.date * 1000)
+
+def _batch_response(failed_ids: List[str]) -> Dict[str, Any]:
+    """Build a partial batch response for SQS."""
+    return {
+        'batchItemFailures': [{'itemIdentifier': message_id} for message_id in failed_ids]
+    }
+
+def process_message(bot: TelegramBot, update: TelegramUpdate) -> None:
+    """Process a single message from the queue.
+
+    Updates that were already answered are skipped so redeliveries do not
+    invoke the agent again.
+
+    Raises:
+        UpdateInProgress: If another worker is answering the update, so the
+            record is retried once that worker has finished or failed
+    """
+    process_messages(bot, [update])
+
+def process_messages(bot: TelegramBot, updates: List[TelegramUpdate]) -> None:
+    """Answer consecutive messages of one chat with a single agent turn.
+
+    Messages that were already answered are left out; the others are merged
+    into one prompt.
+
+    Raises:
+        UpdateInProgress: If another worker is answering one of the messages
+    """
+    claimed = _claim(updates)
+    if not claimed:
+        return
+    update = claimed[0] if len(claimed) == 1 else TelegramUpdate.merge(claimed)
 
-def process_message(bot: TelegramBot, message_data: Dict[str, Any]) -> None:
-    """Process a single message from the queue."""
     try:
-        # Reconstruct message without validation for speed
-        logger.debug(f"Processing message: {message_data}")
-        logger.debug(f"User: {sibyl_client.get_user_by_telegram_id(telegram_id=123)}")
-        message = message_data['message']
-        chat_id = message["chat_id"]
-        user_id = str(message["user_id"])
-
-        input_text = message["message"]['text'].replace("\\", "").replace('"', '')
-        logger.info(f"input: {input_text}")
-        
-        output = bedrock.invoke_agent(user_id=user_id, prompt=input_text)
-        bot.send_message(chat_id, output if output else "Sibyl is silent, tell they more.")
-        
+        logger.debug(f"Processing message: {update}")
+        chat_id = update.chat_id
+        user_id = str(update.user_id)
+        if logger.isEnabledFor(logging.DEBUG):
+            with telemetry.span("SibylCoreLookup"):
+                user = get_sibyl_client().get_user_by_telegram_id(telegram_id=update.user_id)
+            logger.debug(f"User: {user}")
+
+        if command_of({'text': update.text, 'entities': update.entities}) == RESET_COMMAND:
+            bedrock.reset_session(user_id, chat_id)
+            bot.send_message(chat_id, RESET_REPLY)
+        else:
+            _reply(bot, update, user_id)
+
     except Exception as e:
         logger.error(f"Failed to process message: {str(e)}")
+        _settle(claimed, answered=False)
         # Re-raise to trigger SQS retry
         raise
+
+    _settle(claimed, answered=True)
+    _record_answered(claimed)
+
+def _claim(updates: List[TelegramUpdate]) -> List[TelegramUpdate]:
+    """Claim updates for processing, leaving out answered ones.
+
+    Raises:
+        UpdateInProgress: If another worker holds a claim on any update; the
+            claims taken here are given up first
+    """
+    claimed = []
+    in_progress = []
+    for update in updates:
+        if update.update_id is None:
+            claimed.append(update)
+            continue
+        status = dedup_store.begin(update.update_id)
+        if status == CLAIMED:
+            claimed.append(update)
+        elif status == STATUS_IN_PROGRESS:
+            in_progress.append(update.update_id)
+        else:
+            logger.info("Skipping duplicate update", extra={'update_id': update.update_id})
+    if in_progress:
+        logger.info("Update is being processed elsewhere, retrying later", extra={'update_ids': in_progress})
+        _settle(claimed, answered=False)
+        raise UpdateInProgress(in_progress)
+    return claimed
+
+def _settle(updates: List[TelegramUpdate], answered: bool) -> None:
+    """Mark claimed updates as answered, or give up the claims so a retry can process them."""
+    for update in updates:
+        if update.update_id is None:
+            continue
+        if answered:
+            dedup_store.complete(update.update_id)
+        else:
+            dedup_store.release(update.update_id)
+
+def _record_answered(updates: List[TelegramUpdate]) -> None:
+    """Record the end-to-end latency of answered messages and how many were merged."""
+    if len(updates) > 1:
+        telemetry.count("CoalescedUpdates", len(updates) - 1)
+    now_ms = time.time() * 1000
+    for update in updates:
+        if update.date:
+            telemetry.record("EndToEndLatency", now_ms - update.date * 1000)
+
+def _reply(bot: TelegramBot, update: TelegramUpdate, user_id: str) -> None:
+    """Answer a message with the agent's reply.
+
+    The reply is streamed into a live message. If the stream fails after
+    that message was sent, it is left as it is: the retried record starts
+    a new reply below the partial one rather than editing it.
+    """
+    input_text = update.text.replace("\\", "").replace('"', '')
+    logger.debug(f"input: {input_text}")
+
+    # Stream the agent output so the user sees the reply as it is generated
+    reply = LiveMessage(bot, update.chat_id)
+    try:
+        for chunk in bedrock.stream_agent(user_id=user_id, prompt=input_text, chat_id=update.chat_id):
+            reply.append(chunk)
+    except DeadlineExceeded:
+        # The record is retried by a fresh invocation with a full budget
+        logger.warning("Agent did not answer before the deadline", extra={'chat_id': update.chat_id})
+        bot.send_message(update.chat_id, STILL_THINKING_REPLY)
+        raise
+    reply.finish(fallback="Sibyl is silent, tell they more.")
+
+async def process_batch_async(
+    bot: TelegramBot,
+    records: List[Dict[str, Any]],
+    max_concurrency: int = PROCESSOR_MAX_CONCURRENCY
+) -> List[str]:
+    """Process a batch of SQS records with one coroutine per chat.
+
+    Args:
+        bot: Telegram bot used for replies
+        records: SQS records in arrival order
+        max_concurrency: Maximum number of chats processed at the same time
+
+    Returns:
+        Message IDs of the records that failed and should be retried
+    """
+    chats, failed = _group_by_chat(records)
+    released: List[str] = []
+    if not chats:
+        return failed
+
+    client = AsyncTelegramBot(bot)
+    semaphore = asyncio.Semaphore(max(1, max_concurrency))
+
+    async def run(items: List[Tuple[str, TelegramUpdate]]) -> Tuple[List[str], List[str]]:
+        async with semaphore:
+            return await process_chat_async(client, items)
+
+    for chat_failures, chat_released in await asyncio.gather(*(run(items) for items in chats.values())):
+        failed.extend(chat_failures)
+        released.extend(chat_released)
+
+    if released:
+        await run_sync(_release, released, records)
+    return failed
+
+async def process_chat_async(
+    bot: AsyncTelegramBot,
+    items: List[Tuple[str, TelegramUpdate]]
+) -> Tuple[List[str], List[str]]:
+    """Process one chat's updates in order, like :func:`_process_chat`.
+
+    Args:
+        bot: Telegram bot used for replies
+        items: Message IDs and updates of one chat, in arrival order
+
+    Returns:
+        Message IDs of the failed updates, and those of them that ran out
+        of time
+    """
+    deadline = current()
+    index = 0
+    for burst in _bursts(items):
+        if deadline is not None and deadline.remaining() < settings.DEADLINE_MIN_START:
+            logger.warning("Not enough time left to start a record", extra={
+                'remaining_seconds': round(deadline.remaining(), 2),
+                'released': len(items) - index
+            })
+            return _ids(items[index:]), _ids(items[index:])
+        try:
+            await process_messages_async(bot, [update for _, update in burst])
+        except DeadlineExceeded:
+            return _ids(items[index:]), _ids(items[index:])
+        except Exception:
+            return _ids(items[index:]), []
+        index += len(burst)
+    return [], []
+
+async def process_message_async(bot: AsyncTelegramBot, update: TelegramUpdate) -> None:
+    """Process a single message from the queue, like :func:`process_message`."""
+    await process_messages_async(bot, [update])
+
+async def process_messages_async(bot: AsyncTelegramBot, updates: List[TelegramUpdate]) -> None:
+    """Answer consecutive messages of one chat, like :func:`process_messages`."""
+    claimed = await run_sync(_claim, updates)
+    if not claimed:
+        return
+    update = claimed[0] if len(claimed) == 1 else TelegramUpdate.merge(claimed)
+
+    try:
+        logger.debug(f"Processing message: {update}")
+        chat_id = update.chat_id
+        user_id = str(update.user_id)
+        if logger.isEnabledFor(logging.DEBUG):
+            from ..services.sibyl_core import AsyncSibylCoreService
+            with telemetry.span("SibylCoreLookup"):
+                user = await AsyncSibylCoreService(get_sibyl_client()).get_user_by_telegram_id(update.user_id)
+            logger.debug(f"User: {user}")
+
+        if command_of({'text': update.text, 'entities': update.entities}) == RESET_COMMAND:
+            await async_bedrock.reset_session(user_id, chat_id)
+            await bot.send_message(chat_id, RESET_REPLY)
+        else:
+            await _reply_async(bot, update, user_id)
+
+    except Exception as e:
+        logger.error(f"Failed to process message: {str(e)}")
+        await run_sync(_settle, claimed, False)
+        raise
+
+    await run_sync(_settle, claimed, True)
+    _record_answered(claimed)
+
+async def _reply_async(bot: AsyncTelegramBot, update: TelegramUpdate, user_id: str) -> None:
+    """Answer a message with the agent's reply, like :func:`_reply`."""
+    input_text = update.text.replace("\\", "").replace('"', '')
+    logger.debug(f"input: {input_text}")
+
+    reply = LiveMessage(bot.bot, update.chat_id)
+    try:
+        async for chunk in async_bedrock.stream_agent(user_id=user_id, prompt=input_text, chat_id=update.chat_id):
+            await run_sync(reply.append, chunk)
+    except DeadlineExceeded:
+        logger.warning("Agent did not answer before the deadline", extra={'chat_id': update.chat_id})
+        await bot.send_message(update.chat_id, STILL_THINKING_REPLY)
+        raise
+    await run_sync(reply.finish, fallback="Sibyl is silent, tell they more.")
@@ -0,0 +1,90 @@
+"""Ingest updates by polling getUpdates instead of receiving webhooks.
+
+Polling needs no public URL, and a burst of updates arrives in one batched
+fetch instead of one HTTP request per update. Batches go through the same
+routing and admission control as webhook requests. By default they are
+enqueued to the SQS queue at ``SQS_QUEUE_URL`` for the processor function;
+with ``--local``, they are answered in this process by the server mode's
+worker pool:
+
+    python -m sibyl_telegram_interface.handlers.poller [--local]
+
+Only one poller may run per bot, and the webhook is removed on start.
+"""
+
+import argparse
+import asyncio
+import functools
+import signal
+import sys
+from typing import Any, Dict, List, Optional
+
+from aws_lambda_powertools import Logger
+
+from ..telegram.bot import TelegramBot, get_bot
+from ..telegram.polling import UpdatePoller
+from ..utils import telemetry
+from ..utils.ssm import get_bot_token, invalidate_bot_token
+from .lambda_handler import ingest_batch
+
+logger = Logger()
+
+
+def enqueue_batch(bot: TelegramBot, updates: List[Dict[str, Any]], **kwargs: Any) -> None:
+    """Ingest a polled batch and flush its metrics, like one webhook invocation."""
+    try:
+        ingest_batch(bot, updates, **kwargs)
+    finally:
+        telemetry.flush()
+
+
+def run_sqs(bot: TelegramBot) -> None:
+    """Poll and enqueue to SQS until SIGINT or SIGTERM."""
+    poller = UpdatePoller(bot, functools.partial(enqueue_batch, bot))
+    for signum in (signal.SIGINT, signal.SIGTERM):
+        signal.signal(signum, lambda *_: poller.stop())
+    poller.run()
+
+
+async def run_local(bot: TelegramBot) -> None:
+    """Poll and answer updates in this process until SIGINT or SIGTERM."""
+    from .server import UpdateServer
+
+    server = UpdateServer()
+    await server.start()
+    poller = UpdatePoller(
+        bot,
+        functools.partial(ingest_batch, bot, queue=server.queue, controller=server.controller),
+        capacity=lambda: server.queue.maxsize - len(server.queue)
+    )
+    loop = asyncio.get_running_loop()
+    for signum in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(signum, poller.stop)
+    await loop.run_in_executor(None, poller.run)
+    await server.stop()
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """Remove the webhook and poll for updates."""
+    parser = argparse.ArgumentParser(description="Ingest Telegram updates with getUpdates")
+    parser.add_argument("--local", action="store_true", help="answer updates in this process instead of via SQS")
+    parser.add_argument(
+        "--drop-pending-updates", action="store_true", help="discard updates that arrived while nothing polled"
+    )
+    args = parser.parse_args(argv)
+
+    bot = get_bot(get_bot_token(), on_unauthorized=invalidate_bot_token)
+    response = bot.delete_webhook(drop_pending_updates=args.drop_pending_updates)
+    if not response.get('ok'):
+        logger.error(f"Failed to remove the webhook: {response.get('description')}")
+        return 1
+
+    if args.local:
+        asyncio.run(run_local(bot))
+    else:
+        run_sqs(bot)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,77 @@
+"""Route incoming updates to an inline reply or the agent queue."""
+
+import json
+from typing import Any, Dict, Optional, Tuple
+
+from ..config import settings
+
+# Routes an update can take through the webhook
+ROUTE_AGENT = "agent"
+ROUTE_INLINE = "inline"
+ROUTE_IGNORE = "ignore"
+
+# Commands answered directly by the webhook without an agent call
+COMMAND_REPLIES = {
+    "/start": "Hi, I'm Sibyl. Tell me what's on your mind.",
+    "/help": (
+        "Just write to me in plain text and I'll reply. Use /start to see the greeting again "
+        "and /reset to start a new conversation."
+    ),
+}
+
+# Handled by the processor, which owns the agent sessions
+RESET_COMMAND = "/reset"
+RESET_REPLY = "Let's start over. What's on your mind?"
+
+UNSUPPORTED_MESSAGE_REPLY = "Sorry, I can only read text messages."
+MESSAGE_TOO_LONG_REPLY = "Error: your message is too long."
+
+
+def command_of(message: Dict[str, Any]) -> Optional[str]:
+    """Get the bot command a message starts with, without any @botname suffix."""
+    text = message.get("text") or ""
+    for entity in message.get("entities") or ():
+        if entity.get("type") == "bot_command" and entity.get("offset") == 0:
+            return text[:entity.get("length", 0)].split("@", 1)[0].lower()
+    return None
+
+
+def classify_update(message: Dict[str, Any]) -> Tuple[str, Optional[str]]:
+    """Decide how the webhook should handle a message.
+
+    Args:
+        message: Raw Telegram message object
+
+    Returns:
+        Route name and, for inline routes, the reply text
+    """
+    if not message.get("chat", {}).get("id") or not message.get("from", {}).get("id"):
+        return ROUTE_IGNORE, None
+
+    text = message.get("text")
+    if not text:
+        return ROUTE_INLINE, UNSUPPORTED_MESSAGE_REPLY
+    if len(text) > settings.MAX_MESSAGE_LENGTH:
+        return ROUTE_INLINE, MESSAGE_TOO_LONG_REPLY
+
+    command = command_of(message)
+    if command in COMMAND_REPLIES:
+        return ROUTE_INLINE, COMMAND_REPLIES[command]
+    return ROUTE_AGENT, None
+
+
+def webhook_reply(chat_id: int, text: str) -> Dict[str, Any]:
+    """Build a webhook response that makes Telegram send a message.
+
+    Telegram executes a Bot API method returned in the webhook response
+    body, so inline replies need no outbound call from the handler.
+    """
+    return {
+        'statusCode': 200,
+        'headers': {'Content-Type': 'application/json'},
+        'body': json.dumps({
+            'method': 'sendMessage',
+            'chat_id': chat_id,
+            'text': text
+        })
+    }
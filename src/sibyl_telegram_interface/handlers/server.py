@@ -0,0 +1,312 @@
+"""Serve the webhook and process updates in one long-running process.
+
+For steady traffic, a persistent process avoids the per-invocation overhead
+and cold starts of the Lambda functions. The ASGI app validates and admits
+webhook requests with the webhook function's code
+(:func:`lambda_handler.handle_webhook`), puts updates on an in-process
+:class:`LocalUpdateQueue` instead of SQS, and answers them with a pool of
+coroutines running :func:`message_processor.process_chat_async`. Run it with
+uvicorn, one queue and worker pool per process:
+
+    python -m sibyl_telegram_interface.handlers.server --port 8443 --processes 4
+"""
+
+import argparse
+import asyncio
+import itertools
+import json
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+from aws_lambda_powertools import Logger
+
+from ..config import settings
+from ..services.queue import LocalUpdateQueue
+from ..telegram.bot import AsyncTelegramBot, get_bot
+from ..telegram.models import TelegramUpdate
+from ..utils import telemetry
+from ..utils.aio import run_sync
+from ..utils.ssm import get_bot_token, invalidate_bot_token
+from .admission import AdmissionController
+from .lambda_handler import handle_webhook
+from .message_processor import process_chat_async
+
+logger = Logger()
+
+# Threads validating and enqueuing webhook requests, kept apart from the
+# shared pool so replies in flight cannot hold up ingress
+_INGRESS_THREADS = 8
+
+Receive = Callable[[], Awaitable[Dict[str, Any]]]
+Send = Callable[[Dict[str, Any]], Awaitable[None]]
+
+
+class UpdateServer:
+    """Webhook ingress and update processing sharing an in-process queue."""
+
+    def __init__(
+        self,
+        workers: int = settings.SERVER_WORKERS,
+        queue_size: int = settings.SERVER_QUEUE_SIZE,
+        max_attempts: int = settings.SERVER_MAX_ATTEMPTS,
+        retry_delay: float = settings.SERVER_RETRY_DELAY,
+        drain_seconds: float = settings.SERVER_DRAIN_SECONDS,
+        metrics_interval: float = settings.SERVER_METRICS_INTERVAL,
+        controller: Optional[AdmissionController] = None
+    ):
+        """Initialize the server.
+
+        Args:
+            workers: Chats answered at the same time
+            queue_size: Most updates queued or being answered at once
+            max_attempts: Times an update is processed before it is dropped
+            retry_delay: Seconds before a failed update is processed again
+            drain_seconds: Seconds queued updates get to finish on shutdown
+            metrics_interval: Seconds between metric flushes
+            controller: Admission control for incoming updates. By default
+                only per-user quotas apply; a full queue declines updates
+                instead of load estimates.
+        """
+        self.workers = workers
+        self.max_attempts = max_attempts
+        self.retry_delay = retry_delay
+        self.drain_seconds = drain_seconds
+        self.metrics_interval = metrics_interval
+        self.controller = controller or AdmissionController(monitor=None)
+        self.queue = LocalUpdateQueue(queue_size, on_ready=self._on_ready)
+        self.accepting = False
+        self.processed = 0
+        self.dropped = 0
+        self._ready: Optional[asyncio.Queue] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._tasks: List[asyncio.Task] = []
+        self._ingress: Optional[ThreadPoolExecutor] = None
+        self._ids = itertools.count(1)
+
+    async def start(self) -> None:
+        """Start the workers and accept updates."""
+        self._loop = asyncio.get_running_loop()
+        self._ready = asyncio.Queue()
+        self._ingress = ThreadPoolExecutor(max_workers=_INGRESS_THREADS, thread_name_prefix="ingress")
+        self._tasks = [asyncio.create_task(self._work()) for _ in range(self.workers)]
+        self._tasks.append(asyncio.create_task(self._flush_metrics()))
+        self.accepting = True
+        logger.info("Update server started", extra={'workers': self.workers, 'queue_size': self.queue.maxsize})
+
+    async def stop(self) -> None:
+        """Stop accepting updates and give queued ones time to finish."""
+        self.accepting = False
+        deadline = time.monotonic() + self.drain_seconds
+        while len(self.queue) and time.monotonic() < deadline:
+            await asyncio.sleep(0.05)
+        if len(self.queue):
+            logger.warning("Stopped with updates left in the queue", extra={'updates': len(self.queue)})
+
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        if self._ingress is not None:
+            self._ingress.shutdown(wait=False)
+        telemetry.flush()
+        logger.info("Update server stopped", extra={'processed': self.processed, 'dropped': self.dropped})
+
+    async def webhook(self, event: Dict[str, Any]) -> Dict[str, Any]:
+        """Handle a webhook request shaped like a Lambda function URL event.
+
+        While the server drains or its queue is full, the request is
+        declined with a 503 so Telegram delivers the update again later.
+        """
+        if not self.accepting or self.queue.full():
+            return {
+                'statusCode': 503,
+                'body': json.dumps({'error': 'Service unavailable'})
+            }
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._ingress, handle_webhook, event, self.queue, self.controller)
+
+    def _on_ready(self, chat_id: Any) -> None:
+        self._loop.call_soon_threadsafe(self._ready.put_nowait, chat_id)
+
+    async def _work(self) -> None:
+        while True:
+            chat_id = await self._ready.get()
+            try:
+                await self._process(chat_id)
+            except Exception as e:
+                logger.error(f"Failed to process chat {chat_id}: {str(e)}")
+                self.queue.done(chat_id)
+
+    async def _process(self, chat_id: Any) -> None:
+        """Answer a chat's queued updates and schedule the failed ones for a retry."""
+        items: List[Tuple[str, TelegramUpdate]] = []
+        pending: Dict[str, Tuple[Dict[str, Any], int]] = {}
+        now_ms = time.time() * 1000
+        for payload, attempt in self.queue.take(chat_id):
+            try:
+                update = TelegramUpdate.from_wire(payload)
+            except (ValueError, KeyError, TypeError) as e:
+                logger.error(f"Malformed update in chat {chat_id}: {str(e)}")
+                continue
+            if attempt == 1 and update.date:
+                telemetry.record("QueueAge", now_ms - update.date * 1000)
+            message_id = str(next(self._ids))
+            pending[message_id] = (payload, attempt)
+            items.append((message_id, update))
+
+        try:
+            bot = await run_sync(lambda: get_bot(get_bot_token(), on_unauthorized=invalidate_bot_token))
+            failed, _ = await process_chat_async(AsyncTelegramBot(bot), items)
+        except Exception as e:
+            logger.error(f"Error processing message: {str(e)}")
+            failed = list(pending)
+        self.processed += len(items) - len(failed)
+
+        retry = []
+        for message_id in failed:
+            payload, attempt = pending[message_id]
+            if attempt >= self.max_attempts:
+                self.dropped += 1
+                telemetry.count("UpdatesDropped")
+                logger.error("Dropping update after repeated failures", extra={
+                    'chat_id': chat_id,
+                    'attempts': attempt
+                })
+            else:
+                retry.append((payload, attempt + 1))
+        if retry:
+            # The chat stays taken meanwhile, so newer updates cannot overtake
+            self._loop.call_later(self.retry_delay, self.queue.done, chat_id, retry)
+        else:
+            self.queue.done(chat_id)
+
+    async def _flush_metrics(self) -> None:
+        while True:
+            await asyncio.sleep(self.metrics_interval)
+            telemetry.flush()
+
+
+class WebhookApp:
+    """ASGI application serving an :class:`UpdateServer`.
+
+    ``POST`` on any path delivers a webhook update, ``GET /health`` reports
+    whether the server accepts updates and how many are queued. The
+    lifespan protocol starts the server and drains it on shutdown.
+    """
+
+    def __init__(self, server: UpdateServer):
+        """Initialize the app.
+
+        Args:
+            server: Server handling the requests
+        """
+        self.server = server
+
+    async def __call__(self, scope: Dict[str, Any], receive: Receive, send: Send) -> None:
+        if scope['type'] == 'lifespan':
+            await self._lifespan(receive, send)
+        elif scope['type'] == 'http':
+            await self._http(scope, receive, send)
+
+    async def _lifespan(self, receive: Receive, send: Send) -> None:
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                try:
+                    await self.server.start()
+                except Exception as e:
+                    await send({'type': 'lifespan.startup.failed', 'message': str(e)})
+                    return
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                await self.server.stop()
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+
+    async def _http(self, scope: Dict[str, Any], receive: Receive, send: Send) -> None:
+        if scope['method'] == 'GET' and scope['path'] == '/health':
+            response = {
+                'statusCode': 200 if self.server.accepting else 503,
+                'body': json.dumps({'accepting': self.server.accepting, 'queued': len(self.server.queue)})
+            }
+        elif scope['method'] == 'POST':
+            body = b''
+            more = True
+            while more:
+                message = await receive()
+                body += message.get('body', b'')
+                more = message.get('more_body', False)
+            response = await self.server.webhook(request_event(scope, body))
+        else:
+            response = {
+                'statusCode': 405,
+                'body': json.dumps({'error': 'Method not allowed'})
+            }
+        await respond(send, response)
+
+
+def request_event(scope: Dict[str, Any], body: bytes) -> Dict[str, Any]:
+    """Build the Lambda function URL event :func:`handle_webhook` expects from an ASGI request.
+
+    Without an ``X-Forwarded-Port`` header from a proxy, the port the server
+    listens on is used.
+    """
+    headers = {name.decode('latin-1').lower(): value.decode('latin-1') for name, value in scope.get('headers', [])}
+    server = scope.get('server')
+    if server and 'x-forwarded-port' not in headers:
+        headers['x-forwarded-port'] = str(server[1])
+    client = scope.get('client')
+    return {
+        'headers': headers,
+        'requestContext': {'http': {'sourceIp': client[0] if client else None}},
+        'body': body.decode('utf-8', errors='replace')
+    }
+
+
+async def respond(send: Send, response: Dict[str, Any]) -> None:
+    """Send a Lambda function URL response over ASGI."""
+    headers = {'Content-Type': 'application/json'}
+    headers.update(response.get('headers') or {})
+    await send({
+        'type': 'http.response.start',
+        'status': response['statusCode'],
+        'headers': [(name.lower().encode('latin-1'), value.encode('latin-1')) for name, value in headers.items()]
+    })
+    await send({'type': 'http.response.body', 'body': response.get('body', '').encode()})
+
+
+def create_app() -> WebhookApp:
+    """Create the ASGI app with a server configured from the settings."""
+    return WebhookApp(UpdateServer())
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """Run the app with uvicorn."""
+    parser = argparse.ArgumentParser(description="Serve the Telegram webhook and process updates in one process")
+    parser.add_argument("--host", default="0.0.0.0", help="address to listen on")
+    parser.add_argument("--port", type=int, default=8443, help="port to listen on, one Telegram allows for webhooks")
+    parser.add_argument("--processes", type=int, default=1, help="server processes sharing the port")
+    args = parser.parse_args(argv)
+
+    try:
+        import uvicorn
+    except ImportError:
+        print("The server needs uvicorn: pip install 'sibyl-telegram-interface[server]'", file=sys.stderr)
+        return 1
+
+    uvicorn.run(
+        "sibyl_telegram_interface.handlers.server:create_app",
+        factory=True,
+        host=args.host,
+        port=args.port,
+        workers=args.processes,
+        lifespan="on",
+        timeout_graceful_shutdown=int(settings.SERVER_DRAIN_SECONDS) + 5
+    )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
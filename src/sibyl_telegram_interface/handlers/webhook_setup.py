@@ -4,8 +4,8 @@ import json
 import logging
 from typing import Dict, Any
 
-from ..telegram.bot import TelegramBot
-from ..utils.ssm import get_bot_token
+from ..telegram.bot import get_bot
+from ..utils.ssm import get_bot_token, get_webhook_secret, invalidate_bot_token
 from ..utils import cfnresponse
 
 logger = logging.getLogger()
@@ -43,10 +43,16 @@ def lambda_handler(event: Dict[str, Any], context: Any) -> None:
             try:
                 # Get bot token and initialize bot
                 bot_token = get_bot_token()
-                bot = TelegramBot(bot_token)
+                bot = get_bot(bot_token, on_unauthorized=invalidate_bot_token)
                 
-                # Set up webhook
-                response = bot.set_webhook(function_url)
+                # Set up webhook. Custom resource properties arrive as strings.
+                max_connections = properties.get('MaxConnections')
+                response = bot.set_webhook(
+                    function_url,
+                    secret_token=get_webhook_secret(),
+                    max_connections=int(max_connections) if max_connections else None,
+                    drop_pending_updates=str(properties.get('DropPendingUpdates', '')).lower() == 'true'
+                )
                 logger.info(f"Webhook setup response: {response}")
                 
                 if not response.get('ok'):
@@ -1,43 +1,313 @@
+import codecs
+import functools
+import hashlib
 import boto3
-import logging
+from botocore.config import Config
 import os
+import time
+from typing import Any, AsyncIterator, Callable, Dict, Iterator, List, Optional
 
 from aws_lambda_powertools import Logger
 
+from ..config import settings
+from ..utils import deadline as deadlines, telemetry
+from ..utils.aio import iterate_sync, run_sync
+from ..utils.cache import LRUCache
+from .resilience import AgentEndpoint, AgentRouter, parse_endpoints
+from .sessions import AgentSession, SessionManager
+
 
 logger = Logger()
-logger.setLevel(logging.INFO)
+
+
+class ResponseCacheBackend:
+    """Storage tier for cached agent responses.
+
+    Entries are dicts with the response ``text`` and the agent ``latency``
+    in seconds it took to produce, so a shared implementation only needs to
+    store JSON-serializable values.
+    """
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        raise NotImplementedError
+
+    def set(self, key: str, entry: Dict[str, Any], ttl: float) -> None:
+        raise NotImplementedError
+
+
+class InMemoryResponseCacheBackend(ResponseCacheBackend):
+    """Response cache tier local to one warm container."""
+
+    def __init__(self, maxsize: int = settings.RESPONSE_CACHE_SIZE, clock: Callable[[], float] = time.monotonic):
+        self._entries = LRUCache(maxsize=maxsize, ttl=settings.RESPONSE_CACHE_TTL, clock=clock)
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        return self._entries.get(key)
+
+    def set(self, key: str, entry: Dict[str, Any], ttl: float) -> None:
+        self._entries.set(key, entry, ttl=ttl)
+
+
+class ResponseCache:
+    """Cache of agent responses keyed on conversation state and normalized prompt.
+
+    The agent answers from the session's history, so a response is only
+    reused for the same prompt in the same session after the same number of
+    turns; a follow-up like "yes" later in the conversation is a miss. Reads try the local tier first, then the optional shared tier; a shared
+    hit is copied into the local tier. Writes go to both tiers.
+    """
+
+    def __init__(
+        self,
+        ttl: float = settings.RESPONSE_CACHE_TTL,
+        local: Optional[ResponseCacheBackend] = None,
+        shared: Optional[ResponseCacheBackend] = None
+    ):
+        """Initialize the cache.
+
+        Args:
+            ttl: Seconds a response stays cached
+            local: Container-local tier, an in-memory LRU by default
+            shared: Tier shared between containers, if any
+        """
+        self.ttl = ttl
+        self.local = local or InMemoryResponseCacheBackend()
+        self.shared = shared
+        self.hits = 0
+        self.misses = 0
+        self.saved_seconds = 0.0
+
+    @staticmethod
+    def key(session_id: str, turns: int, prompt: str) -> str:
+        """Build a cache key from the session, its completed turns and the normalized prompt."""
+        normalized = " ".join(prompt.split()).casefold()
+        return hashlib.sha256(f"{session_id}\x00{turns}\x00{normalized}".encode()).hexdigest()
+
+    def get(self, session_id: str, turns: int, prompt: str) -> Optional[str]:
+        """Get a cached response, or None on a miss."""
+        key = self.key(session_id, turns, prompt)
+        entry = self.local.get(key)
+        if entry is None and self.shared is not None:
+            entry = self.shared.get(key)
+            if entry is not None:
+                self.local.set(key, entry, self.ttl)
+        if entry is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self.saved_seconds += entry.get("latency", 0.0)
+        return entry["text"]
+
+    def put(self, session_id: str, turns: int, prompt: str, text: str, latency: float) -> None:
+        """Cache a response and the agent latency it took to produce.
+
+        ``turns`` is the number of turns the session had completed when the
+        prompt was sent, not counting the turn that answered it.
+        """
+        key = self.key(session_id, turns, prompt)
+        entry = {"text": text, "latency": latency}
+        self.local.set(key, entry, self.ttl)
+        if self.shared is not None:
+            self.shared.set(key, entry, self.ttl)
+
+    def stats(self) -> Dict[str, float]:
+        """Get hit rate and the agent latency saved by hits."""
+        lookups = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / lookups if lookups else 0.0,
+            'saved_seconds': self.saved_seconds
+        }
+
+
+def create_endpoints(region: str = "us-east-1", config: Optional[Config] = None) -> List[AgentEndpoint]:
+    """Create the agent endpoints configured by ``settings.AGENT_ENDPOINTS``.
+
+    Without a list, the only endpoint is ``AGENT_ID`` and ``AGENT_ALIAS_ID``
+    in ``region``. Endpoints in the same region share a client.
+    """
+    if config is None:
+        config = Config(
+            connect_timeout=settings.BEDROCK_CONNECT_TIMEOUT,
+            read_timeout=settings.BEDROCK_READ_TIMEOUT
+        )
+
+    @functools.lru_cache(maxsize=None)
+    def client_for(endpoint_region: str) -> Any:
+        return boto3.client('bedrock-agent-runtime', region_name=endpoint_region, config=config)
+
+    specs = parse_endpoints(settings.AGENT_ENDPOINTS) or [
+        (region, os.environ.get('AGENT_ID', ''), os.environ.get('AGENT_ALIAS_ID', ''))
+    ]
+    return [AgentEndpoint(*spec, client_factory=client_for) for spec in specs]
 
 
 class Bedrock:
-    def __init__(self, region="us-east-1"):
-        self.client = boto3.client('bedrock-agent-runtime', region_name=region)
+    def __init__(
+        self,
+        region="us-east-1",
+        response_cache: Optional[ResponseCache] = None,
+        sessions: Optional[SessionManager] = None,
+        config: Optional[Config] = None,
+        router: Optional[AgentRouter] = None
+    ):
+        self.router = router or AgentRouter(create_endpoints(region, config))
+        self.warm_up()
+        if response_cache is None and settings.RESPONSE_CACHE_TTL > 0:
+            response_cache = ResponseCache()
+        self.response_cache = response_cache
+        self.sessions = sessions or SessionManager()
+
+    def warm_up(self) -> Any:
+        """Build the primary endpoint's client, so the first turn does not pay for it.
+
+        Failover clients are built when first needed.
+
+        Returns:
+            The primary ``bedrock-agent-runtime`` client
+        """
+        return self.router.endpoints[0].client
+
+    @property
+    def client(self) -> Any:
+        """``bedrock-agent-runtime`` client of the primary endpoint."""
+        return self.router.endpoints[0].client
+
+    @client.setter
+    def client(self, client: Any) -> None:
+        self.router.endpoints[0].client = client
+
+    def stream_agent(self, user_id, prompt, use_cache: bool = True, chat_id=None) -> Iterator[str]:
+        """Invoke the agent and yield completion text as chunks arrive.
+
+        The turn goes to the user's current session in the chat, see
+        :class:`SessionManager`. Within a deadline scope, waiting on the
+        agent stops ``DEADLINE_REPLY_RESERVE`` seconds before the deadline
+        with :class:`DeadlineExceeded`, leaving time to tell the user. A
+        cached response for the same prompt at the same point of the session
+        is yielded as a single chunk without calling the agent. Pass ``use_cache=False`` for
+        prompts whose answer must not be reused.
+        """
+        session = self.sessions.acquire(user_id, chat_id)
+        cache = self.response_cache if use_cache else None
+        turns = session.turns
+        if cache is not None:
+            cached = cache.get(session.session_id, turns, prompt)
+            if cached is not None:
+                logger.info("Agent response served from cache", extra={'user_id': user_id})
+                telemetry.count("ResponseCacheHit")
+                yield cached
+                return
+
+        session_attributes = {"user_id": user_id}
+        attributes = session.attributes_to_send(session_attributes)
+
+        # Only time spent waiting on the agent counts, not the consumer's work
+        # between chunks
+        parts: List[str] = []
+        agent_seconds = 0.0
+        chunks = self._invoke(session, prompt, attributes, session_attributes)
+        deadline = deadlines.current()
+        if deadline is not None:
+            chunks = deadlines.iter_within(chunks, deadline, settings.DEADLINE_REPLY_RESERVE)
+        while True:
+            started = time.monotonic()
+            text = next(chunks, None)
+            agent_seconds += time.monotonic() - started
+            if text is None:
+                break
+            if not parts:
+                telemetry.record("BedrockTimeToFirstChunk", agent_seconds * 1000)
+            parts.append(text)
+            yield text
+
+        telemetry.record("BedrockTotal", agent_seconds * 1000)
+        # Cached before the turn is recorded, so a retry after a failed
+        # session store write finds the answer
+        if cache is not None and parts:
+            cache.put(session.session_id, turns, prompt, ''.join(parts), agent_seconds)
+        self.sessions.record(session, agent_seconds, attributes)
+
+    def _invoke(
+        self,
+        session: AgentSession,
+        prompt,
+        attributes: Optional[Dict[str, Any]] = None,
+        session_attributes: Optional[Dict[str, Any]] = None
+    ) -> Iterator[str]:
+        """Call the agent and yield decoded completion chunks.
 
-    def invoke_agent(self, user_id, prompt):    
-        # Retrieve the necessary parameters from environment variables
-        agent_id = os.environ['AGENT_ID']
-        agent_alias_id = os.environ['AGENT_ALIAS_ID']
-        logger.info(f"user_id: {user_id}")
-        logger.info(f"prompt: {prompt}")
+        Args:
+            session: Session the turn goes to
+            prompt: User input
+            attributes: Session attributes to set, None if the agent has them
+            session_attributes: All session attributes, set on every turn
+                when several endpoints may answer it
+        """
+        logger.debug(f"session_id: {session.session_id}")
+        logger.debug(f"prompt: {prompt}")
+
+        request = {
+            'sessionId': session.session_id,
+            'inputText': prompt,
+            # 'enableTrace': True,  # Set enableTrace to True or False as needed
+        }
+        if attributes is not None:
+            request['sessionState'] = {"sessionAttributes": attributes}
 
         # Invoke the Bedrock Agent
-        response = self.client.invoke_agent(
-            agentId=agent_id,
-            agentAliasId=agent_alias_id,
-            sessionId=str(user_id),
-            inputText=prompt,
-            # enableTrace=True,  # Set enableTrace to True or False as needed
-            sessionState={
-                "sessionAttributes": {
-                    "user_id": user_id
-                },
-            }
-        ) 
-
-        # Process the response
-        completion = ''
-        for event in response.get('completion', []):
-            chunk = event['chunk']
-            completion += chunk['bytes'].decode()
-
-        return completion
+        session_state = None if session_attributes is None else {"sessionAttributes": session_attributes}
+        events = self.router.invoke(request, session_state)
+
+        # Chunk boundaries are not guaranteed to fall on UTF-8 character boundaries
+        decoder = codecs.getincrementaldecoder('utf-8')()
+        for event in events:
+            chunk = event.get('chunk')
+            if not chunk:
+                continue
+            text = decoder.decode(chunk['bytes'])
+            if text:
+                yield text
+        tail = decoder.decode(b'', final=True)
+        if tail:
+            yield tail
+
+    def invoke_agent(self, user_id, prompt, use_cache: bool = True, chat_id=None):
+        """Invoke the agent and return the full completion."""
+        return ''.join(self.stream_agent(user_id, prompt, use_cache=use_cache, chat_id=chat_id))
+
+    def reset_session(self, user_id, chat_id=None) -> None:
+        """Start a new conversation for the user's next turn in the chat."""
+        self.sessions.reset(user_id, chat_id)
+
+
+class AsyncBedrock:
+    """Asyncio interface to a :class:`Bedrock` agent client.
+
+    The agent stream is read on the shared async I/O pool one chunk at a
+    time, so waiting for the next chunk does not block the event loop.
+    Sessions and the response cache are those of the wrapped client.
+    """
+
+    def __init__(self, bedrock: Bedrock):
+        """Initialize the wrapper.
+
+        Args:
+            bedrock: Client whose calls are made
+        """
+        self.bedrock = bedrock
+
+    def stream_agent(self, user_id, prompt, use_cache: bool = True, chat_id=None) -> AsyncIterator[str]:
+        """Invoke the agent and yield completion text as chunks arrive."""
+        return iterate_sync(self.bedrock.stream_agent(user_id, prompt, use_cache=use_cache, chat_id=chat_id))
+
+    async def invoke_agent(self, user_id, prompt, use_cache: bool = True, chat_id=None):
+        """Invoke the agent and return the full completion."""
+        return ''.join([
+            chunk async for chunk in self.stream_agent(user_id, prompt, use_cache=use_cache, chat_id=chat_id)
+        ])
+
+    async def reset_session(self, user_id, chat_id=None) -> None:
+        """Start a new conversation for the user's next turn in the chat."""
+        await run_sync(self.bedrock.reset_session, user_id, chat_id)
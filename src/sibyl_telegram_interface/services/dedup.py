@@ -0,0 +1,216 @@
+"""Idempotency store for Telegram updates.
+
+Telegram redelivers webhooks it did not get a 2xx for, and SQS redelivers
+records whose processing failed or timed out. Both lead to the same
+``update_id`` reaching the processor more than once. Before processing, a
+worker claims the update. A claim fails after the update has been answered,
+and while another worker holds it; the latter is reported separately,
+because the other worker may still fail and the update must then be retried
+rather than dropped.
+"""
+
+import threading
+import time
+from typing import Any, Callable, List, Optional
+
+from ..config import settings
+from ..utils.cache import LRUCache
+
+STATUS_IN_PROGRESS = "in_progress"
+STATUS_DONE = "done"
+# Result of a successful claim
+CLAIMED = "claimed"
+
+
+class UpdateInProgress(Exception):
+    """Raised when updates are claimed by another worker that has not finished them."""
+
+    def __init__(self, update_ids: List[int]):
+        self.update_ids = update_ids
+        super().__init__(f"Update(s) in progress elsewhere: {update_ids}")
+
+
+class DedupStore:
+    """Interface of an update deduplication backend."""
+
+    def begin(self, update_id: int) -> str:
+        """Claim an update for processing.
+
+        Returns:
+            CLAIMED if the caller should process the update, STATUS_DONE if
+            it was already answered, or STATUS_IN_PROGRESS if another worker
+            holds an unexpired claim on it
+        """
+        raise NotImplementedError
+
+    def complete(self, update_id: int) -> None:
+        """Mark a claimed update as answered."""
+        raise NotImplementedError
+
+    def release(self, update_id: int) -> None:
+        """Give up a claim so a retry can process the update."""
+        raise NotImplementedError
+
+
+class InMemoryDedupStore(DedupStore):
+    """Deduplication within one warm container, bounded by an LRU."""
+
+    def __init__(
+        self,
+        maxsize: int = settings.DEDUP_CACHE_SIZE,
+        lease_seconds: float = settings.DEDUP_LEASE_SECONDS,
+        ttl_seconds: float = settings.DEDUP_TTL_SECONDS,
+        clock: Callable[[], float] = time.monotonic
+    ):
+        """Initialize the store.
+
+        Args:
+            maxsize: Maximum number of tracked updates
+            lease_seconds: How long an unfinished claim blocks other workers
+            ttl_seconds: How long an answered update is remembered
+            clock: Monotonic time source
+        """
+        self.lease_seconds = lease_seconds
+        self.ttl_seconds = ttl_seconds
+        self._entries = LRUCache(maxsize=maxsize, ttl=ttl_seconds, clock=clock)
+        self._lock = threading.Lock()
+
+    def begin(self, update_id: int) -> str:
+        with self._lock:
+            status = self._entries.get(update_id)
+            if status is not None:
+                return status
+            self._entries.set(update_id, STATUS_IN_PROGRESS, ttl=self.lease_seconds)
+            return CLAIMED
+
+    def complete(self, update_id: int) -> None:
+        self._entries.set(update_id, STATUS_DONE, ttl=self.ttl_seconds)
+
+    def release(self, update_id: int) -> None:
+        self._entries.delete(update_id)
+
+    def is_done(self, update_id: int) -> bool:
+        """Check whether an update is known to be answered."""
+        return self._entries.get(update_id) == STATUS_DONE
+
+
+class DynamoDBDedupStore(DedupStore):
+    """Deduplication shared by all containers, using conditional writes.
+
+    Items are keyed on ``update_id`` and carry a ``status`` plus an
+    ``expires_at`` epoch used both as the claim lease and as the table's
+    TTL attribute.
+    """
+
+    def __init__(
+        self,
+        table_name: str,
+        client: Optional[Any] = None,
+        lease_seconds: float = settings.DEDUP_LEASE_SECONDS,
+        ttl_seconds: float = settings.DEDUP_TTL_SECONDS,
+        clock: Callable[[], float] = time.time
+    ):
+        """Initialize the store.
+
+        Args:
+            table_name: DynamoDB table with an ``update_id`` number hash key
+            client: boto3 DynamoDB client, created on first use by default
+            lease_seconds: How long an unfinished claim blocks other workers
+            ttl_seconds: How long an answered update is remembered
+            clock: Wall-clock time source, compared with ``expires_at``
+        """
+        self.table_name = table_name
+        self._client = client
+        self.lease_seconds = lease_seconds
+        self.ttl_seconds = ttl_seconds
+        self.clock = clock
+
+    @property
+    def client(self) -> Any:
+        if self._client is None:
+            import boto3
+            self._client = boto3.client('dynamodb')
+        return self._client
+
+    def begin(self, update_id: int) -> str:
+        now = int(self.clock())
+        try:
+            self.client.put_item(
+                TableName=self.table_name,
+                Item={
+                    'update_id': {'N': str(update_id)},
+                    'status': {'S': STATUS_IN_PROGRESS},
+                    'expires_at': {'N': str(now + int(self.lease_seconds))}
+                },
+                # Claim new updates, and updates whose previous claim lapsed
+                ConditionExpression=(
+                    'attribute_not_exists(update_id) OR '
+                    '(#status = :in_progress AND expires_at < :now)'
+                ),
+                ExpressionAttributeNames={'#status': 'status'},
+                ExpressionAttributeValues={
+                    ':in_progress': {'S': STATUS_IN_PROGRESS},
+                    ':now': {'N': str(now)}
+                },
+                ReturnValuesOnConditionCheckFailure='ALL_OLD'
+            )
+        except self.client.exceptions.ConditionalCheckFailedException as e:
+            item = e.response.get('Item') or {}
+            return item.get('status', {}).get('S', STATUS_IN_PROGRESS)
+        return CLAIMED
+
+    def complete(self, update_id: int) -> None:
+        self.client.update_item(
+            TableName=self.table_name,
+            Key={'update_id': {'N': str(update_id)}},
+            UpdateExpression='SET #status = :done, expires_at = :expires_at',
+            ExpressionAttributeNames={'#status': 'status'},
+            ExpressionAttributeValues={
+                ':done': {'S': STATUS_DONE},
+                ':expires_at': {'N': str(int(self.clock()) + int(self.ttl_seconds))}
+            }
+        )
+
+    def release(self, update_id: int) -> None:
+        try:
+            self.client.delete_item(
+                TableName=self.table_name,
+                Key={'update_id': {'N': str(update_id)}},
+                ConditionExpression='#status = :in_progress',
+                ExpressionAttributeNames={'#status': 'status'},
+                ExpressionAttributeValues={':in_progress': {'S': STATUS_IN_PROGRESS}}
+            )
+        except self.client.exceptions.ConditionalCheckFailedException:
+            pass
+
+
+class TieredDedupStore(DedupStore):
+    """In-memory store in front of a shared store.
+
+    Updates already answered by this container are skipped without a
+    round-trip to the shared store; claims always go to the shared store so
+    other containers see them.
+    """
+
+    def __init__(self, local: InMemoryDedupStore, shared: DedupStore):
+        self.local = local
+        self.shared = shared
+
+    def begin(self, update_id: int) -> str:
+        if self.local.is_done(update_id):
+            return STATUS_DONE
+        return self.shared.begin(update_id)
+
+    def complete(self, update_id: int) -> None:
+        self.shared.complete(update_id)
+        self.local.complete(update_id)
+
+    def release(self, update_id: int) -> None:
+        self.shared.release(update_id)
+
+
+def create_dedup_store() -> DedupStore:
+    """Create the store configured by ``settings.DEDUP_TABLE_NAME``."""
+    if settings.DEDUP_TABLE_NAME:
+        return TieredDedupStore(InMemoryDedupStore(), DynamoDBDedupStore(settings.DEDUP_TABLE_NAME))
+    return InMemoryDedupStore()
@@ -0,0 +1,268 @@
+"""Batched enqueue of Telegram updates to SQS."""
+
+import threading
+from collections import deque
+from typing import Any, Callable, Deque, Dict, List, Optional, Tuple
+
+from ..utils import json_codec
+
+# SQS limits for a single SendMessageBatch call
+MAX_BATCH_ENTRIES = 10
+MAX_BATCH_BYTES = 256 * 1024
+
+
+class EnqueueError(Exception):
+    """Raised when SQS rejects some entries of a batch."""
+
+    def __init__(self, failed: List[Dict[str, Any]]):
+        self.failed = failed
+        super().__init__(f"Failed to enqueue {len(failed)} update(s): {failed}")
+
+
+class QueueFull(Exception):
+    """Raised when an in-process queue holds as many updates as it may."""
+
+
+def encode_payload(payload: Dict[str, Any]) -> str:
+    """Serialize a queue payload without insignificant whitespace."""
+    return json_codec.dumps(payload)
+
+
+class UpdateQueue:
+    """Buffers updates and sends them with ``SendMessageBatch``.
+
+    Updates are buffered until ``flush`` is called, or until the next update
+    would exceed the SQS batch limits (10 entries, 256 KB), in which case the
+    buffered batch is sent first. For FIFO queues, updates are grouped by
+    chat so per-chat order is kept, and deduplicated on ``update_id`` so a
+    redelivered webhook is not enqueued twice.
+    """
+
+    def __init__(self, queue_url: str, client: Any, fifo: Optional[bool] = None):
+        """Initialize the queue.
+
+        Args:
+            queue_url: SQS queue URL
+            client: boto3 SQS client
+            fifo: Whether the queue is FIFO, detected from the URL by default
+        """
+        self.queue_url = queue_url
+        self.client = client
+        self.fifo = queue_url.endswith(".fifo") if fifo is None else fifo
+        self.sent = 0
+        self.batches = 0
+        self._entries: List[Dict[str, Any]] = []
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+    def put(
+        self,
+        payload: Dict[str, Any],
+        chat_id: int,
+        update_id: Optional[int] = None,
+        delay_seconds: int = 0
+    ) -> None:
+        """Buffer an update for the next batch.
+
+        Args:
+            payload: Message body, serialized as compact JSON
+            chat_id: Chat the update belongs to, used as the FIFO group
+            update_id: Telegram update ID, used for FIFO deduplication
+            delay_seconds: SQS delivery delay, ignored by FIFO queues
+
+        Raises:
+            EnqueueError: If a full batch had to be sent and SQS rejected entries
+        """
+        body = encode_payload(payload)
+        size = len(body.encode())
+        entry: Dict[str, Any] = {'MessageBody': body}
+        if self.fifo:
+            entry['MessageGroupId'] = str(chat_id)
+            if update_id is not None:
+                entry['MessageDeduplicationId'] = str(update_id)
+        elif delay_seconds:
+            entry['DelaySeconds'] = delay_seconds
+
+        with self._lock:
+            if self._entries and (
+                len(self._entries) >= MAX_BATCH_ENTRIES
+                or self._bytes + size > MAX_BATCH_BYTES
+            ):
+                self._send(self._take())
+            entry['Id'] = str(len(self._entries))
+            self._entries.append(entry)
+            self._bytes += size
+
+    def flush(self) -> None:
+        """Send all buffered updates.
+
+        Raises:
+            EnqueueError: If SQS rejected any entry
+        """
+        with self._lock:
+            if self._entries:
+                self._send(self._take())
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def _take(self) -> List[Dict[str, Any]]:
+        """Remove and return the buffered entries."""
+        entries, self._entries, self._bytes = self._entries, [], 0
+        return entries
+
+    def _send(self, entries: List[Dict[str, Any]]) -> None:
+        """Send one batch, retrying rejected entries once if SQS marks them retryable."""
+        response = self.client.send_message_batch(QueueUrl=self.queue_url, Entries=entries)
+        self.batches += 1
+        failed = response.get('Failed', [])
+        if failed:
+            retryable = {f['Id'] for f in failed if not f.get('SenderFault')}
+            retry = [entry for entry in entries if entry['Id'] in retryable]
+            if retry:
+                response = self.client.send_message_batch(QueueUrl=self.queue_url, Entries=retry)
+                self.batches += 1
+                failed = [f for f in failed if f['Id'] not in retryable] + response.get('Failed', [])
+        self.sent += len(entries) - len(failed)
+        if failed:
+            raise EnqueueError(failed)
+
+
+class LocalUpdateQueue:
+    """In-process update queue for the server mode, in place of SQS.
+
+    Has the ``put``/``flush`` interface of :class:`UpdateQueue`. Updates are
+    kept per chat, and a chat is handed to one worker at a time with all of
+    its queued updates, so a chat is answered in order and its bursts can be
+    merged. ``on_ready`` is called with a chat ID whenever a chat that no
+    worker holds gets updates; it may be called from any thread.
+    """
+
+    def __init__(self, maxsize: int, on_ready: Callable[[Any], None]):
+        """Initialize the queue.
+
+        Args:
+            maxsize: Most updates held at once, including those being processed
+            on_ready: Called with the ID of a chat that is ready to be taken
+        """
+        self.maxsize = maxsize
+        self.on_ready = on_ready
+        self.sent = 0
+        self._chats: Dict[Any, Deque[Tuple[Dict[str, Any], int]]] = {}
+        self._taken: Dict[Any, int] = {}
+        self._size = 0
+        self._lock = threading.Lock()
+
+    def put(
+        self,
+        payload: Dict[str, Any],
+        chat_id: int,
+        update_id: Optional[int] = None,
+        delay_seconds: int = 0
+    ) -> None:
+        """Queue an update.
+
+        Args:
+            payload: Wire payload of the update
+            chat_id: Chat the update belongs to
+            update_id: Telegram update ID, unused; duplicates are caught by
+                the processor's dedup store
+            delay_seconds: Unused, updates are available at once
+
+        Raises:
+            QueueFull: If the queue holds ``maxsize`` updates
+        """
+        with self._lock:
+            if self._size >= self.maxsize:
+                raise QueueFull(f"Update queue is full ({self.maxsize} updates)")
+            self._size += 1
+            self.sent += 1
+            self._chats.setdefault(chat_id, deque()).append((payload, 1))
+            ready = chat_id not in self._taken and len(self._chats[chat_id]) == 1
+        if ready:
+            self.on_ready(chat_id)
+
+    def flush(self) -> None:
+        """Do nothing; updates are available as soon as they are put."""
+
+    def take(self, chat_id: Any) -> List[Tuple[Dict[str, Any], int]]:
+        """Take all queued updates of a ready chat.
+
+        The chat is not offered again until :meth:`done` is called for it.
+
+        Returns:
+            Payloads and delivery attempt numbers, in arrival order
+        """
+        with self._lock:
+            items = list(self._chats.pop(chat_id, ()))
+            self._taken[chat_id] = len(items)
+        return items
+
+    def done(self, chat_id: Any, retry: Optional[List[Tuple[Dict[str, Any], int]]] = None) -> None:
+        """Hand back a taken chat, putting updates to retry ahead of newer ones.
+
+        Args:
+            chat_id: Chat given by :meth:`take`
+            retry: Payloads to process again, with their next attempt numbers
+        """
+        retry = retry or []
+        with self._lock:
+            self._size -= self._taken.pop(chat_id, 0) - len(retry)
+            if retry:
+                self._chats.setdefault(chat_id, deque()).extendleft(reversed(retry))
+            ready = chat_id in self._chats
+        if ready:
+            self.on_ready(chat_id)
+
+    def full(self) -> bool:
+        return self._size >= self.maxsize
+
+    def __len__(self) -> int:
+        return self._size
+
+
+def queue_url_from_arn(arn: str) -> str:
+    """Get the URL of a standard-endpoint SQS queue from its ARN."""
+    _, partition, _, region, account, name = arn.split(":", 5)
+    domain = "amazonaws.com.cn" if partition == "aws-cn" else "amazonaws.com"
+    return f"https://sqs.{region}.{domain}/{account}/{name}"
+
+
+def release_records(
+    client: Any,
+    records: List[Dict[str, Any]],
+    visibility_timeout: int = 0
+) -> int:
+    """Make received SQS records visible again without waiting for their timeout.
+
+    Args:
+        client: boto3 SQS client
+        records: Lambda SQS event records to release
+        visibility_timeout: Seconds until the records are redelivered
+
+    Returns:
+        Number of records SQS did not release; they become visible when
+        their original visibility timeout expires
+    """
+    by_queue: Dict[str, List[Dict[str, Any]]] = {}
+    for record in records:
+        by_queue.setdefault(record['eventSourceARN'], []).append(record)
+
+    failed = 0
+    for arn, queue_records in by_queue.items():
+        queue_url = queue_url_from_arn(arn)
+        for start in range(0, len(queue_records), MAX_BATCH_ENTRIES):
+            chunk = queue_records[start:start + MAX_BATCH_ENTRIES]
+            response = client.change_message_visibility_batch(
+                QueueUrl=queue_url,
+                Entries=[
+                    {
+                        'Id': str(index),
+                        'ReceiptHandle': record['receiptHandle'],
+                        'VisibilityTimeout': visibility_timeout
+                    }
+                    for index, record in enumerate(chunk)
+                ]
+            )
+            failed += len(response.get('Failed', []))
+    return failed
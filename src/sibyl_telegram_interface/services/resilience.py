@@ -0,0 +1,522 @@
+"""Resilient invocation of Bedrock agents across several endpoints.
+
+An endpoint is an agent alias in a region. Requests go to the first endpoint
+whose circuit breaker is closed. A request that is throttled, or fails with a
+server or connection error before its first chunk, fails over to the next
+endpoint. With hedging enabled, a request that has not produced its first
+chunk after a percentile of the endpoint's recent latency is also sent to
+the next endpoint, and whichever answers first is streamed. Hedges are
+capped to a share of all requests so a slow region cannot double the load.
+
+Endpoints do not share conversation history: a turn answered by another
+alias or region does not see the session's earlier turns there.
+"""
+
+import math
+import queue
+import threading
+import time
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+from aws_lambda_powertools import Logger
+from botocore.exceptions import ClientError, ConnectionError as BotoConnectionError, HTTPClientError
+
+from ..config import settings
+from ..utils import telemetry
+
+logger = Logger()
+
+# Error codes worth retrying elsewhere; event stream errors use camel case
+FAILOVER_ERROR_CODES = frozenset(code.lower() for code in (
+    "ThrottlingException",
+    "ServiceQuotaExceededException",
+    "InternalServerException",
+    "ServiceUnavailableException",
+    "DependencyFailedException",
+    "BadGatewayException",
+    "ModelNotReadyException",
+))
+
+STATE_CLOSED = "closed"
+STATE_OPEN = "open"
+STATE_HALF_OPEN = "half_open"
+
+_END = object()
+
+
+class CircuitOpenError(Exception):
+    """Raised when every agent endpoint is skipped by its circuit breaker."""
+
+
+def is_failover_error(error: Exception) -> bool:
+    """Check whether a failed call may succeed on another endpoint."""
+    if isinstance(error, ClientError):
+        return error.response.get("Error", {}).get("Code", "").lower() in FAILOVER_ERROR_CODES
+    return isinstance(error, (BotoConnectionError, HTTPClientError))
+
+
+class LatencyHistogram:
+    """Recent latency distribution of an endpoint, for percentile thresholds.
+
+    Latencies are counted in log-spaced buckets, each ``growth`` times wider
+    than the previous one, from ``minimum`` seconds up. Every ``decay_every``
+    observations all counts are halved, so the percentiles follow the
+    endpoint as its latency drifts.
+    """
+
+    def __init__(
+        self,
+        minimum: float = 0.01,
+        growth: float = 1.2,
+        buckets: int = 64,
+        min_samples: int = 20,
+        decay_every: int = 500
+    ):
+        """Initialize an empty histogram.
+
+        Args:
+            minimum: Upper bound of the first bucket, in seconds
+            growth: Ratio between the bounds of consecutive buckets
+            buckets: Number of buckets; the last one is unbounded
+            min_samples: Observations needed before percentiles are reported
+            decay_every: Observations between halvings of the counts
+        """
+        self.minimum = minimum
+        self.growth = growth
+        self.min_samples = min_samples
+        self.decay_every = decay_every
+        self._log_growth = math.log(growth)
+        self._counts = [0.0] * buckets
+        self._total = 0.0
+        self._since_decay = 0
+        self._lock = threading.Lock()
+
+    def observe(self, seconds: float) -> None:
+        """Count one latency."""
+        index = 0
+        if seconds > self.minimum:
+            index = min(len(self._counts) - 1, math.ceil(math.log(seconds / self.minimum) / self._log_growth))
+        with self._lock:
+            self._counts[index] += 1
+            self._total += 1
+            self._since_decay += 1
+            if self._since_decay >= self.decay_every:
+                self._counts = [count / 2 for count in self._counts]
+                self._total /= 2
+                self._since_decay = 0
+
+    def percentile(self, q: float) -> Optional[float]:
+        """Get the latency below which a share ``q`` of calls finished.
+
+        Returns:
+            Upper bound of the bucket holding the percentile, or None while
+            there are fewer than ``min_samples`` observations
+        """
+        with self._lock:
+            if self._total < self.min_samples:
+                return None
+            rank = q * self._total
+            seen = 0.0
+            for index, count in enumerate(self._counts):
+                seen += count
+                if seen >= rank:
+                    return self.minimum * self.growth ** index
+        return self.minimum * self.growth ** (len(self._counts) - 1)
+
+    def __len__(self) -> int:
+        return int(self._total)
+
+
+class CircuitBreaker:
+    """Stops sending requests to an endpoint that keeps failing.
+
+    After ``failure_threshold`` consecutive failures the circuit opens and
+    requests are refused for ``reset_timeout`` seconds. Then one probe per
+    ``reset_timeout`` is let through; a success closes the circuit and a
+    failure opens it again.
+    """
+
+    def __init__(
+        self,
+        failure_threshold: int = settings.AGENT_CIRCUIT_FAILURES,
+        reset_timeout: float = settings.AGENT_CIRCUIT_RESET_SECONDS,
+        clock: Callable[[], float] = time.monotonic
+    ):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.clock = clock
+        self.state = STATE_CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self._lock = threading.Lock()
+
+    def allow(self) -> bool:
+        """Check whether a request may be sent, claiming the probe when half open."""
+        with self._lock:
+            if self.state == STATE_CLOSED:
+                return True
+            # A probe that never reports back is replaced after another timeout
+            now = self.clock()
+            if now - self.opened_at >= self.reset_timeout:
+                self.state = STATE_HALF_OPEN
+                self.opened_at = now
+                return True
+            return False
+
+    def record_success(self) -> None:
+        with self._lock:
+            self.state = STATE_CLOSED
+            self.failures = 0
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self.failures += 1
+            if self.state == STATE_HALF_OPEN or self.failures >= self.failure_threshold:
+                if self.state != STATE_OPEN:
+                    logger.warning("Agent endpoint circuit opened", extra={'failures': self.failures})
+                    telemetry.count("BedrockCircuitOpened")
+                self.state = STATE_OPEN
+                self.opened_at = self.clock()
+
+
+class HedgeBudget:
+    """Caps hedged requests to a share of all requests.
+
+    Every request earns ``ratio`` of a token, up to ``burst`` tokens, and a
+    hedge spends a whole one.
+    """
+
+    def __init__(self, ratio: float = settings.AGENT_HEDGE_MAX_RATIO, burst: float = 10):
+        self.ratio = ratio
+        self.burst = burst
+        self.tokens = burst
+        self._lock = threading.Lock()
+
+    def on_request(self) -> None:
+        with self._lock:
+            self.tokens = min(self.burst, self.tokens + self.ratio)
+
+    def try_spend(self) -> bool:
+        with self._lock:
+            if self.tokens >= 1:
+                self.tokens -= 1
+                return True
+            return False
+
+
+class AgentEndpoint:
+    """An agent alias in a region, with its client and health."""
+
+    def __init__(
+        self,
+        region: str,
+        agent_id: str,
+        agent_alias_id: str,
+        client_factory: Callable[[str], Any],
+        breaker: Optional[CircuitBreaker] = None,
+        histogram: Optional[LatencyHistogram] = None
+    ):
+        """Initialize the endpoint.
+
+        Args:
+            region: AWS region of the agent
+            agent_id: Bedrock agent ID
+            agent_alias_id: Bedrock agent alias ID
+            client_factory: Builds a ``bedrock-agent-runtime`` client for a
+                region; called on first use
+            breaker: Circuit breaker, a default one if omitted
+            histogram: Time-to-first-chunk histogram, a default one if omitted
+        """
+        self.region = region
+        self.agent_id = agent_id
+        self.agent_alias_id = agent_alias_id
+        self.client_factory = client_factory
+        # An empty histogram is falsy, so test for None explicitly
+        self.breaker = CircuitBreaker() if breaker is None else breaker
+        self.histogram = LatencyHistogram() if histogram is None else histogram
+        self._client = None
+        self._lock = threading.Lock()
+
+    @property
+    def client(self) -> Any:
+        if self._client is None:
+            with self._lock:
+                if self._client is None:
+                    self._client = self.client_factory(self.region)
+        return self._client
+
+    @client.setter
+    def client(self, client: Any) -> None:
+        self._client = client
+
+    @property
+    def name(self) -> str:
+        return f"{self.region}/{self.agent_id}/{self.agent_alias_id}"
+
+
+def parse_endpoints(spec: str) -> List[Tuple[str, str, str]]:
+    """Parse comma-separated ``region:agent_id:alias_id`` entries.
+
+    Raises:
+        ValueError: If an entry does not have three parts
+    """
+    endpoints = []
+    for entry in spec.split(","):
+        entry = entry.strip()
+        if not entry:
+            continue
+        parts = entry.split(":")
+        if len(parts) != 3 or not all(parts):
+            raise ValueError(f"Invalid agent endpoint {entry!r}, expected region:agent_id:alias_id")
+        endpoints.append((parts[0], parts[1], parts[2]))
+    return endpoints
+
+
+class AgentRouter:
+    """Sends agent requests to a list of endpoints with failover and hedging."""
+
+    def __init__(
+        self,
+        endpoints: List[AgentEndpoint],
+        hedge_percentile: float = settings.AGENT_HEDGE_PERCENTILE,
+        hedge_min_delay: float = settings.AGENT_HEDGE_MIN_DELAY,
+        hedge_budget: Optional[HedgeBudget] = None,
+        clock: Callable[[], float] = time.monotonic
+    ):
+        """Initialize the router.
+
+        Args:
+            endpoints: Endpoints in order of preference
+            hedge_percentile: Time-to-first-chunk percentile after which a
+                hedge is sent, e.g. 0.95; 0 disables hedging
+            hedge_min_delay: Seconds to wait before hedging in any case
+            hedge_budget: Cap on hedged requests, a default one if omitted
+            clock: Monotonic time source
+        """
+        if not endpoints:
+            raise ValueError("At least one agent endpoint is required")
+        self.endpoints = endpoints
+        self.hedge_percentile = hedge_percentile
+        self.hedge_min_delay = hedge_min_delay
+        self.hedge_budget = hedge_budget or HedgeBudget()
+        self.clock = clock
+
+    def invoke(
+        self,
+        request: Dict[str, Any],
+        session_state: Optional[Dict[str, Any]] = None
+    ) -> Iterator[Dict[str, Any]]:
+        """Invoke the agent and yield the completion events of one endpoint.
+
+        Args:
+            request: ``invoke_agent`` arguments other than the agent and alias
+            session_state: Full session state, sent on every request when
+                there are several endpoints since any of them may have missed
+                the turn that set the attributes
+
+        Raises:
+            CircuitOpenError: If every endpoint's circuit is open
+        """
+        # Only the endpoint about to be tried is asked, since asking a half
+        # open circuit claims its one probe
+        first = next((index for index, endpoint in enumerate(self.endpoints) if endpoint.breaker.allow()), None)
+        if first is None:
+            raise CircuitOpenError("All agent endpoints are unavailable")
+        self.hedge_budget.on_request()
+        candidates = self.endpoints[first:]
+        if len(self.endpoints) == 1:
+            session_state = None
+        if self.hedge_percentile > 0 and len(candidates) > 1:
+            return self._race(candidates, request, session_state)
+        return self._sequential(candidates, request, session_state)
+
+    @staticmethod
+    def _request_for(
+        endpoint: AgentEndpoint,
+        request: Dict[str, Any],
+        session_state: Optional[Dict[str, Any]]
+    ) -> Dict[str, Any]:
+        endpoint_request = dict(request, agentId=endpoint.agent_id, agentAliasId=endpoint.agent_alias_id)
+        if session_state is not None and 'sessionState' not in endpoint_request:
+            endpoint_request['sessionState'] = session_state
+        return endpoint_request
+
+    def _sequential(
+        self,
+        candidates: List[AgentEndpoint],
+        request: Dict[str, Any],
+        session_state: Optional[Dict[str, Any]]
+    ) -> Iterator[Dict[str, Any]]:
+        """Try the endpoints in turn until one produces a first event.
+
+        The first endpoint's circuit has let the request through already;
+        each of the others is asked when it is reached.
+        """
+        error: Optional[Exception] = None
+        for index, endpoint in enumerate(candidates):
+            if index and not endpoint.breaker.allow():
+                continue
+            if error is not None:
+                logger.warning(f"Agent endpoint failed, failing over to {endpoint.name}: {str(error)}")
+                telemetry.count("BedrockFailover")
+            started = self.clock()
+            try:
+                endpoint_request = self._request_for(endpoint, request, session_state)
+                events = iter(endpoint.client.invoke_agent(**endpoint_request).get('completion', []))
+                first = next(events, _END)
+            except Exception as e:
+                if not is_failover_error(e):
+                    raise
+                endpoint.breaker.record_failure()
+                error = e
+                continue
+            endpoint.histogram.observe(self.clock() - started)
+            endpoint.breaker.record_success()
+            if first is not _END:
+                yield first
+                yield from events
+            return
+        if error is not None:
+            raise error
+
+    def _race(
+        self,
+        candidates: List[AgentEndpoint],
+        request: Dict[str, Any],
+        session_state: Optional[Dict[str, Any]]
+    ) -> Iterator[Dict[str, Any]]:
+        """Start on the first endpoint and hedge or fail over to the next ones.
+
+        Each attempt reads its stream on its own thread into a shared queue.
+        The first attempt to produce an event wins and is streamed; the
+        others stop reading at their next event. An error that does not
+        call for failover ends the request only once no other attempt is
+        still running.
+        """
+        events: "queue.Queue[Tuple[_Attempt, Any]]" = queue.Queue()
+        attempts: List[_Attempt] = []
+        remaining = iter(candidates[1:])
+
+        def start(endpoint: AgentEndpoint) -> _Attempt:
+            attempt = _Attempt(endpoint, self._request_for(endpoint, request, session_state), events, self.clock)
+            attempts.append(attempt)
+            attempt.start()
+            return attempt
+
+        def start_next() -> Optional[_Attempt]:
+            """Start on the next endpoint whose circuit lets the request through, if any."""
+            for endpoint in remaining:
+                if endpoint.breaker.allow():
+                    return start(endpoint)
+            return None
+
+        start(candidates[0])
+        threshold = candidates[0].histogram.percentile(self.hedge_percentile)
+        hedge_at = None if threshold is None else self.clock() + max(threshold, self.hedge_min_delay)
+        more = True
+        running = 1
+        winner = None
+        try:
+            while winner is None:
+                timeout = None
+                if hedge_at is not None and more:
+                    timeout = max(0.0, hedge_at - self.clock())
+                try:
+                    attempt, item = events.get(timeout=timeout)
+                except queue.Empty:
+                    hedge_at = None
+                    if self.hedge_budget.try_spend():
+                        hedge = start_next()
+                        if hedge is None:
+                            more = False
+                        else:
+                            logger.info(f"Hedging agent request to {hedge.endpoint.name}")
+                            telemetry.count("BedrockHedged")
+                            running += 1
+                    continue
+                if isinstance(item, Exception):
+                    running -= 1
+                    if is_failover_error(item) and more:
+                        next_attempt = start_next()
+                        if next_attempt is not None:
+                            logger.warning(
+                                f"Agent endpoint {attempt.endpoint.name} failed, "
+                                f"failing over to {next_attempt.endpoint.name}: {str(item)}"
+                            )
+                            telemetry.count("BedrockFailover")
+                            running += 1
+                            continue
+                        more = False
+                    if not running:
+                        raise item
+                    logger.warning(
+                        f"Agent endpoint {attempt.endpoint.name} failed while another attempt runs: {str(item)}"
+                    )
+                    continue
+                winner = attempt
+                if attempt is not attempts[0]:
+                    telemetry.count("BedrockHedgeWon")
+                if item is _END:
+                    return
+                yield item
+
+            while True:
+                attempt, item = events.get()
+                if attempt is not winner:
+                    continue
+                if item is _END:
+                    return
+                if isinstance(item, Exception):
+                    raise item
+                yield item
+        finally:
+            for attempt in attempts:
+                attempt.cancelled = True
+
+
+class _Attempt:
+    """One endpoint's request, read on a daemon thread."""
+
+    def __init__(
+        self,
+        endpoint: AgentEndpoint,
+        request: Dict[str, Any],
+        events: "queue.Queue[Tuple[_Attempt, Any]]",
+        clock: Callable[[], float]
+    ):
+        self.endpoint = endpoint
+        self.request = request
+        self.events = events
+        self.clock = clock
+        self.cancelled = False
+
+    def start(self) -> None:
+        threading.Thread(target=self._run, daemon=True).start()
+
+    def _run(self) -> None:
+        started = self.clock()
+        first = True
+        try:
+            stream = self.endpoint.client.invoke_agent(**self.request).get('completion', [])
+            for event in stream:
+                if first:
+                    self._first_event(started)
+                    first = False
+                if self.cancelled:
+                    close = getattr(stream, 'close', None)
+                    if close is not None:
+                        close()
+                    return
+                self.events.put((self, event))
+            if first:
+                self._first_event(started)
+            self.events.put((self, _END))
+        except Exception as e:
+            if is_failover_error(e):
+                self.endpoint.breaker.record_failure()
+            self.events.put((self, e))
+
+    def _first_event(self, started: float) -> None:
+        """Record that the endpoint answered, and how long it took."""
+        self.endpoint.histogram.observe(self.clock() - started)
+        self.endpoint.breaker.record_success()
@@ -0,0 +1,338 @@
+"""Bedrock agent session management.
+
+The agent keeps conversation history per ``sessionId``, and responses slow
+down as a session grows. Sessions are mapped per user and chat and rotated
+to a fresh id after a period of inactivity or a number of turns; ``/reset``
+starts a new one on request. Session attributes persist for the life of a
+session, so they are only sent when a session starts or they change.
+"""
+
+import hashlib
+import json
+import secrets
+import threading
+import time
+from typing import Any, Callable, Dict, Optional
+
+from aws_lambda_powertools import Logger
+
+from ..config import settings
+from ..utils.cache import LRUCache
+
+logger = Logger()
+
+# Reasons a session ends
+ROTATE_IDLE = "idle"
+ROTATE_TURNS = "turns"
+ROTATE_RESET = "reset"
+
+
+class AgentSession:
+    """An agent session and its usage so far."""
+
+    __slots__ = (
+        "key", "session_id", "started_at", "last_used", "turns",
+        "attributes_digest", "latency_total", "latency_max"
+    )
+
+    def __init__(
+        self,
+        key: str,
+        session_id: str,
+        started_at: float,
+        last_used: Optional[float] = None,
+        turns: int = 0,
+        attributes_digest: Optional[str] = None,
+        latency_total: float = 0.0,
+        latency_max: float = 0.0
+    ):
+        """Initialize the session.
+
+        Args:
+            key: User and chat the session belongs to
+            session_id: Agent session ID
+            started_at: Epoch seconds the session started
+            last_used: Epoch seconds of the last completed turn
+            turns: Completed turns
+            attributes_digest: Digest of the session attributes last sent
+            latency_total: Agent seconds summed over all turns
+            latency_max: Slowest turn in seconds
+        """
+        self.key = key
+        self.session_id = session_id
+        self.started_at = started_at
+        self.last_used = started_at if last_used is None else last_used
+        self.turns = turns
+        self.attributes_digest = attributes_digest
+        self.latency_total = latency_total
+        self.latency_max = latency_max
+
+    def attributes_to_send(self, attributes: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """Get the attributes if the agent does not have them yet, otherwise None."""
+        if digest_attributes(attributes) == self.attributes_digest:
+            return None
+        return attributes
+
+    def to_item(self) -> Dict[str, Any]:
+        """Get a JSON-serializable representation."""
+        return {slot: getattr(self, slot) for slot in self.__slots__}
+
+    @classmethod
+    def from_item(cls, item: Dict[str, Any]) -> "AgentSession":
+        """Build from :meth:`to_item` output."""
+        return cls(**{slot: item.get(slot) for slot in cls.__slots__ if slot in item})
+
+    def __repr__(self) -> str:
+        return f"AgentSession(session_id={self.session_id!r}, turns={self.turns})"
+
+
+def digest_attributes(attributes: Dict[str, Any]) -> str:
+    """Get a stable digest of session attributes."""
+    encoded = json.dumps(attributes, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(encoded.encode()).hexdigest()[:16]
+
+
+def session_key(user_id: Any, chat_id: Optional[Any] = None) -> str:
+    """Get the key a user's session is stored under.
+
+    Private chats share the user's ID, so they are keyed on the user alone;
+    a user talking to the bot in a group gets a separate session there.
+    """
+    if chat_id is None or str(chat_id) == str(user_id):
+        return str(user_id)
+    return f"{chat_id}:{user_id}"
+
+
+class SessionStore:
+    """Interface of a session mapping backend."""
+
+    def get(self, key: str) -> Optional[AgentSession]:
+        raise NotImplementedError
+
+    def put(self, session: AgentSession) -> None:
+        raise NotImplementedError
+
+    def delete(self, key: str) -> None:
+        raise NotImplementedError
+
+
+class InMemorySessionStore(SessionStore):
+    """Session mapping within one warm container, bounded by an LRU.
+
+    A container that has not seen a user yet starts a new session for them.
+    """
+
+    def __init__(
+        self,
+        maxsize: int = settings.SESSION_CACHE_SIZE,
+        ttl: float = settings.SESSION_IDLE_SECONDS
+    ):
+        # Without an idle limit, sessions are only evicted by size
+        self._entries = LRUCache(maxsize=maxsize, ttl=ttl or float("inf"))
+
+    def get(self, key: str) -> Optional[AgentSession]:
+        return self._entries.get(key)
+
+    def put(self, session: AgentSession) -> None:
+        self._entries.set(session.key, session)
+
+    def delete(self, key: str) -> None:
+        self._entries.delete(key)
+
+
+class DynamoDBSessionStore(SessionStore):
+    """Session mapping shared by all containers.
+
+    Items are keyed on ``session_key``, hold the session as a JSON string in
+    ``session`` and carry an ``expires_at`` epoch used as the table's TTL
+    attribute.
+    """
+
+    def __init__(
+        self,
+        table_name: str,
+        client: Optional[Any] = None,
+        ttl: float = settings.SESSION_IDLE_SECONDS
+    ):
+        """Initialize the store.
+
+        Args:
+            table_name: DynamoDB table with a ``session_key`` string hash key
+            client: boto3 DynamoDB client, created on first use by default
+            ttl: Seconds an unused session is kept, 0 to keep it until replaced
+        """
+        self.table_name = table_name
+        self._client = client
+        self.ttl = ttl
+
+    @property
+    def client(self) -> Any:
+        if self._client is None:
+            import boto3
+            self._client = boto3.client('dynamodb')
+        return self._client
+
+    def get(self, key: str) -> Optional[AgentSession]:
+        response = self.client.get_item(
+            TableName=self.table_name,
+            Key={'session_key': {'S': key}}
+        )
+        item = response.get('Item')
+        if not item:
+            return None
+        return AgentSession.from_item(json.loads(item['session']['S']))
+
+    def put(self, session: AgentSession) -> None:
+        item = {
+            'session_key': {'S': session.key},
+            'session': {'S': json.dumps(session.to_item())}
+        }
+        if self.ttl:
+            item['expires_at'] = {'N': str(int(session.last_used + self.ttl))}
+        self.client.put_item(TableName=self.table_name, Item=item)
+
+    def delete(self, key: str) -> None:
+        self.client.delete_item(
+            TableName=self.table_name,
+            Key={'session_key': {'S': key}}
+        )
+
+
+def create_session_store() -> SessionStore:
+    """Create the store configured by ``settings.SESSION_TABLE_NAME``."""
+    if settings.SESSION_TABLE_NAME:
+        return DynamoDBSessionStore(settings.SESSION_TABLE_NAME)
+    return InMemorySessionStore()
+
+
+class SessionManager:
+    """Maps users to agent sessions and rotates them.
+
+    A session is replaced by a new one when it has been idle for
+    ``idle_seconds`` or has reached ``max_turns`` turns. Turns of one chat
+    are processed in order, so a session is never used by two turns at once.
+    """
+
+    def __init__(
+        self,
+        store: Optional[SessionStore] = None,
+        idle_seconds: float = settings.SESSION_IDLE_SECONDS,
+        max_turns: int = settings.SESSION_MAX_TURNS,
+        clock: Callable[[], float] = time.time
+    ):
+        """Initialize the manager.
+
+        Args:
+            store: Session mapping backend, configured from settings by default
+            idle_seconds: Inactivity after which a new session starts, 0 for no limit
+            max_turns: Turns after which a new session starts, 0 for no limit
+            clock: Wall-clock time source
+        """
+        self.store = store or create_session_store()
+        self.idle_seconds = idle_seconds
+        self.max_turns = max_turns
+        self.clock = clock
+        self._lock = threading.Lock()
+        self.started = 0
+        self.rotations: Dict[str, int] = {ROTATE_IDLE: 0, ROTATE_TURNS: 0, ROTATE_RESET: 0}
+        self.turns = 0
+        self.latency_total = 0.0
+
+    def acquire(self, user_id: Any, chat_id: Optional[Any] = None) -> AgentSession:
+        """Get the session for the next turn, starting a new one if needed.
+
+        Args:
+            user_id: Telegram user ID
+            chat_id: Telegram chat ID
+
+        Returns:
+            Session to send the turn to
+        """
+        key = session_key(user_id, chat_id)
+        now = self.clock()
+        session = self.store.get(key)
+        if session is not None:
+            reason = self._rotation_reason(session, now)
+            if reason is None:
+                return session
+            self._end(session, reason)
+        return self._start(key, now)
+
+    def record(
+        self,
+        session: AgentSession,
+        latency: float,
+        attributes: Optional[Dict[str, Any]] = None
+    ) -> None:
+        """Record a completed turn.
+
+        Args:
+            session: Session the turn was sent to
+            latency: Agent seconds the turn took
+            attributes: Session attributes sent with the turn, if any
+        """
+        session.turns += 1
+        session.last_used = self.clock()
+        session.latency_total += latency
+        session.latency_max = max(session.latency_max, latency)
+        if attributes is not None:
+            session.attributes_digest = digest_attributes(attributes)
+        self.store.put(session)
+        with self._lock:
+            self.turns += 1
+            self.latency_total += latency
+        logger.info("Agent session turn", extra={
+            'session_id': session.session_id,
+            'turns': session.turns,
+            'latency_ms': round(latency * 1000, 2),
+            'latency_avg_ms': round(session.latency_total / session.turns * 1000, 2)
+        })
+
+    def reset(self, user_id: Any, chat_id: Optional[Any] = None) -> None:
+        """End the current session so the next turn starts a new conversation."""
+        key = session_key(user_id, chat_id)
+        session = self.store.get(key)
+        self.store.delete(key)
+        if session is not None:
+            self._end(session, ROTATE_RESET)
+
+    def stats(self) -> Dict[str, float]:
+        """Get session starts, rotations by reason and turn latency."""
+        return {
+            'sessions_started': self.started,
+            'rotations_idle': self.rotations[ROTATE_IDLE],
+            'rotations_turns': self.rotations[ROTATE_TURNS],
+            'resets': self.rotations[ROTATE_RESET],
+            'turns': self.turns,
+            'turns_per_session': self.turns / self.started if self.started else 0.0,
+            'latency_avg': self.latency_total / self.turns if self.turns else 0.0
+        }
+
+    def _rotation_reason(self, session: AgentSession, now: float) -> Optional[str]:
+        if self.idle_seconds and now - session.last_used >= self.idle_seconds:
+            return ROTATE_IDLE
+        if self.max_turns and session.turns >= self.max_turns:
+            return ROTATE_TURNS
+        return None
+
+    def _start(self, key: str, now: float) -> AgentSession:
+        # Agent session IDs allow [0-9a-zA-Z._:-]; the random suffix keeps
+        # rotations within the same second distinct
+        session = AgentSession(key, f"{key}-{int(now)}-{secrets.token_hex(3)}", started_at=now)
+        with self._lock:
+            self.started += 1
+        return session
+
+    def _end(self, session: AgentSession, reason: str) -> None:
+        with self._lock:
+            self.rotations[reason] += 1
+        logger.info("Agent session ended", extra={
+            'session_id': session.session_id,
+            'reason': reason,
+            'turns': session.turns,
+            'age_seconds': round(self.clock() - session.started_at, 1),
+            'latency_avg_ms': round(
+                session.latency_total / session.turns * 1000 if session.turns else 0.0, 2
+            ),
+            'latency_max_ms': round(session.latency_max * 1000, 2)
+        })
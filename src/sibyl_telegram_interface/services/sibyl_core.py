@@ -2,28 +2,64 @@
 
 from typing import Optional, Dict, Any
 import os
-import boto3
-from botocore.auth import SigV4Auth
 from botocore.awsrequest import AWSRequest
 from sibyl_core_sdk import Configuration, ApiClient
 from sibyl_core_sdk.api.default_api import DefaultApi
 from sibyl_core_sdk.models import UsersPostRequest
 from ..config import settings
+from ..utils.aio import run_sync
+from ..utils.cache import LRUCache, SingleFlight
+from ..utils.deadline import call_timeout
+from ..utils.sigv4 import RequestSigner
+
+# Cached marker for Telegram IDs that have no Sibyl Core user
+_NOT_FOUND = object()
+
+
+def _is_not_found(error: Exception) -> bool:
+    """Check whether an SDK error is an HTTP 404."""
+    return getattr(error, "status", None) == 404
+
+
+def _request_timeout() -> float:
+    """Get the timeout for an API call, capped by the invocation deadline."""
+    return call_timeout(settings.SIBYL_CORE_TIMEOUT)
+
+
+def _user_id_of(user: Any) -> Optional[str]:
+    """Get the UUID of an SDK user model or dict."""
+    if isinstance(user, dict):
+        return user.get("id")
+    return getattr(user, "id", None)
 
 
 class SibylCoreService:
     """Service wrapper for Sibyl Core APIs."""
 
-    def __init__(self):
-        """Initialize Sibyl Core service."""
+    def __init__(self, api: Optional[DefaultApi] = None, user_cache: Optional[LRUCache] = None):
+        """Initialize Sibyl Core service.
+
+        Args:
+            api: API client to use instead of a SigV4-signed DefaultApi
+            user_cache: Cache of Telegram ID to user lookups
+        """
+        if user_cache is None:
+            user_cache = LRUCache(maxsize=settings.USER_CACHE_SIZE, ttl=settings.USER_CACHE_TTL)
+        self.user_cache = user_cache
+        self._lookups = SingleFlight()
+        if api is not None:
+            self.api = api
+            return
+
         configuration = Configuration()
         configuration.host = os.getenv("API_ENDPOINT")
         
-        # Initialize AWS credentials
+        # Credentials are refreshed by the signer, not frozen at init
         self.region = os.getenv("AWS_REGION", "us-east-1")
-        aws_session = boto3.Session()
-        credentials = aws_session.get_credentials()
-        self.credentials = credentials.get_frozen_credentials()
+        self.signer = RequestSigner(
+            "execute-api",  # AWS service name for API Gateway
+            self.region
+        )
         
         # Create API client with custom auth
         api_client = ApiClient(configuration=configuration)
@@ -38,11 +74,7 @@ class SibylCoreService:
         Args:
             request: Request to sign
         """
-        SigV4Auth(
-            self.credentials, 
-            "execute-api",  # AWS service name for API Gateway
-            self.region
-        ).add_auth(request)
+        self.signer.sign(request)
 
     def create_user(self, telegram_id: int, name: str) -> Dict[str, Any]:
         """Create a new user.
@@ -58,7 +90,9 @@ class SibylCoreService:
             telegram_id=telegram_id,
             name=name
         )
-        return self.api.users_post(users_post_request=request)
+        user = self.api.users_post(users_post_request=request, _request_timeout=_request_timeout())
+        self.user_cache.set(telegram_id, user)
+        return user
 
     def get_user(self, user_id: str) -> Optional[Dict[str, Any]]:
         """Get user by UUID.
@@ -70,12 +104,15 @@ class SibylCoreService:
             Dict containing user information if found, None otherwise
         """
         try:
-            return self.api.users_id_get(id=user_id)
+            return self.api.users_id_get(id=user_id, _request_timeout=_request_timeout())
         except Exception:  # Replace with specific exception from SDK
             return None
 
     def get_user_by_telegram_id(self, telegram_id: int) -> Optional[Dict[str, Any]]:
         """Get user by Telegram ID.
+
+        Lookups are cached, including not-found results for a shorter TTL,
+        and concurrent lookups of the same ID share one API call.
         
         Args:
             telegram_id: Telegram user ID
@@ -83,10 +120,23 @@ class SibylCoreService:
         Returns:
             Dict containing user information if found, None otherwise
         """
+        cached = self.user_cache.get(telegram_id)
+        if cached is not None:
+            return None if cached is _NOT_FOUND else cached
+        return self._lookups.do(telegram_id, lambda: self._fetch_user_by_telegram_id(telegram_id))
+
+    def _fetch_user_by_telegram_id(self, telegram_id: int) -> Optional[Dict[str, Any]]:
+        """Fetch a user by Telegram ID from the API and cache the result."""
         try:
-            return self.api.users_telegram_telegram_id_get(telegram_id=str(telegram_id))
-        except Exception:  # Replace with specific exception from SDK
+            user = self.api.users_telegram_telegram_id_get(
+                telegram_id=str(telegram_id), _request_timeout=_request_timeout()
+            )
+        except Exception as e:  # Replace with specific exception from SDK
+            if _is_not_found(e):
+                self.user_cache.set(telegram_id, _NOT_FOUND, ttl=settings.USER_CACHE_NEGATIVE_TTL)
             return None
+        self.user_cache.set(telegram_id, user)
+        return user
 
     def update_user(self, user_id: str, telegram_id: int, name: str) -> Optional[Dict[str, Any]]:
         """Update user information.
@@ -104,9 +154,17 @@ class SibylCoreService:
             name=name
         )
         try:
-            return self.api.users_id_put(id=user_id, users_post_request=request)
+            user = self.api.users_id_put(
+                id=user_id, users_post_request=request, _request_timeout=_request_timeout()
+            )
         except Exception:  # Replace with specific exception from SDK
+            self._forget_user(user_id)
+            self.user_cache.delete(telegram_id)
             return None
+        # The Telegram ID may have changed, so drop any entry for the old one
+        self._forget_user(user_id)
+        self.user_cache.set(telegram_id, user)
+        return user
 
     def delete_user(self, user_id: str) -> bool:
         """Delete a user.
@@ -118,7 +176,53 @@ class SibylCoreService:
             True if user was deleted successfully, False otherwise
         """
         try:
-            self.api.users_id_delete(id=user_id)
+            self.api.users_id_delete(id=user_id, _request_timeout=_request_timeout())
             return True
         except Exception:  # Replace with specific exception from SDK
-            return False
\ No newline at end of file
+            return False
+        finally:
+            self._forget_user(user_id)
+
+    def _forget_user(self, user_id: str) -> None:
+        """Drop cached lookups that resolved to the given user."""
+        self.user_cache.delete_where(
+            lambda _, user: user is not _NOT_FOUND and _user_id_of(user) == user_id
+        )
+
+class AsyncSibylCoreService:
+    """Asyncio interface to a :class:`SibylCoreService`.
+
+    Calls run on the shared async I/O pool and share the wrapped service's
+    user cache.
+    """
+
+    def __init__(self, service: SibylCoreService):
+        """Initialize the wrapper.
+
+        Args:
+            service: Service whose calls are made
+        """
+        self.service = service
+
+    async def create_user(self, telegram_id: int, name: str) -> Dict[str, Any]:
+        """Create a new user."""
+        return await run_sync(self.service.create_user, telegram_id, name)
+
+    async def get_user(self, user_id: str) -> Optional[Dict[str, Any]]:
+        """Get user by UUID."""
+        return await run_sync(self.service.get_user, user_id)
+
+    async def get_user_by_telegram_id(self, telegram_id: int) -> Optional[Dict[str, Any]]:
+        """Get user by Telegram ID."""
+        if telegram_id in self.service.user_cache:
+            # Served from memory, no need for a thread
+            return self.service.get_user_by_telegram_id(telegram_id)
+        return await run_sync(self.service.get_user_by_telegram_id, telegram_id)
+
+    async def update_user(self, user_id: str, telegram_id: int, name: str) -> Optional[Dict[str, Any]]:
+        """Update user information."""
+        return await run_sync(self.service.update_user, user_id, telegram_id, name)
+
+    async def delete_user(self, user_id: str) -> bool:
+        """Delete a user."""
+        return await run_sync(self.service.delete_user, user_id)
@@ -39,7 +39,7 @@ class UserService:
         Returns:
             Dict containing user information if found, None otherwise
         """
-        return self.client.get_user_by_id(user_id=user_id)
+        return self.client.get_user(user_id=user_id)
 
     def get_user_by_telegram_id(self, telegram_id: int) -> Optional[Dict[str, Any]]:
         """Get user by Telegram user ID.
@@ -0,0 +1,118 @@
+"""Telegram webhook source validation."""
+
+import hmac
+import ipaddress
+from bisect import bisect_right
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from ..config import settings
+
+
+class IPAllowlist:
+    """Set of IPv4/IPv6 networks with O(log n) membership checks.
+
+    Networks are parsed once into sorted, merged integer intervals, so a
+    lookup is a single bisect instead of parsing every CIDR per request.
+    """
+
+    def __init__(self, networks: Iterable[str]):
+        """Initialize the allowlist.
+
+        Args:
+            networks: CIDR strings, IPv4 or IPv6
+
+        Raises:
+            ValueError: If a network is not a valid CIDR
+        """
+        intervals: Dict[int, List[Tuple[int, int]]] = {4: [], 6: []}
+        for network in networks:
+            network = network.strip()
+            if not network:
+                continue
+            parsed = ipaddress.ip_network(network, strict=False)
+            intervals[parsed.version].append(
+                (int(parsed.network_address), int(parsed.broadcast_address))
+            )
+
+        self._starts: Dict[int, List[int]] = {}
+        self._ends: Dict[int, List[int]] = {}
+        for version, ranges in intervals.items():
+            merged: List[Tuple[int, int]] = []
+            for start, end in sorted(ranges):
+                if merged and start <= merged[-1][1] + 1:
+                    merged[-1] = (merged[-1][0], max(merged[-1][1], end))
+                else:
+                    merged.append((start, end))
+            self._starts[version] = [start for start, _ in merged]
+            self._ends[version] = [end for _, end in merged]
+
+    @classmethod
+    def from_string(cls, networks: str) -> "IPAllowlist":
+        """Build an allowlist from a comma-separated list of CIDRs."""
+        return cls(networks.split(","))
+
+    def __contains__(self, ip_address: str) -> bool:
+        """Check whether an IP address falls inside any allowed network."""
+        try:
+            address = ipaddress.ip_address(ip_address.strip())
+        except ValueError:
+            return False
+        if address.version == 6 and address.ipv4_mapped is not None:
+            address = address.ipv4_mapped
+
+        value = int(address)
+        starts = self._starts[address.version]
+        index = bisect_right(starts, value) - 1
+        return index >= 0 and value <= self._ends[address.version][index]
+
+
+def client_ip(forwarded_for: str, trusted_hops: int = settings.TRUSTED_PROXY_HOPS) -> Optional[str]:
+    """Extract the client address from an ``X-Forwarded-For`` value.
+
+    Each proxy appends the address it received the request from, so the
+    entries on the left are client-controlled. The client is the entry just
+    before the ``trusted_hops`` proxies we operate.
+
+    Args:
+        forwarded_for: Raw header value, e.g. ``"1.2.3.4, 10.0.0.1"``
+        trusted_hops: Number of trusted proxies appending to the header
+
+    Returns:
+        Client IP address, or None if the header has too few entries
+    """
+    hops = [hop.strip() for hop in forwarded_for.split(",") if hop.strip()]
+    if len(hops) <= trusted_hops:
+        return None
+    return hops[-1 - trusted_hops]
+
+
+def verify_secret_token(received: Optional[str], expected: str) -> bool:
+    """Check the ``X-Telegram-Bot-Api-Secret-Token`` header in constant time."""
+    if not received:
+        return False
+    return hmac.compare_digest(received.encode(), expected.encode())
+
+
+_ALLOWLISTS: Dict[str, IPAllowlist] = {}
+
+
+def get_allowlist() -> IPAllowlist:
+    """Get the current Telegram IP allowlist.
+
+    Ranges come from ``settings.TELEGRAM_IP_RANGES``, or from the SSM
+    parameter named by ``settings.TELEGRAM_IP_RANGES_PARAM_PATH`` when set.
+    SSM values go through the parameter cache, so an updated parameter is
+    picked up within the cache TTL without a redeploy. The allowlist is only
+    rebuilt when the raw value changes.
+    """
+    raw = settings.TELEGRAM_IP_RANGES
+    if settings.TELEGRAM_IP_RANGES_PARAM_PATH:
+        from ..utils.ssm import parameter_cache
+        raw = parameter_cache.get(settings.TELEGRAM_IP_RANGES_PARAM_PATH, decrypt=False)
+
+    allowlist = _ALLOWLISTS.get(raw)
+    if allowlist is None:
+        allowlist = IPAllowlist.from_string(raw)
+        _ALLOWLISTS.clear()
+        _ALLOWLISTS[raw] = allowlist
+    return allowlist
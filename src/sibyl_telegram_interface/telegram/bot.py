@@ -1,57 +1,492 @@
 """Telegram bot implementation."""
 
-import ipaddress
+import re
+import threading
+import time
 import requests
-from typing import Dict, Any
+from requests.adapters import HTTPAdapter
+from aws_lambda_powertools import Logger
+from typing import Callable, Dict, Any, List, Optional, Tuple
 from ..config import settings
+from ..utils import telemetry
+from ..utils.aio import run_sync
+from ..utils.deadline import call_timeout
+from .allowlist import client_ip, get_allowlist
+from .formatting import split_message
+from .scheduler import PRIORITY_INTERACTIVE, SendScheduler
+
+# Status codes worth retrying: rate limiting and transient server errors
+RETRYABLE_STATUS_CODES = (429, 500, 502, 503, 504)
+
+# Characters and length Telegram accepts for a webhook secret token
+SECRET_TOKEN_PATTERN = re.compile(r"[A-Za-z0-9_-]{1,256}")
+# Most updates a single getUpdates call returns
+MAX_UPDATES_LIMIT = 100
+
+logger = Logger()
+
+_SESSION: Optional[requests.Session] = None
+_SCHEDULER: Optional[SendScheduler] = None
+_BOTS: Dict[str, "TelegramBot"] = {}
+_LOCK = threading.RLock()
+
+
+def create_session(pool_size: int = settings.TELEGRAM_POOL_SIZE) -> requests.Session:
+    """Create an HTTP session with a keep-alive connection pool.
+
+    Args:
+        pool_size: Maximum number of pooled connections to the Bot API
+
+    Returns:
+        Configured requests session
+    """
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+
+def get_session() -> requests.Session:
+    """Get the process-wide HTTP session, creating it on first use."""
+    global _SESSION
+    if _SESSION is None:
+        with _LOCK:
+            if _SESSION is None:
+                _SESSION = create_session()
+    return _SESSION
+
+
+def get_scheduler() -> SendScheduler:
+    """Get the process-wide send scheduler shared by all bots."""
+    global _SCHEDULER
+    if _SCHEDULER is None:
+        with _LOCK:
+            if _SCHEDULER is None:
+                _SCHEDULER = SendScheduler()
+    return _SCHEDULER
+
+
+def get_bot(
+    bot_token: str,
+    on_unauthorized: Optional[Callable[[], None]] = None
+) -> "TelegramBot":
+    """Get the process-wide bot for a token.
+
+    Warm Lambda containers reuse the bot and its connection pool across
+    invocations instead of reconnecting to the Bot API on every request.
+
+    Args:
+        bot_token: Telegram bot token
+        on_unauthorized: Called when the Bot API rejects the token
+    """
+    bot = _BOTS.get(bot_token)
+    if bot is None:
+        with _LOCK:
+            bot = _BOTS.get(bot_token)
+            if bot is None:
+                bot = TelegramBot(bot_token, on_unauthorized=on_unauthorized)
+                _BOTS[bot_token] = bot
+    return bot
+
+
+def is_parse_error(response: Dict[str, Any]) -> bool:
+    """Check whether the Bot API rejected a message because of its markup."""
+    return (
+        not response.get("ok")
+        and response.get("error_code") == 400
+        and "parse entities" in response.get("description", "")
+    )
+
 
 class TelegramBot:
     """Telegram bot class for handling message sending and webhook configuration."""
     
-    def __init__(self, bot_token: str):
-        """Initialize the bot with the given token."""
+    def __init__(
+        self,
+        bot_token: str,
+        session: Optional[requests.Session] = None,
+        timeout: Tuple[float, float] = (
+            settings.TELEGRAM_CONNECT_TIMEOUT,
+            settings.TELEGRAM_READ_TIMEOUT
+        ),
+        max_retries: int = settings.TELEGRAM_MAX_RETRIES,
+        on_unauthorized: Optional[Callable[[], None]] = None,
+        scheduler: Optional[SendScheduler] = None,
+        queue_timeout: Optional[float] = settings.TELEGRAM_MAX_QUEUE_DELAY
+    ):
+        """Initialize the bot with the given token.
+
+        Args:
+            bot_token: Telegram bot token
+            session: HTTP session to use, defaults to the shared session
+            timeout: Connect and read timeouts in seconds
+            max_retries: Retries after a rate-limited or failed request
+            on_unauthorized: Called when the Bot API rejects the token
+            scheduler: Paces sends per chat and globally, defaults to the shared one
+            queue_timeout: Maximum seconds a send may wait for the scheduler
+        """
         self.bot_token = bot_token
         self.api_base_url = f"{settings.TELEGRAM_API_BASE}/bot{bot_token}"
-        
-        # Telegram IP ranges (should be updated periodically)
-        self.telegram_ip_ranges = [
-            '149.154.160.0/20',
-            '91.108.4.0/22',
-        ]
+        self.session = session or get_session()
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.on_unauthorized = on_unauthorized
+        self.scheduler = scheduler or get_scheduler()
+        self.queue_timeout = queue_timeout
         self.telegram_ports = ("443", "80", "88", "8443")
 
-    def validate_telegram_ip(self, ip_address: str) -> bool:
-        """Validate if the IP address belongs to Telegram."""
-        try:
-            request_ip = ipaddress.ip_address(ip_address)
-            return any(
-                request_ip in ipaddress.ip_network(range_)
-                for range_ in self.telegram_ip_ranges
-            )
-        except ValueError:
-            return False
+    def validate_telegram_ip(self, ip_address: str, forwarded: bool = False) -> bool:
+        """Validate if the IP address belongs to Telegram.
+
+        Args:
+            ip_address: Address of the peer, or an ``X-Forwarded-For`` value
+            forwarded: Whether ``ip_address`` is an ``X-Forwarded-For``
+                value, whose last ``TRUSTED_PROXY_HOPS`` entries are skipped
+        """
+        request_ip = client_ip(ip_address, settings.TRUSTED_PROXY_HOPS) if forwarded else ip_address.strip()
+        return request_ip is not None and request_ip in get_allowlist()
 
     def validate_telegram_port(self, port: str) -> bool:
         """Validate if the port belongs to Telegram."""
         return port in self.telegram_ports
         
-    def send_message(self, chat_id: int, text: str) -> Dict[str, Any]:
+    def send_message(
+        self,
+        chat_id: int,
+        text: str,
+        parse_mode: Optional[str] = "HTML",
+        priority: int = PRIORITY_INTERACTIVE
+    ) -> Dict[str, Any]:
         """Send a message to a chat."""
-        url = f"{self.api_base_url}/sendMessage"
         payload = {
             "chat_id": chat_id,
-            "text": text,
-            "parse_mode": "HTML"
+            "text": text
         }
-        response = requests.post(url, json=payload)
-        return response.json()
+        if parse_mode:
+            payload["parse_mode"] = parse_mode
+        return self._call("sendMessage", payload, priority)
 
-    def set_webhook(self, webhook_url: str) -> Dict[str, Any]:
-        """Set the webhook URL for the bot."""
-        url = f"{self.api_base_url}/setWebhook"
+    def send_long_message(
+        self,
+        chat_id: int,
+        text: str,
+        parse_mode: Optional[str] = "HTML"
+    ) -> List[Dict[str, Any]]:
+        """Send text of any length as one or more messages, in order.
+
+        The text is split into parts within Telegram's message length limit,
+        keeping HTML tags balanced in every part. A part Telegram still
+        cannot parse is resent without a parse mode.
+
+        Returns:
+            Bot API responses, one per part
+        """
+        html = parse_mode == "HTML"
+        responses = []
+        for part in split_message(text, html=html):
+            responses.append(self._send_part(chat_id, part, parse_mode))
+        return responses
+
+    def _send_part(self, chat_id: int, text: str, parse_mode: Optional[str]) -> Dict[str, Any]:
+        """Send one message, falling back to plain text on markup errors."""
+        response = self.send_message(chat_id, text, parse_mode=parse_mode)
+        if parse_mode and is_parse_error(response):
+            response = self.send_message(chat_id, text, parse_mode=None)
+        return response
+
+    def edit_message_text(
+        self,
+        chat_id: int,
+        message_id: int,
+        text: str,
+        parse_mode: Optional[str] = None,
+        priority: int = PRIORITY_INTERACTIVE
+    ) -> Dict[str, Any]:
+        """Replace the text of a previously sent message."""
         payload = {
+            "chat_id": chat_id,
+            "message_id": message_id,
+            "text": text
+        }
+        if parse_mode:
+            payload["parse_mode"] = parse_mode
+        return self._call("editMessageText", payload, priority)
+
+    def set_webhook(
+        self,
+        webhook_url: str,
+        secret_token: Optional[str] = None,
+        max_connections: Optional[int] = None,
+        drop_pending_updates: bool = False
+    ) -> Dict[str, Any]:
+        """Set the webhook URL for the bot.
+
+        Args:
+            webhook_url: HTTPS URL receiving updates
+            secret_token: Sent back by Telegram in X-Telegram-Bot-Api-Secret-Token
+            max_connections: Most simultaneous connections Telegram opens to
+                deliver updates (1-100, Telegram's default is 40)
+            drop_pending_updates: Whether to discard updates not delivered yet
+
+        Raises:
+            ValueError: If the secret token or the connection limit is not
+                accepted by Telegram
+        """
+        payload: Dict[str, Any] = {
             "url": webhook_url,
             "allowed_updates": ["message"]
         }
-        response = requests.post(url, json=payload)
-        return response.json()
+        if secret_token:
+            if not SECRET_TOKEN_PATTERN.fullmatch(secret_token):
+                raise ValueError(
+                    "Webhook secret token must be 1-256 characters of A-Z, a-z, 0-9, _ and -"
+                )
+            payload["secret_token"] = secret_token
+        if max_connections is not None:
+            if not 1 <= max_connections <= 100:
+                raise ValueError(f"max_connections must be between 1 and 100, got {max_connections}")
+            payload["max_connections"] = max_connections
+        if drop_pending_updates:
+            payload["drop_pending_updates"] = True
+        return self._call("setWebhook", payload)
+
+    def delete_webhook(self, drop_pending_updates: bool = False) -> Dict[str, Any]:
+        """Remove the webhook, which getUpdates requires.
+
+        Args:
+            drop_pending_updates: Whether to discard updates not delivered yet
+        """
+        payload: Dict[str, Any] = {}
+        if drop_pending_updates:
+            payload["drop_pending_updates"] = True
+        return self._call("deleteWebhook", payload)
+
+    def get_updates(
+        self,
+        offset: Optional[int] = None,
+        limit: int = MAX_UPDATES_LIMIT,
+        timeout: int = 0,
+        allowed_updates: Optional[List[str]] = None
+    ) -> Dict[str, Any]:
+        """Fetch pending updates, waiting up to ``timeout`` seconds for one to arrive.
+
+        Calling with an offset confirms every update with a lower ID, so
+        Telegram does not return it again.
+
+        Args:
+            offset: ID of the first update to return
+            limit: Most updates to return (1-100)
+            timeout: Seconds of long polling; 0 returns at once
+            allowed_updates: Update types to receive, messages by default
+        """
+        payload: Dict[str, Any] = {
+            "limit": max(1, min(limit, MAX_UPDATES_LIMIT)),
+            "timeout": timeout,
+            "allowed_updates": allowed_updates or ["message"]
+        }
+        if offset is not None:
+            payload["offset"] = offset
+        connect_timeout, read_timeout = self.timeout
+        # The Bot API holds the request open for the long poll
+        return self._call("getUpdates", payload, timeout=(connect_timeout, read_timeout + timeout))
+
+    def _call(
+        self,
+        method: str,
+        payload: Dict[str, Any],
+        priority: int = PRIORITY_INTERACTIVE,
+        timeout: Optional[Tuple[float, float]] = None
+    ) -> Dict[str, Any]:
+        """Call a Bot API method, retrying rate-limited and transient failures.
+
+        Calls addressed to a chat wait for the send scheduler first; a 429
+        pauses that chat in the scheduler for Telegram's ``retry_after``. A
+        call is only retried if that wait is at most
+        ``TELEGRAM_MAX_RETRY_WAIT``; otherwise the 429 is returned.
+        Connection errors are retried because the request never reached
+        Telegram. Read timeouts are not, since the message may already have
+        been delivered. Within a deadline scope, timeouts are capped by the
+        deadline and no retry is attempted that would wait past it.
+
+        Args:
+            method: Bot API method name
+            payload: JSON payload
+            priority: Scheduling priority for calls addressed to a chat
+            timeout: Connect and read timeouts, the bot's by default
+
+        Returns:
+            Decoded Bot API response, or an error response with the HTTP
+            status if the body is not JSON
+
+        Raises:
+            SendQueueTimeout: If the scheduler cannot fit the call within queue_timeout
+        """
+        url = f"{self.api_base_url}/{method}"
+        chat_id = payload.get("chat_id")
+        attempt = 0
+        while True:
+            if chat_id is not None:
+                queue_timeout = call_timeout(
+                    float("inf") if self.queue_timeout is None else self.queue_timeout
+                )
+                self.scheduler.acquire(chat_id, priority, timeout=queue_timeout)
+            timeouts = tuple(call_timeout(value) for value in timeout or self.timeout)
+            try:
+                with telemetry.span("TelegramSend"):
+                    response = self.session.post(url, json=payload, timeout=timeouts)
+            except requests.ConnectionError:
+                delay = self._backoff(attempt)
+                if attempt >= self.max_retries or call_timeout(delay) < delay:
+                    raise
+                time.sleep(delay)
+                attempt += 1
+                continue
+
+            if response.status_code == 401:
+                self._unauthorized()
+
+            if response.status_code in RETRYABLE_STATUS_CODES:
+                delay = self._backoff(attempt, response)
+                throttled_chat = response.status_code == 429 and chat_id is not None
+                if throttled_chat:
+                    # Telegram holds the chat back for all of retry_after,
+                    # whether or not this call is retried
+                    self.scheduler.penalize(chat_id, delay)
+                # A retry before retry_after would only be rate limited again,
+                # so a longer wait is left to the caller
+                if (
+                    attempt < self.max_retries
+                    and delay <= settings.TELEGRAM_MAX_RETRY_WAIT
+                    and call_timeout(delay) >= delay
+                ):
+                    if not throttled_chat:
+                        time.sleep(delay)
+                    attempt += 1
+                    continue
+
+            try:
+                result = response.json()
+            except ValueError:
+                # Proxies in front of the Bot API answer errors with HTML
+                result = {
+                    "ok": False,
+                    "error_code": response.status_code,
+                    "description": f"Non-JSON response with HTTP status {response.status_code}"
+                }
+            if not result.get("ok"):
+                logger.warning(f"Bot API {method} failed: {result.get('description')}", extra={
+                    'error_code': result.get('error_code')
+                })
+            return result
+
+    def _unauthorized(self) -> None:
+        """Forget this bot so a rotated token gets a fresh instance."""
+        with _LOCK:
+            if _BOTS.get(self.bot_token) is self:
+                del _BOTS[self.bot_token]
+        if self.on_unauthorized:
+            self.on_unauthorized()
+
+    def _backoff(self, attempt: int, response: Optional[requests.Response] = None) -> float:
+        """Get the delay before the next attempt.
+
+        Telegram's retry_after is returned as is; exponential backoff is
+        capped at ``TELEGRAM_MAX_RETRY_WAIT``.
+        """
+        delay = min(settings.TELEGRAM_BACKOFF_BASE * (2 ** attempt), settings.TELEGRAM_MAX_RETRY_WAIT)
+        if response is not None:
+            try:
+                retry_after = response.json().get("parameters", {}).get("retry_after")
+            except ValueError:
+                retry_after = None
+            if retry_after is None:
+                retry_after = response.headers.get("Retry-After")
+            if retry_after is not None:
+                try:
+                    delay = float(retry_after)
+                except (TypeError, ValueError):
+                    pass
+        return delay
+
+
+class AsyncTelegramBot:
+    """Asyncio interface to a :class:`TelegramBot`.
+
+    Calls run on the shared async I/O pool, with the same pacing, retries
+    and connection pool as the wrapped bot.
+    """
+
+    def __init__(self, bot: TelegramBot):
+        """Initialize the wrapper.
+
+        Args:
+            bot: Bot whose calls are made
+        """
+        self.bot = bot
+
+    def validate_telegram_ip(self, ip_address: str, forwarded: bool = False) -> bool:
+        """Validate if the IP address belongs to Telegram."""
+        return self.bot.validate_telegram_ip(ip_address, forwarded)
+
+    def validate_telegram_port(self, port: str) -> bool:
+        """Validate if the port belongs to Telegram."""
+        return self.bot.validate_telegram_port(port)
+
+    async def send_message(
+        self,
+        chat_id: int,
+        text: str,
+        parse_mode: Optional[str] = "HTML",
+        priority: int = PRIORITY_INTERACTIVE
+    ) -> Dict[str, Any]:
+        """Send a message to a chat."""
+        return await run_sync(self.bot.send_message, chat_id, text, parse_mode, priority)
+
+    async def send_long_message(
+        self,
+        chat_id: int,
+        text: str,
+        parse_mode: Optional[str] = "HTML"
+    ) -> List[Dict[str, Any]]:
+        """Send text of any length as one or more messages, in order."""
+        return await run_sync(self.bot.send_long_message, chat_id, text, parse_mode)
+
+    async def edit_message_text(
+        self,
+        chat_id: int,
+        message_id: int,
+        text: str,
+        parse_mode: Optional[str] = None,
+        priority: int = PRIORITY_INTERACTIVE
+    ) -> Dict[str, Any]:
+        """Replace the text of a previously sent message."""
+        return await run_sync(
+            self.bot.edit_message_text, chat_id, message_id, text, parse_mode, priority
+        )
+
+    async def set_webhook(
+        self,
+        webhook_url: str,
+        secret_token: Optional[str] = None,
+        max_connections: Optional[int] = None,
+        drop_pending_updates: bool = False
+    ) -> Dict[str, Any]:
+        """Set the webhook URL for the bot."""
+        return await run_sync(
+            self.bot.set_webhook, webhook_url, secret_token, max_connections, drop_pending_updates
+        )
+
+    async def delete_webhook(self, drop_pending_updates: bool = False) -> Dict[str, Any]:
+        """Remove the webhook, which getUpdates requires."""
+        return await run_sync(self.bot.delete_webhook, drop_pending_updates)
+
+    async def get_updates(
+        self,
+        offset: Optional[int] = None,
+        limit: int = MAX_UPDATES_LIMIT,
+        timeout: int = 0,
+        allowed_updates: Optional[List[str]] = None
+    ) -> Dict[str, Any]:
+        """Fetch pending updates, waiting up to ``timeout`` seconds for one to arrive."""
+        return await run_sync(self.bot.get_updates, offset, limit, timeout, allowed_updates)
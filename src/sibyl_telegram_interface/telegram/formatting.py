@@ -0,0 +1,210 @@
+"""Splitting of outbound text into Telegram-sized, HTML-safe messages."""
+
+import re
+from typing import List, Optional, Tuple
+
+from ..config import settings
+
+# Tags accepted by Telegram's HTML parse mode
+SUPPORTED_TAGS = frozenset({
+    "b", "strong", "i", "em", "u", "ins", "s", "strike", "del", "span",
+    "tg-spoiler", "tg-emoji", "a", "code", "pre", "blockquote",
+})
+
+_TOKEN = re.compile(
+    r"<(/?)([a-zA-Z][\w-]*)((?:\s[^<>]*)?)>"  # tag
+    r"|&(?:[a-zA-Z]+|#\d+|#x[0-9a-fA-F]+);"  # entity
+    r"|[<>&]"  # stray markup characters
+)
+_ESCAPES = {"<": "&lt;", ">": "&gt;", "&": "&amp;"}
+_MARKUP_CHARS = re.compile(r"([<>&])")
+
+# Preferred split points, best first
+_BOUNDARIES = (
+    re.compile(r"\n\n"),
+    re.compile(r"\n"),
+    re.compile(r"[.!?…](?=\s)"),
+    re.compile(r"\s"),
+)
+
+
+def _find_break(text: str, limit: int) -> int:
+    """Find where to cut ``text`` so that the head is at most ``limit`` long.
+
+    A boundary is only used if it keeps at least half of the available
+    space; otherwise the next, weaker kind of boundary is tried. Falls back
+    to the latest boundary of any kind, or 0 if there is none.
+    """
+    if limit <= 0:
+        return 0
+    window = text[:limit + 1]
+    fallback = 0
+    for boundary in _BOUNDARIES:
+        cut = 0
+        for match in boundary.finditer(window):
+            if match.end() > limit:
+                break
+            cut = match.end()
+        if cut >= limit // 2:
+            return cut
+        fallback = max(fallback, cut)
+    return fallback
+
+
+class _Splitter:
+    """Single-pass state machine behind :func:`split_message`."""
+
+    def __init__(self, limit: int):
+        self.limit = limit
+        self.parts: List[str] = []
+        self.current: List[str] = []
+        self.length = 0
+        self.has_text = False
+        # Open tags as (name, opening tag), innermost last
+        self.stack: List[Tuple[str, str]] = []
+        self.closing_length = 0
+
+    def available(self) -> int:
+        """Characters left in the current part after closing open tags."""
+        return self.limit - self.length - self.closing_length
+
+    def emit(self) -> None:
+        """Close open tags, finish the current part and reopen them in the next."""
+        if not self.has_text:
+            return
+        closing = "".join(f"</{name}>" for name, _ in reversed(self.stack))
+        self.parts.append("".join(self.current) + closing)
+        if self.closing_length + sum(len(tag) for _, tag in self.stack) > self.limit // 2:
+            # Carrying this much markup over would leave no room for text
+            self.stack = []
+            self.closing_length = 0
+        self.current = [tag for _, tag in self.stack]
+        self.length = sum(len(tag) for tag in self.current)
+        self.has_text = False
+
+    def add_atom(self, atom: str) -> None:
+        """Add text that must not be split, such as an entity."""
+        if len(atom) > self.available():
+            self.emit()
+        if len(atom) > self.available() and not self.has_text:
+            # The open tags leave no room for the atom; drop them, keep the atom
+            self.current = []
+            self.length = 0
+            self.stack = []
+            self.closing_length = 0
+        self.current.append(atom)
+        self.length += len(atom)
+        self.has_text = True
+
+    def add_text(self, text: str) -> None:
+        """Add plain text, splitting it on the best boundaries that fit."""
+        while len(text) > self.available():
+            room = self.available()
+            cut = _find_break(text, room)
+            if cut == 0 and self.has_text:
+                # Break before this text rather than mid-word
+                self.emit()
+                continue
+            if cut == 0:
+                cut = max(room, 1)
+            self.current.append(text[:cut])
+            self.length += cut
+            self.has_text = True
+            text = text[cut:]
+            self.emit()
+        if text:
+            self.current.append(text)
+            self.length += len(text)
+            self.has_text = True
+
+    def open_tag(self, name: str, tag: str) -> None:
+        """Add an opening tag, moving to a new part if it cannot fit with content."""
+        closing = len(name) + 3
+        if len(tag) + closing + 1 > self.available():
+            self.emit()
+            if len(tag) + closing + 1 > self.available():
+                # Too much markup for one part; drop the tag, keep the text
+                return
+        self.current.append(tag)
+        self.length += len(tag)
+        self.stack.append((name, tag))
+        self.closing_length += closing
+
+    def close_tag(self, name: str) -> None:
+        """Close the innermost matching open tag, along with any opened inside it."""
+        if not any(open_name == name for open_name, _ in self.stack):
+            return
+        while self.stack:
+            open_name, _ = self.stack.pop()
+            closing = len(open_name) + 3
+            self.closing_length -= closing
+            self.current.append(f"</{open_name}>")
+            self.length += closing
+            if open_name == name:
+                break
+
+    def finish(self) -> List[str]:
+        """Close remaining tags and return all parts."""
+        while self.stack:
+            self.close_tag(self.stack[-1][0])
+        if self.has_text:
+            self.parts.append("".join(self.current))
+        return self.parts
+
+
+def _add_escaped(splitter: _Splitter, text: str) -> None:
+    """Add markup shown as text, which may be cut anywhere but inside an escape."""
+    for piece in _MARKUP_CHARS.split(text):
+        if piece in _ESCAPES:
+            splitter.add_atom(_ESCAPES[piece])
+        elif piece:
+            splitter.add_text(piece)
+
+
+def split_message(
+    text: str,
+    limit: int = settings.MAX_MESSAGE_LENGTH,
+    html: bool = True
+) -> List[str]:
+    """Split text into parts of at most ``limit`` characters.
+
+    Parts are cut on paragraph, line, sentence or word boundaries, in that
+    order of preference. In HTML mode, every part is well-formed: tags open
+    at a cut are closed at the end of the part and reopened at the start of
+    the next one, unsupported tags and stray ``<``, ``>`` and ``&`` are
+    escaped, and unmatched closing tags are dropped. The text is scanned
+    once.
+
+    Args:
+        text: Text to split
+        limit: Maximum length of a part, markup included
+        html: Whether the text uses Telegram's HTML parse mode
+
+    Returns:
+        Non-empty parts in order
+    """
+    splitter = _Splitter(limit)
+    if not html:
+        splitter.add_text(text)
+        return splitter.finish()
+
+    position = 0
+    for match in _TOKEN.finditer(text):
+        if match.start() > position:
+            splitter.add_text(text[position:match.start()])
+        position = match.end()
+
+        token = match.group(0)
+        name: Optional[str] = match.group(2)
+        if name is None:
+            # Entity or stray markup character
+            splitter.add_atom(_ESCAPES.get(token, token))
+        elif name.lower() not in SUPPORTED_TAGS:
+            _add_escaped(splitter, token)
+        elif match.group(1):
+            splitter.close_tag(name.lower())
+        else:
+            splitter.open_tag(name.lower(), token)
+    if position < len(text):
+        splitter.add_text(text[position:])
+    return splitter.finish()
@@ -0,0 +1,138 @@
+"""Incrementally updated Telegram message for streamed replies."""
+
+import time
+from typing import Callable, List, Optional
+
+from .bot import TelegramBot, is_parse_error
+from .scheduler import PRIORITY_BACKGROUND
+from .formatting import split_message
+from ..config import settings
+
+
+class LiveMessage:
+    """A reply that is sent once the stream continues and then edited as text grows.
+
+    The first chunk is held until a second one arrives, so a reply that
+    arrives in one chunk, such as a cached answer, is sent once with
+    ``parse_mode``. Edits are coalesced: a new edit is only sent once at
+    least ``min_interval`` seconds have passed since the previous one and at
+    least ``min_chars`` new characters have arrived. Telegram rate-limits
+    edits per chat, so the interval keeps a long answer to a bounded number
+    of API calls. Partial text is sent without a parse mode because an HTML
+    tag may still be open; the final edit applies ``parse_mode``, and is
+    skipped when it would not change what the user sees. Intermediate edits
+    are scheduled with background priority so they never delay another
+    chat's reply. Live edits stop at Telegram's message length limit; the
+    final text is then split, with the first part replacing the live message
+    and the rest sent as new messages.
+    """
+
+    def __init__(
+        self,
+        bot: TelegramBot,
+        chat_id: int,
+        min_interval: float = settings.LIVE_EDIT_MIN_INTERVAL,
+        min_chars: int = settings.LIVE_EDIT_MIN_CHARS,
+        parse_mode: Optional[str] = "HTML",
+        limit: int = settings.MAX_MESSAGE_LENGTH,
+        clock: Callable[[], float] = time.monotonic
+    ):
+        """Initialize the live message.
+
+        Args:
+            bot: Bot used to send and edit the message
+            chat_id: Telegram chat ID
+            min_interval: Minimum seconds between two edits
+            min_chars: Minimum number of new characters before an edit
+            parse_mode: Parse mode applied to the final text
+            limit: Maximum length of one message
+            clock: Monotonic time source
+        """
+        self.bot = bot
+        self.chat_id = chat_id
+        self.min_interval = min_interval
+        self.min_chars = min_chars
+        self.parse_mode = parse_mode
+        self.limit = limit
+        self.clock = clock
+
+        self.message_id: Optional[int] = None
+        self._started = False
+        self._parts: List[str] = []
+        self._length = 0
+        self._sent_length = 0
+        self._sent_text = ''
+        self._last_flush = 0.0
+
+    @property
+    def text(self) -> str:
+        """Get the text accumulated so far."""
+        if len(self._parts) > 1:
+            self._parts = [''.join(self._parts)]
+        return self._parts[0] if self._parts else ''
+
+    def append(self, chunk: str) -> None:
+        """Add a chunk of text and flush if the edit budget allows it."""
+        if not chunk:
+            return
+        self._parts.append(chunk)
+        self._length += len(chunk)
+
+        if not self._started:
+            # A second chunk shows the reply is streamed rather than complete
+            if len(self._parts) > 1:
+                self._flush()
+        elif (
+            self.message_id is not None
+            and self._sent_length < self.limit
+            and self._length - self._sent_length >= self.min_chars
+            and self.clock() - self._last_flush >= self.min_interval
+        ):
+            self._flush()
+
+    def finish(self, fallback: str = "") -> None:
+        """Send the final text with the configured parse mode.
+
+        Args:
+            fallback: Text to send if no chunk was ever appended
+        """
+        text = self.text if self._length else fallback
+        if not text:
+            return
+        if self.message_id is None:
+            self.bot.send_long_message(self.chat_id, text, parse_mode=self.parse_mode)
+            return
+
+        parts = split_message(text, limit=self.limit, html=self.parse_mode == "HTML")
+        if parts[0] != self._sent_text or not self._renders_as_sent(parts[0]):
+            response = self.bot.edit_message_text(
+                self.chat_id, self.message_id, parts[0], parse_mode=self.parse_mode
+            )
+            if self.parse_mode and is_parse_error(response):
+                self.bot.edit_message_text(self.chat_id, self.message_id, parts[0])
+        for part in parts[1:]:
+            self.bot.send_long_message(self.chat_id, part, parse_mode=self.parse_mode)
+
+    def _renders_as_sent(self, text: str) -> bool:
+        """Check if the parse mode leaves text sent without one unchanged."""
+        if self.parse_mode is None:
+            return True
+        if self.parse_mode == "HTML":
+            return '<' not in text and '&' not in text
+        return False
+
+    def _flush(self) -> None:
+        """Send or edit the message with the partial text."""
+        text = self.text[:self.limit]
+        if not self._started:
+            self._started = True
+            response = self.bot.send_message(self.chat_id, text, parse_mode=None)
+            self.message_id = response.get('result', {}).get('message_id')
+        else:
+            # Intermediate edits yield to other chats' replies
+            self.bot.edit_message_text(
+                self.chat_id, self.message_id, text, priority=PRIORITY_BACKGROUND
+            )
+        self._sent_text = text
+        self._sent_length = min(self._length, self.limit)
+        self._last_flush = self.clock()
@@ -1,21 +1,133 @@
 """Telegram data models."""
 
-from typing import Dict, Any
-from pydantic import BaseModel, Field
+from typing import Any, Dict, List, Optional
 from ..config import settings
 
-class TelegramMessage(BaseModel):
-    """Model for validating Telegram messages."""
-    
-    message: Dict[str, Any] = Field(..., description="Telegram message object")
-    user_id: int = Field(..., description="Telegram user ID")
-    chat_id: int = Field(..., description="Telegram chat ID")
+# Version of the queue wire format produced by TelegramUpdate.to_wire
+WIRE_VERSION = 1
 
-    @property
-    def text_content(self) -> str:
-        """Get the text content of the message."""
-        return self.message.get('text', '')
+
+class TelegramUpdate:
+    """The fields of a Telegram message update that the pipeline uses.
+
+    Built once from the decoded webhook body and carried through the queue
+    in a compact wire format, instead of passing the raw message around.
+    """
+
+    __slots__ = ("update_id", "chat_id", "user_id", "text", "entities", "date")
+
+    def __init__(
+        self,
+        update_id: Optional[int],
+        chat_id: int,
+        user_id: int,
+        text: str,
+        entities: Optional[List[Dict[str, Any]]] = None,
+        date: Optional[int] = None
+    ):
+        """Initialize the update.
+
+        Args:
+            update_id: Telegram update ID
+            chat_id: Telegram chat ID
+            user_id: Telegram user ID of the sender
+            text: Message text
+            entities: Message entities, e.g. bot commands
+            date: Message date as a Unix timestamp
+        """
+        self.update_id = update_id
+        self.chat_id = chat_id
+        self.user_id = user_id
+        self.text = text
+        self.entities = entities
+        self.date = date
+
+    @classmethod
+    def from_update(cls, update: Dict[str, Any]) -> "TelegramUpdate":
+        """Build from a decoded Bot API update holding a message.
+
+        Raises:
+            KeyError: If the update has no message with a chat and sender
+        """
+        message = update["message"]
+        return cls(
+            update_id=update.get("update_id"),
+            chat_id=message["chat"]["id"],
+            user_id=message["from"]["id"],
+            text=message.get("text", ""),
+            entities=message.get("entities"),
+            date=message.get("date")
+        )
+
+    def to_wire(self) -> Dict[str, Any]:
+        """Get the compact queue representation."""
+        wire = {
+            "v": WIRE_VERSION,
+            "u": self.update_id,
+            "c": self.chat_id,
+            "f": self.user_id,
+            "t": self.text,
+            "d": self.date
+        }
+        if self.entities:
+            wire["e"] = [
+                {"type": e.get("type"), "offset": e.get("offset"), "length": e.get("length")}
+                for e in self.entities
+            ]
+        return wire
+
+    @classmethod
+    def from_wire(cls, data: Dict[str, Any]) -> "TelegramUpdate":
+        """Build from a queue payload.
+
+        Also accepts the previous ``{"update_id": ..., "message": {...}}``
+        payload so records enqueued before a deployment still process.
+
+        Raises:
+            KeyError: If the payload lacks required fields
+        """
+        if "v" in data:
+            return cls(
+                update_id=data.get("u"),
+                chat_id=data["c"],
+                user_id=data["f"],
+                text=data.get("t", ""),
+                entities=data.get("e"),
+                date=data.get("d")
+            )
+        message = data["message"]
+        return cls(
+            update_id=data.get("update_id"),
+            chat_id=message["chat_id"],
+            user_id=message["user_id"],
+            text=message["message"].get("text", ""),
+            entities=message["message"].get("entities"),
+            date=message["message"].get("date")
+        )
+
+    @classmethod
+    def merge(cls, updates: List["TelegramUpdate"]) -> "TelegramUpdate":
+        """Combine consecutive messages of one chat into a single message.
+
+        The texts are joined by newlines; the IDs and date are those of the
+        last message. Entities are dropped since their offsets no longer
+        apply.
+        """
+        last = updates[-1]
+        return cls(
+            update_id=last.update_id,
+            chat_id=last.chat_id,
+            user_id=last.user_id,
+            text="\n".join(update.text for update in updates),
+            date=last.date
+        )
 
     def validate_message_length(self, max_length: int = settings.MAX_MESSAGE_LENGTH) -> bool:
         """Validate the message length."""
-        return len(self.text_content) <= max_length
+        return len(self.text) <= max_length
+
+    def __repr__(self) -> str:
+        return (
+            f"TelegramUpdate(update_id={self.update_id!r}, chat_id={self.chat_id!r}, "
+            f"user_id={self.user_id!r}, text={self.text!r})"
+        )
@@ -0,0 +1,126 @@
+"""Long-polling ingestion of updates with getUpdates."""
+
+import threading
+from typing import Any, Callable, Dict, List, Optional
+
+from aws_lambda_powertools import Logger
+from aws_lambda_powertools.metrics import MetricUnit
+
+from ..config import settings
+from ..utils import telemetry
+from .bot import TelegramBot
+
+logger = Logger()
+
+# Seconds to wait for room in the consumer before polling again
+_BACKPRESSURE_WAIT = 0.1
+
+
+class PollError(Exception):
+    """Raised when the Bot API rejects a getUpdates call."""
+
+    def __init__(self, description: str, error_code: Optional[int] = None):
+        self.error_code = error_code
+        super().__init__(f"getUpdates failed ({error_code}): {description}")
+
+
+class UpdatePoller:
+    """Fetches updates with getUpdates and hands them off a batch at a time.
+
+    The offset only moves past a batch once ``handle_batch`` returns, so a
+    batch that could not be handed off is fetched again. Consumers must
+    tolerate redelivered updates, as the processor's dedup store does.
+    Telegram refuses getUpdates while a webhook is set; remove it with
+    :meth:`TelegramBot.delete_webhook` first.
+    """
+
+    def __init__(
+        self,
+        bot: TelegramBot,
+        handle_batch: Callable[[List[Dict[str, Any]]], None],
+        limit: int = settings.POLL_LIMIT,
+        timeout: int = settings.POLL_TIMEOUT,
+        retry_delay: float = settings.POLL_RETRY_DELAY,
+        capacity: Optional[Callable[[], int]] = None
+    ):
+        """Initialize the poller.
+
+        Args:
+            bot: Bot whose updates are fetched
+            handle_batch: Called with each non-empty batch of Bot API updates;
+                raising makes the batch be fetched again
+            limit: Most updates per batch (1-100)
+            timeout: Seconds each getUpdates call waits for updates
+            retry_delay: Seconds to wait after a failed call or batch
+            capacity: Returns how many more updates the consumer can take;
+                batches are limited to it, and polling pauses while it is 0
+        """
+        self.bot = bot
+        self.handle_batch = handle_batch
+        self.limit = limit
+        self.timeout = timeout
+        self.retry_delay = retry_delay
+        self.capacity = capacity
+        self.offset: Optional[int] = None
+        self.polls = 0
+        self.updates = 0
+        self._stop = threading.Event()
+
+    def poll_once(self) -> int:
+        """Fetch one batch and hand it off.
+
+        Returns:
+            Number of updates handed off
+
+        Raises:
+            PollError: If the Bot API rejected the call
+        """
+        limit = self.limit
+        if self.capacity is not None:
+            limit = max(1, min(limit, self.capacity()))
+        response = self.bot.get_updates(offset=self.offset, limit=limit, timeout=self.timeout)
+        self.polls += 1
+        if not response.get('ok'):
+            raise PollError(response.get('description', 'Unknown error'), response.get('error_code'))
+
+        updates = response.get('result') or []
+        if not updates:
+            return 0
+        telemetry.record("PollBatchSize", len(updates), MetricUnit.Count)
+        self.handle_batch(updates)
+        # Confirmed with the next call, which asks for later updates only
+        self.offset = updates[-1]['update_id'] + 1
+        self.updates += len(updates)
+        return len(updates)
+
+    def run(self) -> None:
+        """Poll until :meth:`stop` is called, then confirm the last batch.
+
+        A stop request takes effect once the getUpdates call in flight returns,
+        after at most ``timeout`` seconds.
+        """
+        logger.info("Polling for updates", extra={'limit': self.limit, 'timeout': self.timeout})
+        while not self._stop.is_set():
+            if self.capacity is not None and self.capacity() < 1:
+                self._stop.wait(_BACKPRESSURE_WAIT)
+                continue
+            try:
+                self.poll_once()
+            except Exception as e:
+                logger.error(f"Polling failed: {str(e)}")
+                self._stop.wait(self.retry_delay)
+        self.commit()
+        logger.info("Stopped polling", extra={'polls': self.polls, 'updates': self.updates})
+
+    def stop(self) -> None:
+        """Ask :meth:`run` to return."""
+        self._stop.set()
+
+    def commit(self) -> None:
+        """Confirm the handed-off updates so the next poller does not fetch them again."""
+        if self.offset is None:
+            return
+        try:
+            self.bot.get_updates(offset=self.offset, limit=1, timeout=0)
+        except Exception as e:
+            logger.warning(f"Failed to confirm updates: {str(e)}")
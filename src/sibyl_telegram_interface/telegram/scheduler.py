@@ -0,0 +1,211 @@
+"""Outbound pacing for Bot API calls.
+
+Telegram allows roughly one message per second in a chat and about thirty
+per second across all chats, answering 429 with a ``retry_after`` when a
+bot goes faster. The scheduler makes senders wait for a token from both the
+chat's bucket and the global bucket before calling the API. The limits are
+enforced per process; concurrent Lambda containers each get their own
+budget.
+"""
+
+import itertools
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from ..config import settings
+
+# Lower values are served first
+PRIORITY_INTERACTIVE = 0
+PRIORITY_BACKGROUND = 1
+
+# Chat buckets kept before idle ones are pruned
+_MAX_CHAT_BUCKETS = 10000
+_TOKEN_EPSILON = 1e-9
+
+
+class SendQueueTimeout(Exception):
+    """Raised when a send cannot be scheduled within its timeout."""
+
+
+class TokenBucket:
+    """Token bucket refilled continuously at ``rate`` tokens per second."""
+
+    def __init__(self, rate: float, capacity: float, now: float):
+        """Initialize a full bucket.
+
+        Args:
+            rate: Tokens added per second
+            capacity: Maximum number of tokens, i.e. the allowed burst
+            now: Current time
+        """
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = now
+        self.blocked_until = 0.0
+
+    def _refill(self, now: float) -> None:
+        if now > self.updated:
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+
+    def wait_time(self, now: float) -> float:
+        """Get seconds until a token is available, 0 if one is available now."""
+        if now < self.blocked_until:
+            return self.blocked_until - now
+        self._refill(now)
+        # Refills are floats; a token a rounding error short counts as whole
+        if self.tokens >= 1 - _TOKEN_EPSILON:
+            return 0.0
+        return (1 - self.tokens) / self.rate
+
+    def take(self, now: float) -> None:
+        """Consume one token."""
+        self._refill(now)
+        self.tokens -= 1
+
+    def block(self, until: float) -> None:
+        """Hand out no tokens before ``until``, e.g. after a 429, and one at ``until``."""
+        self.blocked_until = max(self.blocked_until, until)
+        self.tokens = 1.0
+        self.updated = max(self.updated, until)
+
+    def is_idle(self, now: float) -> bool:
+        """Check whether the bucket is full and could be recreated as new."""
+        return now >= self.blocked_until and self.wait_time(now) == 0 and self.tokens >= self.capacity
+
+
+class SendScheduler:
+    """Paces sends with per-chat and global token buckets.
+
+    Callers block in :meth:`acquire` until both buckets have a token. Among
+    waiters whose chat is ready, the highest priority and then the earliest
+    arrival goes first, so interactive replies overtake background sends
+    such as intermediate edits.
+    """
+
+    def __init__(
+        self,
+        global_rate: float = settings.TELEGRAM_GLOBAL_RATE,
+        global_burst: float = settings.TELEGRAM_GLOBAL_BURST,
+        chat_rate: float = settings.TELEGRAM_CHAT_RATE,
+        chat_burst: float = settings.TELEGRAM_CHAT_BURST,
+        clock: Callable[[], float] = time.monotonic
+    ):
+        """Initialize the scheduler.
+
+        Args:
+            global_rate: Sends per second across all chats
+            global_burst: Sends allowed back to back across all chats
+            chat_rate: Sends per second in one chat
+            chat_burst: Sends allowed back to back in one chat
+            clock: Monotonic time source
+        """
+        self.chat_rate = chat_rate
+        self.chat_burst = chat_burst
+        self.clock = clock
+        self._global = TokenBucket(global_rate, global_burst, clock())
+        self._chats: Dict[Any, TokenBucket] = {}
+        self._waiters: List[Tuple[int, int, Any]] = []
+        self._sequence = itertools.count()
+        self._cond = threading.Condition()
+        self.sent = 0
+        self.total_delay = 0.0
+        self.max_delay = 0.0
+
+    def acquire(
+        self,
+        chat_id: Any,
+        priority: int = PRIORITY_INTERACTIVE,
+        timeout: Optional[float] = None
+    ) -> float:
+        """Wait until a message may be sent to a chat.
+
+        Args:
+            chat_id: Target chat
+            priority: PRIORITY_INTERACTIVE or PRIORITY_BACKGROUND
+            timeout: Maximum seconds to wait
+
+        Returns:
+            Seconds spent waiting in the queue
+
+        Raises:
+            SendQueueTimeout: If the send cannot go out within ``timeout``
+        """
+        started = self.clock()
+        waiter = (priority, next(self._sequence), chat_id)
+        with self._cond:
+            self._waiters.append(waiter)
+            try:
+                while True:
+                    now = self.clock()
+                    chat_wait = self._chat_bucket(chat_id, now).wait_time(now)
+                    global_wait = self._global.wait_time(now)
+                    if chat_wait == 0 and global_wait == 0:
+                        if self._next_waiter(now) == waiter:
+                            self._chats[chat_id].take(now)
+                            self._global.take(now)
+                            return self._record(now - started)
+                        # Someone with higher priority goes first
+                        wait = 1 / self._global.rate
+                    else:
+                        wait = max(chat_wait, global_wait)
+
+                    if timeout is not None and now - started + wait > timeout:
+                        raise SendQueueTimeout(
+                            f"Cannot send to chat {chat_id} within {timeout:.2f}s"
+                        )
+                    self._cond.wait(wait)
+            finally:
+                self._waiters.remove(waiter)
+                self._cond.notify_all()
+
+    def penalize(self, chat_id: Optional[Any], retry_after: float) -> None:
+        """Pause sends after Telegram answered 429.
+
+        Args:
+            chat_id: Chat the 429 was for, or None to pause all chats
+            retry_after: Seconds Telegram asked to wait
+        """
+        with self._cond:
+            now = self.clock()
+            if chat_id is None:
+                self._global.block(now + retry_after)
+            else:
+                self._chat_bucket(chat_id, now).block(now + retry_after)
+            self._cond.notify_all()
+
+    def stats(self) -> Dict[str, float]:
+        """Get the number of scheduled sends and their queueing delay."""
+        return {
+            'sent': self.sent,
+            'queue_delay_total': self.total_delay,
+            'queue_delay_avg': self.total_delay / self.sent if self.sent else 0.0,
+            'queue_delay_max': self.max_delay
+        }
+
+    def _chat_bucket(self, chat_id: Any, now: float) -> TokenBucket:
+        bucket = self._chats.get(chat_id)
+        if bucket is None:
+            if len(self._chats) >= _MAX_CHAT_BUCKETS:
+                self._chats = {
+                    key: value for key, value in self._chats.items() if not value.is_idle(now)
+                }
+            bucket = TokenBucket(self.chat_rate, self.chat_burst, now)
+            self._chats[chat_id] = bucket
+        return bucket
+
+    def _next_waiter(self, now: float) -> Optional[Tuple[int, int, Any]]:
+        """Get the waiter that should send next among those whose chat is ready."""
+        ready = [
+            waiter for waiter in self._waiters
+            if self._chat_bucket(waiter[2], now).wait_time(now) == 0
+        ]
+        return min(ready) if ready else None
+
+    def _record(self, delay: float) -> float:
+        self.sent += 1
+        self.total_delay += delay
+        self.max_delay = max(self.max_delay, delay)
+        return delay
@@ -0,0 +1,52 @@
+"""Bridge from asyncio to the blocking clients.
+
+The Bot API, Bedrock and Sibyl Core clients block the calling thread. The
+async variants run their calls on a shared thread pool, so a coroutine only
+holds a thread while a call is in flight, not while it waits on pacing
+between calls. Each call runs in a copy of the caller's context, so the
+invocation deadline applies to it.
+"""
+
+import asyncio
+import contextvars
+import functools
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, AsyncIterator, Callable, Iterator, Optional, TypeVar
+
+from ..config import settings
+
+T = TypeVar("T")
+
+_EXECUTOR: Optional[ThreadPoolExecutor] = None
+_LOCK = threading.Lock()
+_DONE = object()
+
+
+def get_executor() -> ThreadPoolExecutor:
+    """Get the process-wide pool that runs blocking calls for coroutines."""
+    global _EXECUTOR
+    if _EXECUTOR is None:
+        with _LOCK:
+            if _EXECUTOR is None:
+                _EXECUTOR = ThreadPoolExecutor(
+                    max_workers=settings.ASYNC_IO_THREADS,
+                    thread_name_prefix="aio"
+                )
+    return _EXECUTOR
+
+
+async def run_sync(fn: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+    """Run a blocking call on the shared pool and await its result."""
+    context = contextvars.copy_context()
+    call = functools.partial(context.run, fn, *args, **kwargs)
+    return await asyncio.get_running_loop().run_in_executor(get_executor(), call)
+
+
+async def iterate_sync(iterator: Iterator[T]) -> AsyncIterator[T]:
+    """Consume a blocking iterator, fetching each item on the shared pool."""
+    while True:
+        item = await run_sync(next, iterator, _DONE)
+        if item is _DONE:
+            return
+        yield item
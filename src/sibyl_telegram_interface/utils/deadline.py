@@ -0,0 +1,133 @@
+"""Invocation deadlines and the call timeouts derived from them.
+
+The processor sets the deadline of the current Lambda invocation with
+:func:`deadline_scope`; outbound calls cap their timeouts with
+:func:`call_timeout` so no single call can outlive the invocation. Outside
+a scope, calls keep their configured timeouts.
+"""
+
+import contextvars
+import queue
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Iterator, Optional, TypeVar
+
+from ..config import settings
+
+T = TypeVar("T")
+
+# Shortest timeout handed to a call, so a nearly spent budget fails fast
+# instead of passing zero or a negative value to an HTTP client
+MIN_CALL_TIMEOUT = 0.1
+
+_current: "contextvars.ContextVar[Optional[Deadline]]" = contextvars.ContextVar(
+    "deadline", default=None
+)
+
+
+class DeadlineExceeded(Exception):
+    """Raised when work cannot finish before the invocation deadline."""
+
+
+class Deadline:
+    """A point in time by which the current invocation must be done."""
+
+    def __init__(self, expires_at: float, clock: Callable[[], float] = time.monotonic):
+        """Initialize the deadline.
+
+        Args:
+            expires_at: Expiry on the ``clock`` timeline
+            clock: Monotonic time source
+        """
+        self.expires_at = expires_at
+        self.clock = clock
+
+    @classmethod
+    def from_context(
+        cls,
+        context: Any,
+        margin: float = settings.DEADLINE_SAFETY_MARGIN,
+        clock: Callable[[], float] = time.monotonic
+    ) -> "Deadline":
+        """Build from a Lambda context, keeping ``margin`` seconds to wrap up.
+
+        Args:
+            context: Lambda context with ``get_remaining_time_in_millis``
+            margin: Seconds reserved for returning the batch response
+            clock: Monotonic time source
+        """
+        remaining = context.get_remaining_time_in_millis() / 1000
+        return cls(clock() + remaining - margin, clock)
+
+    def remaining(self) -> float:
+        """Get the seconds left, negative once expired."""
+        return self.expires_at - self.clock()
+
+    def timeout(self, cap: float) -> float:
+        """Get a call timeout of at most ``cap`` that ends before the deadline."""
+        return max(MIN_CALL_TIMEOUT, min(cap, self.remaining()))
+
+
+def current() -> Optional[Deadline]:
+    """Get the deadline of the current scope, if any."""
+    return _current.get()
+
+
+@contextmanager
+def deadline_scope(deadline: Deadline) -> Iterator[Deadline]:
+    """Make ``deadline`` the current deadline within the block.
+
+    Worker threads do not inherit it; run their work in a copy of the
+    caller's context, e.g. ``contextvars.copy_context().run``.
+    """
+    token = _current.set(deadline)
+    try:
+        yield deadline
+    finally:
+        _current.reset(token)
+
+
+def call_timeout(cap: float) -> float:
+    """Cap a call timeout by the current deadline, if any."""
+    deadline = current()
+    return cap if deadline is None else deadline.timeout(cap)
+
+
+def iter_within(iterator: Iterator[T], deadline: Deadline, reserve: float = 0.0) -> Iterator[T]:
+    """Yield from ``iterator`` until ``reserve`` seconds before the deadline.
+
+    Items are pulled in a daemon thread, so a blocking read, e.g. of an
+    event stream waiting on its first chunk, cannot hold the caller past
+    the deadline. The thread is abandoned when the deadline passes; the
+    source's own timeouts end it.
+
+    Raises:
+        DeadlineExceeded: If the iterator is not exhausted in time
+    """
+    items: "queue.Queue" = queue.Queue()
+    done = object()
+
+    def pump() -> None:
+        try:
+            for item in iterator:
+                items.put((item, None))
+            items.put((done, None))
+        except Exception as e:
+            items.put((done, e))
+
+    context = contextvars.copy_context()
+    threading.Thread(target=context.run, args=(pump,), daemon=True).start()
+    while True:
+        wait = deadline.remaining() - reserve
+        try:
+            if wait <= 0:
+                raise queue.Empty
+            item, error = items.get(timeout=wait)
+        except queue.Empty:
+            raise DeadlineExceeded(f"Stopped waiting with {deadline.remaining():.1f}s left")
+        if error is not None:
+            raise error
+        if item is done:
+            return
+        yield item
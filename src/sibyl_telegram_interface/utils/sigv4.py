@@ -0,0 +1,91 @@
+"""SigV4 request signing for IAM-authorized API Gateway calls."""
+
+import threading
+import time
+from typing import Any, Dict, Optional, Tuple
+
+import boto3
+from botocore.auth import SigV4Auth
+from botocore.awsrequest import AWSRequest
+
+
+class CachingSigV4Auth(SigV4Auth):
+    """SigV4Auth that reuses the derived signing key for the current day.
+
+    The signing key only depends on the secret key, date, region and
+    service, so it is derived once per day instead of with four HMACs on
+    every request.
+    """
+
+    def __init__(self, credentials: Any, service_name: str, region_name: str):
+        super().__init__(credentials, service_name, region_name)
+        self._signing_key: Optional[Tuple[str, bytes]] = None
+
+    def signature(self, string_to_sign: str, request: AWSRequest) -> str:
+        date = request.context["timestamp"][0:8]
+        cached = self._signing_key
+        if cached is None or cached[0] != date:
+            k_date = self._sign(f"AWS4{self.credentials.secret_key}".encode(), date)
+            k_region = self._sign(k_date, self._region_name)
+            k_service = self._sign(k_region, self._service_name)
+            cached = (date, self._sign(k_service, "aws4_request"))
+            self._signing_key = cached
+        return self._sign(cached[1], string_to_sign, hex=True)
+
+
+class RequestSigner:
+    """Signs requests with credentials that are refreshed before they expire.
+
+    Credentials come from a boto3 session. Refreshable credentials (assumed
+    roles, container or instance metadata) are renewed by botocore ahead of
+    expiry whenever a frozen snapshot is taken, so a long-lived warm
+    container keeps signing with valid keys. A signer is built once per
+    credential generation and reused until the keys rotate.
+    """
+
+    def __init__(self, service: str, region: str, session: Optional[boto3.Session] = None):
+        """Initialize the signer.
+
+        Args:
+            service: AWS service name, e.g. ``execute-api``
+            region: AWS region
+            session: boto3 session providing credentials
+        """
+        self.service = service
+        self.region = region
+        self._credentials = (session or boto3.Session()).get_credentials()
+        self._auth: Optional[CachingSigV4Auth] = None
+        self._generation: Optional[Tuple[str, str, Optional[str]]] = None
+        self._lock = threading.Lock()
+        self.sign_count = 0
+        self.sign_seconds = 0.0
+        self.rotations = 0
+
+    def sign(self, request: AWSRequest) -> None:
+        """Add SigV4 authentication headers to a request."""
+        start = time.perf_counter()
+        self._current_auth().add_auth(request)
+        self.sign_seconds += time.perf_counter() - start
+        self.sign_count += 1
+
+    def _current_auth(self) -> CachingSigV4Auth:
+        """Get the signer for the current credential generation."""
+        frozen = self._credentials.get_frozen_credentials()
+        generation = (frozen.access_key, frozen.secret_key, frozen.token)
+        if generation != self._generation:
+            with self._lock:
+                if generation != self._generation:
+                    if self._generation is not None:
+                        self.rotations += 1
+                    self._auth = CachingSigV4Auth(frozen, self.service, self.region)
+                    self._generation = generation
+        return self._auth
+
+    def stats(self) -> Dict[str, float]:
+        """Get signing counters and average signing overhead."""
+        return {
+            'sign_count': self.sign_count,
+            'sign_ms_total': self.sign_seconds * 1000,
+            'sign_us_avg': (self.sign_seconds / self.sign_count * 1e6) if self.sign_count else 0.0,
+            'rotations': self.rotations
+        }
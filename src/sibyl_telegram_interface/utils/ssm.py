@@ -1,23 +1,138 @@
 """AWS SSM Parameter Store utilities."""
 
+import threading
+import time
+from typing import Any, Callable, Dict, Optional, Tuple
+
 import boto3
 from botocore.exceptions import ClientError
+from aws_lambda_powertools import Logger
 from ..config import settings
 
+logger = Logger()
+
+_CLIENT = None
+_CLIENT_LOCK = threading.Lock()
+
+
+def get_ssm_client() -> Any:
+    """Get the process-wide SSM client, creating it on first use."""
+    global _CLIENT
+    if _CLIENT is None:
+        with _CLIENT_LOCK:
+            if _CLIENT is None:
+                _CLIENT = boto3.client('ssm')
+    return _CLIENT
+
+
+class ParameterCache:
+    """TTL cache for SSM parameters shared across warm invocations.
+
+    Expired values are refreshed lazily on the next read. If the refresh
+    fails and a previous value exists, the stale value is served and the
+    refresh is retried after ``error_backoff`` seconds instead of on every
+    call.
+    """
+
+    def __init__(
+        self,
+        ttl: float = settings.PARAMETER_CACHE_TTL,
+        error_backoff: float = settings.PARAMETER_CACHE_ERROR_BACKOFF,
+        client_factory: Callable[[], Any] = get_ssm_client,
+        clock: Callable[[], float] = time.monotonic
+    ):
+        """Initialize the cache.
+
+        Args:
+            ttl: Seconds a fetched value stays fresh
+            error_backoff: Seconds to serve a stale value after a failed refresh
+            client_factory: Returns the SSM client used for fetches
+            clock: Monotonic time source
+        """
+        self.ttl = ttl
+        self.error_backoff = error_backoff
+        self.client_factory = client_factory
+        self.clock = clock
+        self.hits = 0
+        self.misses = 0
+        self.stale_hits = 0
+        self._values: Dict[str, Tuple[str, float]] = {}
+        self._lock = threading.Lock()
+
+    def get(self, name: str, decrypt: bool = True) -> str:
+        """Get a parameter value, fetching it when missing or expired.
+
+        Args:
+            name: Parameter name
+            decrypt: Whether to decrypt SecureString parameters
+
+        Returns:
+            Parameter value
+        """
+        now = self.clock()
+        cached = self._values.get(name)
+        if cached is not None and cached[1] > now:
+            self.hits += 1
+            return cached[0]
+
+        with self._lock:
+            # Another thread may have refreshed the value while we waited
+            cached = self._values.get(name)
+            now = self.clock()
+            if cached is not None and cached[1] > now:
+                self.hits += 1
+                return cached[0]
+
+            self.misses += 1
+            try:
+                response = self.client_factory().get_parameter(
+                    Name=name,
+                    WithDecryption=decrypt
+                )
+            except Exception as e:
+                if cached is None:
+                    raise
+                logger.warning(f"Serving stale value for {name} after refresh failed: {str(e)}")
+                self.stale_hits += 1
+                self._values[name] = (cached[0], now + self.error_backoff)
+                return cached[0]
+
+            value = response['Parameter']['Value']
+            self._values[name] = (value, now + self.ttl)
+            return value
+
+    def invalidate(self, name: Optional[str] = None) -> None:
+        """Drop one cached parameter, or all of them."""
+        with self._lock:
+            if name is None:
+                self._values.clear()
+            else:
+                self._values.pop(name, None)
+
+    def stats(self) -> Dict[str, int]:
+        """Get cache hit and miss counters."""
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'stale_hits': self.stale_hits
+        }
+
+
+parameter_cache = ParameterCache()
+
+
 def get_bot_token() -> str:
     """
     Get the bot token from SSM Parameter Store.
+
+    The token is cached for the lifetime of a warm container, subject to
+    ``settings.PARAMETER_CACHE_TTL``.
     
     Raises:
         ValueError: If the parameter is not found or invalid
     """
     try:
-        ssm = boto3.client('ssm')
-        response = ssm.get_parameter(
-            Name=settings.BOT_TOKEN_PARAM_PATH,
-            WithDecryption=True
-        )
-        return response['Parameter']['Value']
+        return parameter_cache.get(settings.BOT_TOKEN_PARAM_PATH, decrypt=True)
     except ClientError as e:
         if e.response['Error']['Code'] == 'ParameterNotFound':
             raise ValueError(
@@ -26,3 +141,16 @@ def get_bot_token() -> str:
                 f"aws ssm put-parameter --name '{settings.BOT_TOKEN_PARAM_PATH}' --value 'YOUR_BOT_TOKEN' --type 'SecureString'"
             )
         raise
+
+
+def invalidate_bot_token() -> None:
+    """Forget the cached bot token, e.g. after Telegram rejects it with 401."""
+    logger.info("Invalidating cached bot token")
+    parameter_cache.invalidate(settings.BOT_TOKEN_PARAM_PATH)
+
+
+def get_webhook_secret() -> Optional[str]:
+    """Get the webhook secret token, or None if secret verification is disabled."""
+    if not settings.WEBHOOK_SECRET_PARAM_PATH:
+        return None
+    return parameter_cache.get(settings.WEBHOOK_SECRET_PARAM_PATH, decrypt=True)
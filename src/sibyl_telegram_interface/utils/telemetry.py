@@ -0,0 +1,110 @@
+"""Metrics and timing spans for the request path.
+
+Metrics are written as CloudWatch Embedded Metric Format and flushed at the
+end of each invocation by handlers decorated with :func:`log_metrics`.
+Values are buffered per metric and handed to the powertools Metrics
+serializer at flush time; its ``add_metric`` validates and logs every value,
+which costs more than the rest of a span.
+
+A span times a block and records the duration as a metric. When the X-Ray
+SDK is installed and ``TRACING_ENABLED`` is set, it also opens an X-Ray
+subsegment with the same name.
+"""
+
+import functools
+import json
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, List, Tuple
+
+from aws_lambda_powertools import Metrics
+from aws_lambda_powertools.metrics import MetricUnit
+
+from ..config import settings
+
+try:
+    from aws_xray_sdk.core import xray_recorder
+except ImportError:  # pragma: no cover - depends on the deployment package
+    xray_recorder = None
+
+# EMF accepts at most 100 values per metric in one document
+MAX_VALUES_PER_METRIC = 100
+
+metrics = Metrics(namespace=settings.METRICS_NAMESPACE)
+
+_lock = threading.Lock()
+# Metric name to its unit and the values recorded since the last flush
+_buffer: Dict[str, Tuple[str, List[float]]] = {}
+
+
+def record(name: str, value: float, unit: MetricUnit = MetricUnit.Milliseconds) -> None:
+    """Record a metric value.
+
+    Args:
+        name: Metric name
+        value: Metric value
+        unit: Metric unit, milliseconds by default
+    """
+    with _lock:
+        entry = _buffer.get(name)
+        if entry is None:
+            entry = _buffer[name] = (unit.value, [])
+        entry[1].append(float(value))
+        if len(entry[1]) >= MAX_VALUES_PER_METRIC:
+            _flush()
+
+
+def count(name: str, value: int = 1) -> None:
+    """Record occurrences of an event."""
+    record(name, value, MetricUnit.Count)
+
+
+def flush() -> None:
+    """Write the recorded metrics as one EMF document and start a new set."""
+    with _lock:
+        _flush()
+
+
+def _flush() -> None:
+    if not _buffer:
+        return
+    metric_set = {
+        name: {"Unit": unit, "StorageResolution": 60, "Value": values}
+        for name, (unit, values) in _buffer.items()
+    }
+    _buffer.clear()
+    print(json.dumps(metrics.serialize_metric_set(metrics=metric_set), separators=(",", ":")))
+
+
+def log_metrics(handler: Callable[..., Any]) -> Callable[..., Any]:
+    """Decorate a Lambda handler to flush metrics when it returns."""
+
+    @functools.wraps(handler)
+    def wrapper(event: Any, context: Any) -> Any:
+        try:
+            return handler(event, context)
+        finally:
+            flush()
+
+    return wrapper
+
+
+@contextmanager
+def span(name: str) -> Iterator[None]:
+    """Time a block and record its duration in milliseconds as ``name``.
+
+    The duration is recorded whether or not the block raises.
+    """
+    started = time.perf_counter()
+    if xray_recorder is not None and settings.TRACING_ENABLED:
+        with xray_recorder.in_subsegment(name):
+            try:
+                yield
+            finally:
+                record(name, (time.perf_counter() - started) * 1000)
+        return
+    try:
+        yield
+    finally:
+        record(name, (time.perf_counter() - started) * 1000)
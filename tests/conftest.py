@@ -0,0 +1,66 @@
+"""Shared setup for the test suite.
+
+Settings are read from the environment when modules are imported, so the
+configuration the handlers need is set before any test imports them.
+"""
+
+import os
+
+from tests.support.workload import LAMBDA_ENV
+
+for key, value in LAMBDA_ENV.items():
+    os.environ.setdefault(key, value)
+os.environ.setdefault("POWERTOOLS_LOG_LEVEL", "ERROR")
+os.environ.setdefault("POWERTOOLS_METRICS_NAMESPACE", "Test")
+os.environ.setdefault("RESPONSE_CACHE_TTL", "0")
+
+import pytest  # noqa: E402
+
+
+class FakeClock:
+    """Monotonic clock that only moves when a test advances it."""
+
+    def __init__(self, now: float = 1000.0):
+        self.now = now
+
+    def __call__(self) -> float:
+        return self.now
+
+    def advance(self, seconds: float) -> None:
+        self.now += seconds
+
+
+@pytest.fixture
+def clock():
+    return FakeClock()
+
+
+@pytest.fixture(scope="session")
+def telegram():
+    """Bot API stub on localhost, used as the Telegram API base."""
+    from tests.support.fakes import TelegramStub, install_fake_sibyl_core_sdk
+
+    install_fake_sibyl_core_sdk()
+    from sibyl_telegram_interface.config import settings
+
+    stub = TelegramStub(latency=0).start()
+    api_base = settings.TELEGRAM_API_BASE
+    settings.TELEGRAM_API_BASE = stub.url
+    yield stub
+    settings.TELEGRAM_API_BASE = api_base
+    stub.stop()
+
+
+@pytest.fixture
+def processor(telegram, monkeypatch):
+    """The processor module with a fake agent and a fresh in-memory dedup store."""
+    from tests.support.fakes import FakeAgentRuntime
+
+    from sibyl_telegram_interface.handlers import message_processor
+    from sibyl_telegram_interface.services.dedup import InMemoryDedupStore
+
+    monkeypatch.setattr(message_processor.bedrock, "client", FakeAgentRuntime(
+        first_chunk_latency=0, chunk_interval=0, chunks=1
+    ))
+    monkeypatch.setattr(message_processor, "dedup_store", InMemoryDedupStore())
+    return message_processor
@@ -0,0 +1 @@
+"""Fakes and synthetic workloads shared by the tests and benchmarks."""
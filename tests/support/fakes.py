@@ -0,0 +1,371 @@
+"""Local stand-ins for the services the handlers talk to.
+
+Used by the tests and benchmarks to run the Lambda handlers in-process
+without AWS or Telegram. The SQS and SSM fakes implement only the calls the handlers make
+and answer in microseconds, so their cost does not blur the measurements
+the way a general-purpose mock such as moto would.
+"""
+
+import itertools
+import json
+import random
+import sys
+import threading
+import time
+import types
+from collections import deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Callable, Deque, Dict, Iterator, List, Optional, Tuple, Union
+
+from botocore.exceptions import ClientError
+
+
+class TelegramStub:
+    """HTTP server answering Bot API calls like api.telegram.org.
+
+    Every ``sendMessage`` gets a new message ID. Updates added with ``push``
+    are served by ``getUpdates`` with long polling, offsets and limits, and
+    like Telegram, ``getUpdates`` fails with 409 while a webhook is set.
+    After ``rate_limit``, the next calls are answered with 429, and after
+    ``bad_gateway``, with a proxy's HTML 502 page. Other methods just
+    succeed. Calls are counted per method.
+    """
+
+    def __init__(self, latency: float = 0.0):
+        """Initialize the stub.
+
+        Args:
+            latency: Seconds to wait before answering each call
+        """
+        self.latency = latency
+        self.calls: Dict[str, int] = {}
+        self.webhook: Optional[Dict[str, Any]] = None
+        self.pending: List[Dict[str, Any]] = []
+        self.limited = 0
+        self.retry_after = 0
+        self.gateway_errors = 0
+        self._message_ids = itertools.count(1)
+        self._lock = threading.Lock()
+        self._arrived = threading.Condition(self._lock)
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), self._handler())
+        self._server.daemon_threads = True
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+
+    @property
+    def url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def push(self, update: Dict[str, Any]) -> None:
+        """Make an update available to ``getUpdates``."""
+        with self._arrived:
+            self.pending.append(update)
+            self._arrived.notify_all()
+
+    def rate_limit(self, calls: int, retry_after: int) -> None:
+        """Answer the next ``calls`` calls with 429 and ``retry_after``."""
+        with self._lock:
+            self.limited = calls
+            self.retry_after = retry_after
+
+    def bad_gateway(self, calls: int) -> None:
+        """Answer the next ``calls`` calls with 502 and an HTML body."""
+        with self._lock:
+            self.gateway_errors = calls
+
+    def get_updates(self, request: Dict[str, Any]) -> Dict[str, Any]:
+        """Answer ``getUpdates``, confirming updates below the offset."""
+        with self._arrived:
+            if self.webhook is not None:
+                return {"ok": False, "error_code": 409,
+                        "description": "Conflict: can't use getUpdates method while webhook is active"}
+            offset = request.get("offset")
+            if offset is not None:
+                self.pending = [update for update in self.pending if update["update_id"] >= offset]
+            self._arrived.wait_for(lambda: self.pending, timeout=request.get("timeout", 0))
+            return {"ok": True, "result": self.pending[:request.get("limit", 100)]}
+
+    def start(self) -> "TelegramStub":
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._server.shutdown()
+        self._server.server_close()
+
+    def _handler(self) -> type:
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+            # Headers and body are separate writes; with Nagle's algorithm the
+            # body waits for the client's delayed ACK
+            disable_nagle_algorithm = True
+
+            def do_POST(self) -> None:
+                body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+                request = json.loads(body or b"{}")
+                method = self.path.rsplit("/", 1)[-1]
+                if stub.latency:
+                    time.sleep(stub.latency)
+                with stub._lock:
+                    stub.calls[method] = stub.calls.get(method, 0) + 1
+                    gateway_error = stub.gateway_errors > 0
+                    if gateway_error:
+                        stub.gateway_errors -= 1
+                if gateway_error:
+                    self.answer(502, "text/html", b"<html><body><h1>502 Bad Gateway</h1></body></html>")
+                    return
+                with stub._lock:
+                    limited = stub.limited > 0
+                    if limited:
+                        stub.limited -= 1
+                    elif method == "setWebhook":
+                        stub.webhook = request
+                    elif method == "deleteWebhook":
+                        stub.webhook = None
+                        if request.get("drop_pending_updates"):
+                            stub.pending = []
+                answer: Dict[str, Any] = {"ok": True, "result": True}
+                if limited:
+                    answer = {"ok": False, "error_code": 429,
+                              "description": f"Too Many Requests: retry after {stub.retry_after}",
+                              "parameters": {"retry_after": stub.retry_after}}
+                elif method == "sendMessage":
+                    answer["result"] = {"message_id": next(stub._message_ids)}
+                elif method == "getUpdates":
+                    answer = stub.get_updates(request)
+                self.answer(answer.get("error_code", 200), "application/json", json.dumps(answer).encode())
+
+            def answer(self, status: int, content_type: str, body: bytes) -> None:
+                self.send_response(status)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format: str, *args: Any) -> None:
+                pass
+
+        return Handler
+
+
+class FakeSQS:
+    """In-memory queue implementing the SQS calls the handlers make."""
+
+    def __init__(self):
+        self._messages: Deque[Tuple[str, Dict[str, Any]]] = deque()
+        self._ids = itertools.count(1)
+        self._lock = threading.Condition()
+        self.sent = 0
+        self.batches = 0
+        self.released = 0
+
+    def send_message_batch(self, QueueUrl: str, Entries: List[Dict[str, Any]]) -> Dict[str, Any]:
+        now_ms = str(int(time.time() * 1000))
+        with self._lock:
+            self.batches += 1
+            for entry in Entries:
+                message_id = f"msg-{next(self._ids)}"
+                self._messages.append((entry["MessageBody"], {
+                    "messageId": message_id,
+                    "receiptHandle": message_id,
+                    "SentTimestamp": now_ms,
+                }))
+                self.sent += 1
+            self._lock.notify_all()
+        return {"Successful": [{"Id": entry["Id"]} for entry in Entries], "Failed": []}
+
+    def change_message_visibility_batch(self, QueueUrl: str, Entries: List[Dict[str, Any]]) -> Dict[str, Any]:
+        with self._lock:
+            self.released += len(Entries)
+        return {"Successful": [{"Id": entry["Id"]} for entry in Entries], "Failed": []}
+
+    def get_queue_attributes(self, QueueUrl: str, AttributeNames: List[str]) -> Dict[str, Any]:
+        return {"Attributes": {"ApproximateNumberOfMessages": str(len(self._messages))}}
+
+    def receive(self, max_messages: int, wait: float, window: float = 0.0) -> List[Dict[str, Any]]:
+        """Take up to ``max_messages`` as Lambda SQS event records.
+
+        Waits up to ``wait`` seconds for a first message and then, like the
+        Lambda batching window, up to ``window`` seconds for the batch to fill.
+        """
+        with self._lock:
+            if not self._messages:
+                self._lock.wait(wait)
+            if self._messages and window:
+                closes = time.monotonic() + window
+                while len(self._messages) < max_messages and time.monotonic() < closes:
+                    self._lock.wait(closes - time.monotonic())
+            taken = [self._messages.popleft() for _ in range(min(max_messages, len(self._messages)))]
+        now_ms = str(int(time.time() * 1000))
+        return [
+            {
+                "messageId": meta["messageId"],
+                "receiptHandle": meta["receiptHandle"],
+                "body": body,
+                "attributes": {
+                    "SentTimestamp": meta["SentTimestamp"],
+                    "ApproximateFirstReceiveTimestamp": now_ms,
+                    "ApproximateReceiveCount": "1",
+                },
+                "eventSource": "aws:sqs",
+                "eventSourceARN": "arn:aws:sqs:us-east-1:000000000000:loadtest",
+            }
+            for body, meta in taken
+        ]
+
+    def __len__(self) -> int:
+        return len(self._messages)
+
+
+class FakeCloudWatch:
+    """CloudWatch client answering metric queries from a callback.
+
+    ``latest`` maps a metric name to its latest value, or None when the
+    metric has no recent data.
+    """
+
+    def __init__(self, latest: Optional[Callable[[str], Optional[float]]] = None):
+        self.latest = latest or (lambda name: None)
+        self.calls = 0
+
+    def get_metric_data(self, MetricDataQueries: List[Dict[str, Any]], **kwargs: Any) -> Dict[str, Any]:
+        self.calls += 1
+        results = []
+        for query in MetricDataQueries:
+            value = self.latest(query["MetricStat"]["Metric"]["MetricName"])
+            results.append({"Id": query["Id"], "Label": query["Label"], "Values": [] if value is None else [value]})
+        return {"MetricDataResults": results}
+
+
+class FakeSSM:
+    """Parameter store holding the bot token."""
+
+    def __init__(self, parameters: Dict[str, str]):
+        self.parameters = parameters
+        self.calls = 0
+
+    def get_parameter(self, Name: str, WithDecryption: bool = False) -> Dict[str, Any]:
+        self.calls += 1
+        return {"Parameter": {"Name": Name, "Value": self.parameters[Name]}}
+
+
+class FakeAgentRuntime:
+    """``bedrock-agent-runtime`` client streaming a canned completion.
+
+    The answer echoes the prompt, padded to ``chunks * chunk_size``
+    characters, and arrives ``first_chunk_latency`` seconds after the call
+    and then one chunk every ``chunk_interval`` seconds. The first chunk
+    latency may be a function drawing it from a distribution. A share
+    ``throttle_rate`` of calls fails with ``ThrottlingException``. Requests
+    are kept in ``requests``.
+    """
+
+    def __init__(
+        self,
+        first_chunk_latency: Union[float, Callable[[], float]] = 0.5,
+        chunk_interval: float = 0.05,
+        chunks: int = 10,
+        chunk_size: int = 60,
+        throttle_rate: float = 0.0,
+        seed: Optional[int] = None
+    ):
+        self.first_chunk_latency = first_chunk_latency
+        self.chunk_interval = chunk_interval
+        self.chunks = chunks
+        self.chunk_size = chunk_size
+        self.throttle_rate = throttle_rate
+        self.calls = 0
+        self.throttled = 0
+        self.requests: List[Dict[str, Any]] = []
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def invoke_agent(self, **request: Any) -> Dict[str, Any]:
+        with self._lock:
+            self.calls += 1
+            self.requests.append(request)
+            throttled = self._random.random() < self.throttle_rate
+            if throttled:
+                self.throttled += 1
+        if throttled:
+            raise ClientError(
+                {"Error": {"Code": "ThrottlingException", "Message": "Rate exceeded"}}, "InvokeAgent"
+            )
+        return {"completion": self._stream(request["inputText"])}
+
+    def _stream(self, prompt: str) -> Iterator[Dict[str, Any]]:
+        length = self.chunks * self.chunk_size
+        sentence = f"You said: {prompt}. "
+        text = (sentence * (length // len(sentence) + 1))[:length]
+        latency = self.first_chunk_latency
+        time.sleep(latency() if callable(latency) else latency)
+        for index in range(self.chunks):
+            if index:
+                time.sleep(self.chunk_interval)
+            chunk = text[index * self.chunk_size:(index + 1) * self.chunk_size]
+            yield {"chunk": {"bytes": chunk.encode()}}
+
+
+class FakeLambdaContext:
+    """Lambda context with a real countdown for deadline handling."""
+
+    function_name = "loadtest"
+    function_version = "$LATEST"
+    invoked_function_arn = "arn:aws:lambda:us-east-1:000000000000:function:loadtest"
+    memory_limit_in_mb = 128
+    aws_request_id = "loadtest"
+    log_group_name = "loadtest"
+    log_stream_name = "loadtest"
+
+    def __init__(self, timeout: float):
+        self._expires_at = time.monotonic() + timeout
+
+    def get_remaining_time_in_millis(self) -> int:
+        return max(0, int((self._expires_at - time.monotonic()) * 1000))
+
+
+def install_fake_sibyl_core_sdk() -> None:
+    """Register a ``sibyl_core_sdk`` that knows every user, if the real one is missing."""
+    try:
+        import sibyl_core_sdk  # noqa: F401
+        return
+    except ImportError:
+        pass
+
+    class Configuration:
+        host: Optional[str] = None
+
+    class ApiClient:
+        def __init__(self, configuration: Any = None):
+            self.configuration = configuration
+
+    class UsersPostRequest:
+        def __init__(self, **fields: Any):
+            self.__dict__.update(fields)
+
+    class DefaultApi:
+        def __init__(self, api_client: Any = None):
+            self.api_client = api_client
+
+        def users_telegram_telegram_id_get(self, telegram_id: str, **kwargs: Any) -> Dict[str, Any]:
+            return {"id": f"user-{telegram_id}", "telegram_id": telegram_id, "name": "Load Test"}
+
+        def users_id_get(self, id: str, **kwargs: Any) -> Dict[str, Any]:
+            return {"id": id, "name": "Load Test"}
+
+    sdk = types.ModuleType("sibyl_core_sdk")
+    sdk.Configuration = Configuration
+    sdk.ApiClient = ApiClient
+    api = types.ModuleType("sibyl_core_sdk.api")
+    default_api = types.ModuleType("sibyl_core_sdk.api.default_api")
+    default_api.DefaultApi = DefaultApi
+    models = types.ModuleType("sibyl_core_sdk.models")
+    models.UsersPostRequest = UsersPostRequest
+    sys.modules.update({
+        "sibyl_core_sdk": sdk,
+        "sibyl_core_sdk.api": api,
+        "sibyl_core_sdk.api.default_api": default_api,
+        "sibyl_core_sdk.models": models,
+    })
@@ -0,0 +1,72 @@
+"""Configuration and synthetic Telegram updates for the handlers.
+
+Benchmarks import these too, so a workload measured there is the one the
+tests cover.
+"""
+
+import itertools
+import json
+import time
+from typing import Any, Dict, Iterator, List
+
+# Enough configuration for the modules to import without a deployed stack
+LAMBDA_ENV = {
+    "AWS_DEFAULT_REGION": "us-east-1",
+    "AWS_REGION": "us-east-1",
+    "AWS_ACCESS_KEY_ID": "testing",
+    "AWS_SECRET_ACCESS_KEY": "testing",
+    "AGENT_ID": "agent",
+    "AGENT_ALIAS_ID": "alias",
+    "SQS_QUEUE_URL": "https://sqs.us-east-1.amazonaws.com/000000000000/queue",
+}
+
+# Source address inside Telegram's webhook ranges
+TELEGRAM_IP = "149.154.167.99"
+BOT_TOKEN = "123456:testing"
+
+_update_ids = itertools.count(1)
+
+
+def synthetic_trace(updates: int, chats: int, burst: int = 1) -> Iterator[Dict[str, Any]]:
+    """Generate text message updates spread round-robin over private chats.
+
+    Each chat sends ``burst`` messages in a row before the next chat's turn.
+    """
+    for index in range(updates):
+        chat_id = 100000 + index // burst % chats
+        yield {
+            "update_id": index + 1,
+            "message": {
+                "message_id": index + 1,
+                "chat": {"id": chat_id, "type": "private"},
+                "from": {"id": chat_id, "is_bot": False, "first_name": "Load"},
+                "text": f"Tell me something about number {index}",
+            },
+        }
+
+
+def batch(chats: int) -> List[Dict[str, Any]]:
+    """Build SQS records carrying one text message from each of ``chats`` chats."""
+    from sibyl_telegram_interface.telegram.models import TelegramUpdate
+    records = []
+    for _ in range(chats):
+        update_id = next(_update_ids)
+        # New chats every batch, so per-chat pacing left by a run cannot slow the next
+        chat_id = 200000 + update_id
+        update = TelegramUpdate.from_update({
+            "update_id": update_id,
+            "message": {
+                "message_id": update_id,
+                "date": int(time.time()),
+                "chat": {"id": chat_id, "type": "private"},
+                "from": {"id": chat_id, "is_bot": False, "first_name": "Scaling"},
+                "text": f"Question {update_id}",
+            },
+        })
+        records.append({
+            "messageId": f"msg-{update_id}",
+            "receiptHandle": f"msg-{update_id}",
+            "body": json.dumps(update.to_wire()),
+            "attributes": {},
+        })
+    return records
@@ -0,0 +1,191 @@
+"""Tests of admission control against a simulated queue and metrics."""
+
+import threading
+
+import pytest
+from tests.support.fakes import FakeCloudWatch, FakeSQS
+
+from sibyl_telegram_interface.handlers.admission import (
+    ADMIT,
+    BUSY_NOTICE,
+    DEGRADE,
+    QUOTA_REPLY,
+    SHED,
+    SHED_REPLY,
+    AdmissionController,
+    LoadMonitor,
+)
+
+QUEUE_URL = "https://sqs.us-east-1.amazonaws.com/000000000000/queue"
+
+
+class FailingSQS:
+    """SQS client whose queue attribute reads fail."""
+
+    def get_queue_attributes(self, **kwargs):
+        raise ConnectionError("SQS unreachable")
+
+
+class BlockedSQS(FakeSQS):
+    """In-memory queue whose attribute reads wait until ``answer`` is set."""
+
+    def __init__(self):
+        super().__init__()
+        self.answer = threading.Event()
+
+    def get_queue_attributes(self, **kwargs):
+        self.answer.wait(5)
+        return super().get_queue_attributes(**kwargs)
+
+
+def fill(sqs, count):
+    """Put ``count`` updates in the simulated queue."""
+    for start in range(0, count, 10):
+        sqs.send_message_batch(
+            QueueUrl=QUEUE_URL,
+            Entries=[{"Id": str(index), "MessageBody": "{}"} for index in range(start, min(count, start + 10))],
+        )
+
+
+@pytest.fixture
+def sqs():
+    return FakeSQS()
+
+
+@pytest.fixture
+def metrics():
+    """Latest processor metrics in ms, by name; empty until a test sets them."""
+    return {}
+
+
+@pytest.fixture
+def monitor(sqs, metrics, clock):
+    # Refreshes run inline, so each decision sees the refresh it started
+    return LoadMonitor(
+        sqs, QUEUE_URL, FakeCloudWatch(metrics.get), refresh_seconds=15, clock=clock, spawn=lambda refresh: refresh()
+    )
+
+
+def controller(monitor, clock, **kwargs):
+    # 10 slots and 10 s turns: every queued update adds 1 s of wait
+    options = {
+        "slots": 10, "degrade_after": 60, "shed_after": 300, "notice_interval": 300,
+        "user_rate": 1, "user_burst": 100,
+    }
+    options.update(kwargs)
+    return AdmissionController(monitor, enabled=True, clock=clock, **options)
+
+
+def test_admits_under_light_load(sqs, monitor, clock):
+    fill(sqs, 30)
+
+    assert controller(monitor, clock).decide(1, 1) == (ADMIT, None)
+    assert monitor.estimate().wait(10) == pytest.approx(30)
+
+
+def test_degrades_with_one_busy_notice_per_chat(sqs, monitor, clock):
+    fill(sqs, 100)
+    admission = controller(monitor, clock)
+
+    assert admission.decide(1, 1) == (DEGRADE, BUSY_NOTICE)
+    assert admission.decide(1, 1) == (DEGRADE, None)
+    assert admission.decide(2, 2) == (DEGRADE, BUSY_NOTICE)
+
+    clock.advance(300)
+    assert admission.decide(1, 1) == (DEGRADE, BUSY_NOTICE)
+
+
+def test_sheds_beyond_the_shed_wait(sqs, monitor, clock):
+    fill(sqs, 300)
+
+    assert controller(monitor, clock).decide(1, 1) == (SHED, SHED_REPLY)
+
+
+def test_queue_age_from_metrics_counts_as_wait(monitor, metrics, clock):
+    metrics["QueueAge"] = 90000
+
+    assert controller(monitor, clock).decide(1, 1)[0] == DEGRADE
+
+
+def test_turn_time_from_metrics_scales_the_depth(sqs, monitor, metrics, clock):
+    fill(sqs, 10)
+    metrics["BedrockTotal"] = 100000
+
+    assert controller(monitor, clock).decide(1, 1)[0] == DEGRADE
+
+
+def test_decisions_do_not_wait_for_a_refresh(clock):
+    sqs = BlockedSQS()
+    fill(sqs, 300)
+    monitor = LoadMonitor(sqs, QUEUE_URL, FakeCloudWatch(), refresh_seconds=15, clock=clock)
+    admission = controller(monitor, clock)
+
+    assert admission.decide(1, 1) == (ADMIT, None)
+    assert admission.decide(2, 2) == (ADMIT, None)
+
+    sqs.answer.set()
+    # The refresh thread holds the lock until it is done
+    assert monitor._lock.acquire(timeout=5)
+    monitor._lock.release()
+    assert monitor.refreshes == 1
+    assert admission.decide(3, 3)[0] == SHED
+
+
+def test_estimate_is_reused_until_stale(sqs, monitor, clock):
+    admission = controller(monitor, clock)
+    assert admission.decide(1, 1)[0] == ADMIT
+
+    fill(sqs, 300)
+    assert admission.decide(2, 2)[0] == ADMIT
+    assert monitor.refreshes == 1
+
+    clock.advance(15)
+    assert admission.decide(3, 3)[0] == SHED
+    assert monitor.refreshes == 2
+
+
+def test_failed_refresh_keeps_the_previous_estimate(sqs, monitor, clock):
+    fill(sqs, 100)
+    admission = controller(monitor, clock)
+    assert admission.decide(1, 1)[0] == DEGRADE
+
+    monitor.sqs_client = FailingSQS()
+    clock.advance(15)
+
+    assert admission.decide(2, 2)[0] == DEGRADE
+    assert monitor.refreshes == 2
+
+
+def test_admits_until_a_first_estimate(monitor, clock):
+    monitor.sqs_client = FailingSQS()
+
+    assert controller(monitor, clock).decide(1, 1) == (ADMIT, None)
+    assert monitor.estimate() is None
+
+
+def test_user_quota_sheds_with_one_notice(monitor, clock):
+    admission = controller(monitor, clock, user_rate=1, user_burst=3)
+    for _ in range(3):
+        assert admission.decide(1, 1) == (ADMIT, None)
+
+    assert admission.decide(1, 1) == (SHED, QUOTA_REPLY)
+    assert admission.decide(1, 1) == (SHED, None)
+    assert admission.decide(2, 1) == (ADMIT, None)
+
+    clock.advance(1)
+    assert admission.decide(1, 1) == (ADMIT, None)
+
+
+def test_disabled_controller_admits_everything(sqs, monitor, clock):
+    fill(sqs, 1000)
+    admission = AdmissionController(monitor, enabled=False, clock=clock)
+
+    assert admission.decide(1, 1) == (ADMIT, None)
+    assert monitor.refreshes == 0
+
+
+def test_zero_user_rate_turns_the_quota_off(monitor, clock):
+    admission = controller(monitor, clock, user_rate=0, user_burst=0)
+
+    for _ in range(100):
+        assert admission.decide(1, 1) == (ADMIT, None)
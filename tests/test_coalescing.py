@@ -0,0 +1,80 @@
+"""Tests of answering a burst of messages from one chat as one agent turn."""
+
+import itertools
+import json
+import time
+
+import pytest
+from tests.support.fakes import FakeAgentRuntime, FakeLambdaContext, FakeSQS, FakeSSM
+from tests.support.workload import BOT_TOKEN
+
+from sibyl_telegram_interface.config import settings
+from sibyl_telegram_interface.telegram.models import TelegramUpdate
+from sibyl_telegram_interface.utils import ssm
+
+QUEUE_ARN = "arn:aws:sqs:us-east-1:000000000000:queue"
+CHAT_ID = 400000
+
+
+@pytest.fixture
+def agent(processor, monkeypatch):
+    monkeypatch.setattr(ssm, "_CLIENT", FakeSSM({settings.BOT_TOKEN_PARAM_PATH: BOT_TOKEN}))
+    monkeypatch.setattr(processor, "_sqs_client", FakeSQS())
+    monkeypatch.setattr(settings, "COALESCE_WINDOW_SECONDS", 2)
+    agent = FakeAgentRuntime(first_chunk_latency=0, chunk_interval=0, chunks=1)
+    monkeypatch.setattr(processor.bedrock, "client", agent)
+    return agent
+
+
+@pytest.fixture
+def deliver(processor):
+    """Run the processor on one batch of messages, given as (seconds after now, text)."""
+    update_ids = itertools.count(1)
+    start = int(time.time())
+
+    def deliver(*messages):
+        records = []
+        for offset, text in messages:
+            update_id = next(update_ids)
+            update = TelegramUpdate.from_update({
+                "update_id": update_id,
+                "message": {
+                    "message_id": update_id,
+                    "date": start + offset,
+                    "chat": {"id": CHAT_ID, "type": "private"},
+                    "from": {"id": CHAT_ID, "is_bot": False, "first_name": "Burst"},
+                    "text": text,
+                },
+            })
+            records.append({
+                "messageId": f"msg-{update_id}",
+                "receiptHandle": f"msg-{update_id}",
+                "body": json.dumps(update.to_wire()),
+                "attributes": {},
+                "eventSourceARN": QUEUE_ARN,
+            })
+        response = processor.lambda_handler({"Records": records}, FakeLambdaContext(30))
+        assert response["batchItemFailures"] == []
+
+    return deliver
+
+
+def test_burst_in_one_batch_is_one_turn(agent, deliver):
+    deliver((0, "So about the report"), (1, "the quarterly one"), (2, "can you summarize it?"))
+
+    assert agent.calls == 1
+    assert agent.requests[0]["inputText"] == "So about the report\nthe quarterly one\ncan you summarize it?"
+
+
+def test_messages_further_apart_than_the_window_are_separate_turns(agent, deliver):
+    deliver((0, "First question"), (3, "Second question"))
+
+    assert agent.calls == 2
+
+
+def test_burst_split_across_batches_is_answered_twice(agent, deliver):
+    # Coalescing only sees one batch; this is the documented limit
+    deliver((0, "So about the report"))
+    deliver((1, "can you summarize it?"))
+
+    assert agent.calls == 2
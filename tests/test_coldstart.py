@@ -0,0 +1,51 @@
+"""Cold start of the Lambda entry points.
+
+The init time budgets are benchmarks, run with ``pytest -m benchmark``.
+"""
+
+import json
+import os
+import statistics
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+ROOT = Path(__file__).resolve().parent.parent
+HANDLERS = ["processor", "setup", "webhook"]
+RUNS = 3
+
+
+@pytest.fixture
+def coldstart(monkeypatch):
+    """The cold-start benchmark, which profiles handler imports."""
+    monkeypatch.syspath_prepend(str(ROOT / "benchmarks"))
+    import coldstart
+
+    return coldstart
+
+
+@pytest.mark.benchmark
+@pytest.mark.parametrize("name", HANDLERS)
+def test_handler_init_within_budget(coldstart, name):
+    budget = json.loads(coldstart.BUDGET_FILE.read_text())
+    handler = coldstart.HANDLERS[name]
+
+    init_ms = statistics.median(coldstart.profile_handler(handler)[0] for _ in range(RUNS))
+
+    assert init_ms <= budget[name], f"{name} init took {init_ms:.0f} ms, budget {budget[name]} ms"
+
+
+def test_server_imports_without_aws_configuration():
+    # The local server and poller run outside AWS; clients are made on first use
+    env = {key: value for key, value in os.environ.items() if not key.startswith("AWS_")}
+    env.update(AWS_CONFIG_FILE=os.devnull, AWS_SHARED_CREDENTIALS_FILE=os.devnull, PYTHONPATH=str(ROOT / "src"))
+    result = subprocess.run(
+        [sys.executable, "-c", "import sibyl_telegram_interface.handlers.server"],
+        capture_output=True,
+        text=True,
+        env=env,
+    )
+
+    assert result.returncode == 0, result.stderr
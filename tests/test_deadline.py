@@ -0,0 +1,116 @@
+"""Tests of deadline-bounded processing with a fake Lambda context and a slow agent."""
+
+import time
+
+import pytest
+from tests.support.fakes import FakeAgentRuntime, FakeLambdaContext, FakeSQS, FakeSSM
+from tests.support.workload import BOT_TOKEN, batch
+
+from sibyl_telegram_interface.config import settings
+from sibyl_telegram_interface.services.dedup import CLAIMED
+from sibyl_telegram_interface.telegram.models import TelegramUpdate
+from sibyl_telegram_interface.utils import deadline as deadlines
+from sibyl_telegram_interface.utils import json_codec, ssm
+from sibyl_telegram_interface.utils.deadline import Deadline, DeadlineExceeded
+
+QUEUE_ARN = "arn:aws:sqs:us-east-1:000000000000:queue"
+
+
+@pytest.fixture
+def invoke(processor, monkeypatch):
+    """Run the processor handler on records, with a short deadline budget."""
+    monkeypatch.setattr(ssm, "_CLIENT", FakeSSM({settings.BOT_TOKEN_PARAM_PATH: BOT_TOKEN}))
+    monkeypatch.setattr(processor, "_sqs_client", FakeSQS())
+    monkeypatch.setattr(settings, "DEADLINE_MIN_START", 1.0)
+    monkeypatch.setattr(settings, "DEADLINE_REPLY_RESERVE", 0.5)
+
+    def invoke(records, timeout):
+        for record in records:
+            record["eventSourceARN"] = QUEUE_ARN
+        started = time.monotonic()
+        response = processor.lambda_handler({"Records": records}, FakeLambdaContext(timeout))
+        return [failure["itemIdentifier"] for failure in response["batchItemFailures"]], time.monotonic() - started
+
+    return invoke
+
+
+def update_of(record):
+    return TelegramUpdate.from_wire(json_codec.loads(record["body"]))
+
+
+def slow_agent(processor, monkeypatch, first_chunk_latency):
+    agent = FakeAgentRuntime(first_chunk_latency=first_chunk_latency, chunk_interval=0, chunks=1)
+    monkeypatch.setattr(processor.bedrock, "client", agent)
+    return agent
+
+
+def test_deadline_from_context_keeps_margin(clock):
+    deadline = Deadline.from_context(FakeLambdaContext(10), margin=2, clock=clock)
+
+    assert deadline.remaining() == pytest.approx(8, abs=0.05)
+    assert deadline.timeout(3) == 3
+    clock.advance(7)
+    assert deadline.timeout(3) == pytest.approx(1, abs=0.05)
+    clock.advance(5)
+    assert deadline.timeout(3) == deadlines.MIN_CALL_TIMEOUT
+
+
+def test_iter_within_stops_before_the_deadline():
+    def slow():
+        yield 1
+        time.sleep(5)
+        yield 2
+
+    deadline = Deadline(time.monotonic() + 0.5)
+    items = []
+    started = time.monotonic()
+    with pytest.raises(DeadlineExceeded):
+        for item in deadlines.iter_within(slow(), deadline, reserve=0.2):
+            items.append(item)
+
+    assert items == [1]
+    assert time.monotonic() - started < 0.5
+
+
+def test_answers_within_the_deadline(processor, invoke, telegram):
+    sent = telegram.calls.get("sendMessage", 0)
+
+    failed, _ = invoke(batch(2), timeout=10)
+
+    assert failed == []
+    assert telegram.calls["sendMessage"] - sent == 2
+
+
+def test_slow_agent_is_released_with_a_still_thinking_reply(processor, invoke, telegram, monkeypatch):
+    slow_agent(processor, monkeypatch, first_chunk_latency=30)
+    records = batch(1)
+    sent = telegram.calls.get("sendMessage", 0)
+
+    # 4 s of Lambda time leave 2 s after the safety margin, and the agent
+    # wait stops 0.5 s before that
+    failed, elapsed = invoke(records, timeout=4)
+
+    assert failed == [records[0]["messageId"]]
+    assert elapsed < 2.5
+    assert telegram.calls["sendMessage"] - sent == 1
+    assert processor._sqs_client.released == 1
+    assert processor.dedup_store.begin(update_of(records[0]).update_id) == CLAIMED
+
+
+def test_records_not_started_without_enough_time(processor, invoke, monkeypatch):
+    agent = slow_agent(processor, monkeypatch, first_chunk_latency=1.0)
+    monkeypatch.setattr(settings, "COALESCE_WINDOW_SECONDS", 0)
+    records = batch(3)
+    for record in records:
+        # One chat, so its records are processed in order
+        update = update_of(record)
+        update.chat_id = update.user_id = 300000
+        record["body"] = json_codec.dumps(update.to_wire())
+
+    # 1.8 s after the margin and a 1 s agent: the first record fits, the
+    # others would start with less than DEADLINE_MIN_START left
+    failed, _ = invoke(records, timeout=3.8)
+
+    assert failed == [record["messageId"] for record in records[1:]]
+    assert agent.calls == 1
+    assert processor._sqs_client.released == 2
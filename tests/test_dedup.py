@@ -0,0 +1,134 @@
+"""Tests of update deduplication and of how the processor acts on claims."""
+
+import boto3
+import pytest
+from moto import mock_aws
+from tests.support.workload import BOT_TOKEN, batch
+
+from sibyl_telegram_interface.services.dedup import (
+    CLAIMED,
+    STATUS_DONE,
+    STATUS_IN_PROGRESS,
+    DynamoDBDedupStore,
+    InMemoryDedupStore,
+    TieredDedupStore,
+)
+
+TABLE = "dedup"
+
+
+def updates_of(records):
+    from sibyl_telegram_interface.telegram.models import TelegramUpdate
+    from sibyl_telegram_interface.utils import json_codec
+
+    return [TelegramUpdate.from_wire(json_codec.loads(record["body"])) for record in records]
+
+
+@pytest.fixture
+def dynamodb():
+    with mock_aws():
+        client = boto3.client("dynamodb", region_name="us-east-1")
+        client.create_table(
+            TableName=TABLE,
+            KeySchema=[{"AttributeName": "update_id", "KeyType": "HASH"}],
+            AttributeDefinitions=[{"AttributeName": "update_id", "AttributeType": "N"}],
+            BillingMode="PAY_PER_REQUEST",
+        )
+        yield client
+
+
+def test_in_memory_claim_states(clock):
+    store = InMemoryDedupStore(lease_seconds=60, ttl_seconds=3600, clock=clock)
+
+    assert store.begin(1) == CLAIMED
+    assert store.begin(1) == STATUS_IN_PROGRESS
+    store.complete(1)
+    assert store.begin(1) == STATUS_DONE
+
+
+def test_in_memory_lease_expires(clock):
+    store = InMemoryDedupStore(lease_seconds=60, ttl_seconds=3600, clock=clock)
+
+    assert store.begin(1) == CLAIMED
+    clock.advance(61)
+    assert store.begin(1) == CLAIMED
+
+
+def test_in_memory_release_allows_retry(clock):
+    store = InMemoryDedupStore(lease_seconds=60, ttl_seconds=3600, clock=clock)
+
+    store.begin(1)
+    store.release(1)
+    assert store.begin(1) == CLAIMED
+
+
+def test_dynamodb_claim_states(dynamodb, clock):
+    store = DynamoDBDedupStore(TABLE, client=dynamodb, lease_seconds=60, clock=clock)
+
+    assert store.begin(1) == CLAIMED
+    assert store.begin(1) == STATUS_IN_PROGRESS
+    store.complete(1)
+    assert store.begin(1) == STATUS_DONE
+
+
+def test_dynamodb_lease_expires(dynamodb, clock):
+    store = DynamoDBDedupStore(TABLE, client=dynamodb, lease_seconds=60, clock=clock)
+
+    assert store.begin(1) == CLAIMED
+    clock.advance(61)
+    assert store.begin(1) == CLAIMED
+
+
+def test_dynamodb_release_keeps_answered_updates(dynamodb, clock):
+    store = DynamoDBDedupStore(TABLE, client=dynamodb, lease_seconds=60, clock=clock)
+
+    store.begin(1)
+    store.release(1)
+    assert store.begin(1) == CLAIMED
+    store.complete(1)
+    store.release(1)
+    assert store.begin(1) == STATUS_DONE
+
+
+def test_tiered_skips_shared_store_for_local_answers(dynamodb, clock):
+    shared = DynamoDBDedupStore(TABLE, client=dynamodb, lease_seconds=60, clock=clock)
+    store = TieredDedupStore(InMemoryDedupStore(clock=clock), shared)
+
+    assert store.begin(1) == CLAIMED
+    store.complete(1)
+    dynamodb.delete_table(TableName=TABLE)
+    assert store.begin(1) == STATUS_DONE
+
+
+def test_replayed_record_invokes_agent_once(processor):
+    from sibyl_telegram_interface.telegram.bot import get_bot
+
+    bot = get_bot(BOT_TOKEN)
+    records = batch(1)
+
+    assert processor.process_batch(bot, records) == []
+    assert processor.process_batch(bot, records) == []
+    assert processor.bedrock.client.calls == 1
+
+
+def test_record_in_progress_elsewhere_is_retried(processor):
+    from sibyl_telegram_interface.telegram.bot import get_bot
+
+    bot = get_bot(BOT_TOKEN)
+    records = batch(2)
+    processor.dedup_store.begin(updates_of(records)[1].update_id)
+
+    assert processor.process_batch(bot, records) == [records[1]["messageId"]]
+    assert processor.bedrock.client.calls == 1
+
+
+def test_in_progress_message_releases_rest_of_burst(processor):
+    from sibyl_telegram_interface.services.dedup import UpdateInProgress
+
+    updates = updates_of(batch(2))
+    processor.dedup_store.begin(updates[1].update_id)
+
+    with pytest.raises(UpdateInProgress) as raised:
+        processor._claim(updates)
+    assert raised.value.update_ids == [updates[1].update_id]
+    assert processor.dedup_store.begin(updates[0].update_id) == CLAIMED
@@ -0,0 +1,122 @@
+"""Property tests of message splitting on seeded random texts."""
+
+import html
+import random
+import re
+
+import pytest
+
+from sibyl_telegram_interface.telegram.formatting import SUPPORTED_TAGS, split_message
+
+CASES = 300
+
+_TAG = re.compile(r"<(/?)([a-zA-Z][\w-]*)((?:\s[^<>]*)?)>")
+_ENTITY = re.compile(r"&(?:[a-zA-Z]+|#\d+|#x[0-9a-fA-F]+);")
+_MARKUP = re.compile(_TAG.pattern + "|" + _ENTITY.pattern + r"|[<>&]")
+
+WORDS = ["a", "the", "agent", "Telegram", "message", "boundary", "überlang", "日本語", "🙂", "x" * 12]
+SEPARATORS = [" ", " ", " ", "\n", "\n\n", ". ", "! ", "? ", "… ", "\t"]
+OPENING = ["<b>", "<i>", "<code>", "<pre>", "<u>", "<s>", "<tg-spoiler>", '<a href="https://t.me/x">']
+STRAY = ["<", ">", "&", "&amp;", "&lt;", "&#169;", "&#x1F600;", "<div>", "</p>", "<br/>", "a<b", "x > y"]
+
+
+def random_text(rng: random.Random, markup: bool) -> str:
+    """Build a text of words and separators, optionally mixed with tags and stray markup."""
+    pieces = []
+    open_tags = []
+    for _ in range(rng.randint(0, 120)):
+        roll = rng.random()
+        if markup and roll < 0.08:
+            tag = rng.choice(OPENING)
+            pieces.append(tag)
+            open_tags.append(_TAG.match(tag).group(2))
+        elif markup and roll < 0.14 and open_tags:
+            # Usually the innermost tag, sometimes another one or a mismatched one
+            name = open_tags.pop() if rng.random() < 0.8 else rng.choice(["b", "i", "em"])
+            pieces.append(f"</{name}>")
+        elif markup and roll < 0.2:
+            pieces.append(rng.choice(STRAY))
+        else:
+            pieces.append(rng.choice(WORDS))
+            pieces.append(rng.choice(SEPARATORS))
+    return "".join(pieces)
+
+
+def visible(text: str) -> str:
+    """Get the text a reader sees: supported tags removed and entities decoded."""
+    text = _TAG.sub(lambda match: "" if match.group(2).lower() in SUPPORTED_TAGS else match.group(0), text)
+    return _ENTITY.sub(lambda match: html.unescape(match.group(0)), text)
+
+
+def assert_well_formed(part: str) -> None:
+    """Check that a part only has supported, properly nested tags and no stray markup."""
+    stack = []
+    for match in _MARKUP.finditer(part):
+        token = match.group(0)
+        if token in "<>&":
+            pytest.fail(f"stray {token!r} in {part!r}")
+        name = match.group(2)
+        if name is None:
+            continue
+        assert name in SUPPORTED_TAGS, part
+        if match.group(1):
+            assert stack and stack.pop() == name, part
+        else:
+            stack.append(name)
+    assert not stack, part
+
+
+@pytest.fixture
+def cases():
+    rng = random.Random(20240601)
+    return [(seed, rng.randint(20, 300)) for seed in range(CASES)]
+
+
+def test_plain_parts_fit_and_keep_the_text(cases):
+    for seed, limit in cases:
+        text = random_text(random.Random(seed), markup=False)
+        parts = split_message(text, limit=limit, html=False)
+
+        assert "".join(parts) == text, (seed, limit)
+        assert all(0 < len(part) <= limit for part in parts), (seed, limit)
+
+
+def test_plain_parts_do_not_cut_words(cases):
+    for seed, limit in cases:
+        text = random_text(random.Random(seed), markup=False)
+        parts = split_message(text, limit=max(limit, 24), html=False)
+
+        assert [word for part in parts for word in part.split()] == text.split(), (seed, limit)
+
+
+def test_html_parts_are_well_formed(cases):
+    for seed, limit in cases:
+        text = random_text(random.Random(seed), markup=True)
+        for part in split_message(text, limit=limit):
+            assert len(part) <= limit, (seed, limit, part)
+            assert_well_formed(part)
+
+
+def test_html_parts_keep_the_visible_text(cases):
+    for seed, limit in cases:
+        text = random_text(random.Random(seed), markup=True)
+        parts = split_message(text, limit=limit)
+
+        assert "".join(visible(part) for part in parts) == visible(text), (seed, limit)
+        assert all(visible(part) for part in parts), (seed, limit)
+
+
+def test_single_part_when_text_fits():
+    text = "<b>Hello</b>, <i>world</i>!"
+
+    assert split_message(text) == [text]
+    assert split_message("") == []
+
+
+def test_prefers_paragraph_boundaries():
+    first = "First paragraph. " * 3
+    second = "Second paragraph."
+
+    assert split_message(f"{first}\n\n{second}", limit=len(first) + 10, html=False) == [
+        f"{first}\n\n", second
+    ]
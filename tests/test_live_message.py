@@ -0,0 +1,133 @@
+"""Tests of streamed replies with a fake bot recording its calls."""
+
+import itertools
+
+import pytest
+
+from sibyl_telegram_interface.telegram.live_message import LiveMessage
+from sibyl_telegram_interface.telegram.scheduler import PRIORITY_BACKGROUND
+
+CHAT_ID = 7
+
+
+class FakeBot:
+    """Records sends and edits as (method, text, parse mode) tuples."""
+
+    def __init__(self):
+        self.calls = []
+        self.priorities = []
+        self._message_ids = itertools.count(1)
+
+    def send_message(self, chat_id, text, parse_mode="HTML", priority=None):
+        self.calls.append(("send", text, parse_mode))
+        return {"ok": True, "result": {"message_id": next(self._message_ids)}}
+
+    def send_long_message(self, chat_id, text, parse_mode="HTML"):
+        self.calls.append(("send_long", text, parse_mode))
+        return [{"ok": True, "result": {"message_id": next(self._message_ids)}}]
+
+    def edit_message_text(self, chat_id, message_id, text, parse_mode=None, priority=None):
+        self.calls.append(("edit", text, parse_mode))
+        self.priorities.append(priority)
+        return {"ok": True, "result": True}
+
+
+@pytest.fixture
+def bot():
+    return FakeBot()
+
+
+def live(bot, clock, **kwargs):
+    options = {"min_interval": 1, "min_chars": 5, "limit": 4096}
+    options.update(kwargs)
+    return LiveMessage(bot, CHAT_ID, clock=clock, **options)
+
+
+def test_single_chunk_is_sent_once(bot, clock):
+    reply = live(bot, clock)
+
+    reply.append("The whole answer")
+    reply.finish()
+
+    assert bot.calls == [("send_long", "The whole answer", "HTML")]
+
+
+def test_stream_is_sent_then_edited(bot, clock):
+    reply = live(bot, clock)
+
+    reply.append("Hello ")
+    assert bot.calls == []
+    reply.append("world")
+    assert bot.calls == [("send", "Hello world", None)]
+
+    reply.append("!!!")
+    clock.advance(1)
+    reply.append(" More")
+    reply.append(" and <b>more</b>")
+    reply.finish()
+
+    assert bot.calls[1:] == [
+        ("edit", "Hello world!!! More", None),
+        ("edit", "Hello world!!! More and <b>more</b>", "HTML"),
+    ]
+    assert bot.priorities[0] == PRIORITY_BACKGROUND
+
+
+def test_edits_wait_for_interval_and_new_text(bot, clock):
+    reply = live(bot, clock)
+    reply.append("Hello ")
+    reply.append("world")
+
+    reply.append("12345")
+    clock.advance(1)
+    reply.append("1")
+
+    assert [call[0] for call in bot.calls] == ["send", "edit"]
+
+
+def test_overflow_continues_in_new_messages(bot, clock):
+    reply = live(bot, clock, limit=20, min_interval=0, min_chars=1)
+
+    for word in ("alpha ", "beta ", "gamma ", "delta ", "epsilon ", "zeta"):
+        reply.append(word)
+    reply.finish()
+
+    sends = [call for call in bot.calls if call[0] == "send_long"]
+    edits = [call for call in bot.calls if call[0] == "edit"]
+    assert all(len(text) <= 20 for _, text, _ in bot.calls)
+    assert edits[-1] == ("edit", "alpha beta gamma ", "HTML")
+    assert sends == [("send_long", "delta epsilon zeta", "HTML")]
+
+
+def test_final_edit_is_skipped_when_it_renders_the_same(bot, clock):
+    reply = live(bot, clock)
+
+    reply.append("Plain ")
+    reply.append("answer")
+    reply.finish()
+
+    assert bot.calls == [("send", "Plain answer", None)]
+
+
+def test_final_edit_applies_markup_to_the_same_text(bot, clock):
+    reply = live(bot, clock)
+
+    reply.append("<b>Bold</b> ")
+    reply.append("answer")
+    reply.finish()
+
+    assert bot.calls == [("send", "<b>Bold</b> answer", None), ("edit", "<b>Bold</b> answer", "HTML")]
+
+
+def test_fallback_without_chunks(bot, clock):
+    reply = live(bot, clock)
+
+    reply.finish(fallback="Nothing to say")
+
+    assert bot.calls == [("send_long", "Nothing to say", "HTML")]
+
+
+def test_nothing_is_sent_without_chunks_or_fallback(bot, clock):
+    live(bot, clock).finish()
+
+    assert bot.calls == []
@@ -0,0 +1,143 @@
+"""Tests of getUpdates ingestion and webhook setup against a fake Bot API server."""
+
+import pytest
+from tests.support.fakes import FakeSQS
+from tests.support.workload import synthetic_trace
+
+from sibyl_telegram_interface.handlers.admission import AdmissionController
+from sibyl_telegram_interface.handlers.lambda_handler import ingest_batch
+from sibyl_telegram_interface.services.queue import EnqueueError, UpdateQueue
+from sibyl_telegram_interface.telegram.bot import TelegramBot
+from sibyl_telegram_interface.telegram.polling import PollError, UpdatePoller
+
+BOT_TOKEN = "123456:polling"
+QUEUE_URL = "https://sqs.us-east-1.amazonaws.com/000000000000/queue"
+WEBHOOK_URL = "https://example.com/webhook"
+
+
+class FlakySQS(FakeSQS):
+    """In-memory queue rejecting every entry of the next ``failures`` SendMessageBatch calls."""
+
+    def __init__(self):
+        super().__init__()
+        self.failures = 0
+
+    def send_message_batch(self, QueueUrl, Entries):
+        if self.failures:
+            self.failures -= 1
+            failed = [{"Id": entry["Id"], "Code": "InvalidParameterValue", "SenderFault": True} for entry in Entries]
+            return {"Successful": [], "Failed": failed}
+        return super().send_message_batch(QueueUrl, Entries)
+
+
+@pytest.fixture
+def stub(telegram):
+    """The Bot API stub with no webhook and no pending updates."""
+    telegram.webhook = None
+    telegram.pending = []
+    yield telegram
+    telegram.webhook = None
+    telegram.pending = []
+
+
+@pytest.fixture
+def bot(stub):
+    return TelegramBot(BOT_TOKEN)
+
+
+@pytest.fixture
+def sqs():
+    return FlakySQS()
+
+
+@pytest.fixture
+def poller(bot, sqs):
+    queue = UpdateQueue(QUEUE_URL, sqs)
+    controller = AdmissionController(None, enabled=False)
+    return UpdatePoller(bot, lambda updates: ingest_batch(bot, updates, queue, controller), timeout=0, retry_delay=0)
+
+
+def push(stub, count):
+    for update in synthetic_trace(count, chats=count):
+        stub.push(update)
+
+
+def test_offset_moves_past_an_enqueued_batch(stub, poller, sqs):
+    push(stub, 3)
+
+    assert poller.poll_once() == 3
+
+    assert sqs.sent == 3
+    assert poller.offset == 4
+    assert poller.poll_once() == 0
+    assert stub.pending == []
+
+
+def test_failed_enqueue_fetches_the_batch_again(stub, poller, sqs):
+    push(stub, 3)
+    sqs.failures = 1
+
+    with pytest.raises(EnqueueError):
+        poller.poll_once()
+    assert poller.offset is None
+    assert len(stub.pending) == 3
+
+    assert poller.poll_once() == 3
+    assert sqs.sent == 3
+
+
+def test_batch_is_limited_to_capacity(stub, poller):
+    push(stub, 5)
+    poller.capacity = lambda: 2
+
+    assert poller.poll_once() == 2
+    assert poller.offset == 3
+
+
+def test_run_confirms_the_last_batch_on_stop(stub, poller):
+    push(stub, 2)
+    handle_batch = poller.handle_batch
+
+    def handle_and_stop(updates):
+        handle_batch(updates)
+        poller.stop()
+
+    poller.handle_batch = handle_and_stop
+    poller.run()
+
+    assert poller.updates == 2
+    assert stub.pending == []
+
+
+def test_polling_conflicts_with_a_webhook(stub, bot, poller):
+    push(stub, 1)
+    assert bot.set_webhook(WEBHOOK_URL)["ok"]
+
+    with pytest.raises(PollError) as error:
+        poller.poll_once()
+    assert error.value.error_code == 409
+
+    assert bot.delete_webhook()["ok"]
+    assert poller.poll_once() == 1
+
+
+def test_set_webhook_sends_a_valid_secret(stub, bot):
+    bot.set_webhook(WEBHOOK_URL, secret_token="s3cret_token-1", max_connections=100)
+
+    assert stub.webhook["secret_token"] == "s3cret_token-1"
+    assert stub.webhook["max_connections"] == 100
+
+
+@pytest.mark.parametrize("options", [
+    {"secret_token": "not allowed!"},
+    {"secret_token": "x" * 257},
+    {"max_connections": 0},
+    {"max_connections": 101},
+])
+def test_set_webhook_rejects_invalid_options(stub, bot, options):
+    calls = stub.calls.get("setWebhook", 0)
+
+    with pytest.raises(ValueError):
+        bot.set_webhook(WEBHOOK_URL, **options)
+    assert stub.calls.get("setWebhook", 0) == calls
+    assert stub.webhook is None
@@ -0,0 +1,208 @@
+"""Tests of agent failover, circuit breaking and hedging with fake agent clients."""
+
+import time
+
+import pytest
+from botocore.exceptions import ClientError
+from tests.support.fakes import FakeAgentRuntime
+
+from sibyl_telegram_interface.services.resilience import (
+    STATE_CLOSED,
+    STATE_OPEN,
+    AgentEndpoint,
+    AgentRouter,
+    CircuitBreaker,
+    CircuitOpenError,
+    HedgeBudget,
+    LatencyHistogram,
+)
+
+REQUEST = {"sessionId": "7-1", "inputText": "hello"}
+
+
+class RejectingAgentRuntime:
+    """Agent client whose calls fail with a non-retryable error."""
+
+    def __init__(self):
+        self.calls = 0
+
+    def invoke_agent(self, **request):
+        self.calls += 1
+        raise ClientError({"Error": {"Code": "ValidationException", "Message": "Bad input"}}, "InvokeAgent")
+
+
+def agent(first_chunk_latency=0.0, throttle_rate=0.0):
+    return FakeAgentRuntime(first_chunk_latency=first_chunk_latency, chunk_interval=0, chunks=1,
+                            throttle_rate=throttle_rate)
+
+
+def endpoint(client, alias="alias", **kwargs):
+    return AgentEndpoint("us-east-1", "agent", alias, client_factory=lambda region: client, **kwargs)
+
+
+def text_of(events):
+    return "".join(event["chunk"]["bytes"].decode() for event in events)
+
+
+def primed_histogram(seconds, samples=20):
+    histogram = LatencyHistogram(min_samples=samples)
+    for _ in range(samples):
+        histogram.observe(seconds)
+    return histogram
+
+
+def test_injected_empty_histogram_is_kept():
+    histogram = LatencyHistogram()
+
+    assert endpoint(agent(), histogram=histogram).histogram is histogram
+
+
+def test_fails_over_on_throttling():
+    primary, secondary = agent(throttle_rate=1), agent()
+    router = AgentRouter([endpoint(primary, "primary"), endpoint(secondary, "secondary")])
+
+    assert "hello" in text_of(router.invoke(REQUEST))
+    assert (primary.calls, secondary.calls) == (1, 1)
+    assert secondary.requests[0]["agentAliasId"] == "secondary"
+    assert router.endpoints[0].breaker.failures == 1
+
+
+def test_other_errors_do_not_fail_over():
+    primary, secondary = RejectingAgentRuntime(), agent()
+    router = AgentRouter([endpoint(primary), endpoint(secondary)])
+
+    with pytest.raises(ClientError):
+        list(router.invoke(REQUEST))
+    assert secondary.calls == 0
+
+
+def test_error_of_last_endpoint_is_raised():
+    router = AgentRouter([endpoint(agent(throttle_rate=1)), endpoint(agent(throttle_rate=1))])
+
+    with pytest.raises(ClientError, match="ThrottlingException"):
+        list(router.invoke(REQUEST))
+
+
+def test_session_state_sent_to_every_endpoint():
+    primary, secondary = agent(throttle_rate=1), agent()
+    router = AgentRouter([endpoint(primary), endpoint(secondary)])
+    state = {"sessionAttributes": {"user_id": "7"}}
+
+    list(router.invoke(REQUEST, state))
+
+    assert primary.requests[0]["sessionState"] == secondary.requests[0]["sessionState"] == state
+
+
+def test_circuit_opens_and_recovers(clock):
+    primary, secondary = agent(throttle_rate=1), agent()
+    breaker = CircuitBreaker(failure_threshold=2, reset_timeout=30, clock=clock)
+    router = AgentRouter([endpoint(primary, breaker=breaker), endpoint(secondary)])
+
+    for _ in range(3):
+        list(router.invoke(REQUEST))
+    assert breaker.state == STATE_OPEN
+    assert primary.calls == 2
+
+    primary.throttle_rate = 0
+    clock.advance(30)
+    list(router.invoke(REQUEST))
+    assert primary.calls == 3
+    assert breaker.state == STATE_CLOSED
+
+
+@pytest.mark.parametrize("hedge_percentile", [0, 0.95])
+def test_half_open_circuit_is_not_claimed_unless_tried(clock, hedge_percentile):
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=30, clock=clock)
+    breaker.record_failure()
+    clock.advance(30)
+    secondary = agent()
+    router = AgentRouter(
+        [endpoint(agent(), histogram=primed_histogram(1)), endpoint(secondary, breaker=breaker)],
+        hedge_percentile=hedge_percentile, hedge_min_delay=1,
+    )
+
+    list(router.invoke(REQUEST))
+
+    assert secondary.calls == 0
+    assert breaker.state == STATE_OPEN
+    assert breaker.allow()
+
+
+def test_all_circuits_open(clock):
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=30, clock=clock)
+    router = AgentRouter([endpoint(agent(throttle_rate=1), breaker=breaker)])
+
+    with pytest.raises(ClientError):
+        list(router.invoke(REQUEST))
+    with pytest.raises(CircuitOpenError):
+        router.invoke(REQUEST)
+
+
+def test_slow_request_is_hedged():
+    primary, secondary = agent(first_chunk_latency=2), agent()
+    router = AgentRouter(
+        [endpoint(primary, "primary", histogram=primed_histogram(0.05)), endpoint(secondary, "secondary")],
+        hedge_percentile=0.95, hedge_min_delay=0.1,
+    )
+
+    started = time.monotonic()
+    assert "hello" in text_of(router.invoke(REQUEST))
+
+    assert time.monotonic() - started < 1
+    assert (primary.calls, secondary.calls) == (1, 1)
+
+
+def test_fast_request_is_not_hedged():
+    primary, secondary = agent(first_chunk_latency=0.05), agent()
+    router = AgentRouter(
+        [endpoint(primary, histogram=primed_histogram(0.5)), endpoint(secondary)],
+        hedge_percentile=0.95, hedge_min_delay=0.1,
+    )
+
+    list(router.invoke(REQUEST))
+
+    assert secondary.calls == 0
+
+
+def test_hedges_are_capped_by_the_budget():
+    primary, secondary = agent(first_chunk_latency=0.3), agent()
+    router = AgentRouter(
+        [endpoint(primary, histogram=primed_histogram(0.05)), endpoint(secondary)],
+        hedge_percentile=0.95, hedge_min_delay=0.1, hedge_budget=HedgeBudget(ratio=0, burst=0),
+    )
+
+    list(router.invoke(REQUEST))
+
+    assert secondary.calls == 0
+
+
+def test_race_fails_over_on_throttling():
+    primary, secondary = agent(throttle_rate=1), agent()
+    router = AgentRouter(
+        [endpoint(primary, histogram=primed_histogram(0.05)), endpoint(secondary)],
+        hedge_percentile=0.95, hedge_min_delay=0.1,
+    )
+
+    assert "hello" in text_of(router.invoke(REQUEST))
+    assert (primary.calls, secondary.calls) == (1, 1)
+
+
+def test_hedge_error_does_not_abort_the_primary():
+    primary, hedge = agent(first_chunk_latency=0.3), RejectingAgentRuntime()
+    router = AgentRouter(
+        [endpoint(primary, histogram=primed_histogram(0.05)), endpoint(hedge)],
+        hedge_percentile=0.95, hedge_min_delay=0.05,
+    )
+
+    assert "hello" in text_of(router.invoke(REQUEST))
+    assert hedge.calls == 1
+
+
+def test_error_of_the_last_running_attempt_is_raised():
+    router = AgentRouter(
+        [endpoint(RejectingAgentRuntime(), histogram=primed_histogram(0.05)), endpoint(agent())],
+        hedge_percentile=0.95, hedge_min_delay=1,
+    )
+
+    with pytest.raises(ClientError, match="ValidationException"):
+        list(router.invoke(REQUEST))
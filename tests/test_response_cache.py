@@ -0,0 +1,108 @@
+"""Tests of the agent response cache and its use by the agent client."""
+
+import pytest
+from tests.support.fakes import FakeAgentRuntime
+
+from sibyl_telegram_interface.services.bedrock import (
+    Bedrock,
+    InMemoryResponseCacheBackend,
+    ResponseCache,
+    ResponseCacheBackend,
+)
+from sibyl_telegram_interface.services.resilience import AgentEndpoint, AgentRouter
+from sibyl_telegram_interface.services.sessions import InMemorySessionStore, SessionManager
+
+TTL = 60
+
+
+class DictBackend(ResponseCacheBackend):
+    """Shared tier that keeps entries in a dict and ignores the TTL."""
+
+    def __init__(self):
+        self.entries = {}
+
+    def get(self, key):
+        return self.entries.get(key)
+
+    def set(self, key, entry, ttl):
+        self.entries[key] = entry
+
+
+@pytest.fixture
+def cache(clock):
+    return ResponseCache(ttl=TTL, local=InMemoryResponseCacheBackend(clock=clock))
+
+
+@pytest.fixture
+def agent():
+    return FakeAgentRuntime(first_chunk_latency=0, chunk_interval=0, chunks=1)
+
+
+@pytest.fixture
+def bedrock(agent, cache, clock):
+    endpoint = AgentEndpoint("us-east-1", "agent", "alias", client_factory=lambda region: agent)
+    sessions = SessionManager(InMemorySessionStore(), idle_seconds=0, max_turns=0, clock=clock)
+    return Bedrock(router=AgentRouter([endpoint]), response_cache=cache, sessions=sessions)
+
+
+def test_hit_ignores_whitespace_and_case(cache):
+    cache.put("7-1", 0, "What are your  hours?", "Nine to five", latency=2.0)
+
+    assert cache.get("7-1", 0, " what are your hours? ") == "Nine to five"
+    assert cache.stats() == {"hits": 1, "misses": 0, "hit_rate": 1.0, "saved_seconds": 2.0}
+
+
+def test_other_session_or_turn_misses(cache):
+    cache.put("7-1", 0, "yes", "Booked", latency=2.0)
+
+    assert cache.get("7-2", 0, "yes") is None
+    assert cache.get("7-1", 1, "yes") is None
+    assert cache.stats()["misses"] == 2
+
+
+def test_entries_expire_after_the_ttl(cache, clock):
+    cache.put("7-1", 0, "hello", "Hi", latency=1.0)
+
+    clock.advance(TTL - 1)
+    assert cache.get("7-1", 0, "hello") == "Hi"
+    clock.advance(1)
+    assert cache.get("7-1", 0, "hello") is None
+
+
+def test_shared_hit_is_copied_to_the_local_tier(clock):
+    shared = DictBackend()
+    ResponseCache(ttl=TTL, shared=shared).put("7-1", 0, "hello", "Hi", latency=1.0)
+    local = InMemoryResponseCacheBackend(clock=clock)
+    cache = ResponseCache(ttl=TTL, local=local, shared=shared)
+
+    assert cache.get("7-1", 0, "hello") == "Hi"
+
+    shared.entries.clear()
+    assert cache.get("7-1", 0, "hello") == "Hi"
+    assert local.get(ResponseCache.key("7-1", 0, "hello")) == {"text": "Hi", "latency": 1.0}
+
+
+def test_repeated_follow_up_is_answered_by_the_agent(bedrock, agent):
+    bedrock.invoke_agent("7", "continue", chat_id=7)
+    bedrock.invoke_agent("7", "continue", chat_id=7)
+
+    assert agent.calls == 2
+
+
+def test_turn_is_served_from_cache_when_it_is_retried(bedrock, agent, cache):
+    answer = bedrock.invoke_agent("7", "hello", chat_id=7)
+    # A retry after the session store write failed sees the earlier turn count
+    bedrock.sessions.acquire("7", 7).turns -= 1
+
+    assert bedrock.invoke_agent("7", "hello", chat_id=7) == answer
+    assert agent.calls == 1
+    assert cache.stats()["hits"] == 1
+
+
+def test_cache_can_be_bypassed(bedrock, agent):
+    bedrock.invoke_agent("7", "hello", chat_id=7)
+    bedrock.sessions.acquire("7", 7).turns -= 1
+
+    bedrock.invoke_agent("7", "hello", use_cache=False, chat_id=7)
+
+    assert agent.calls == 2
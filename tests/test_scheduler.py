@@ -0,0 +1,144 @@
+"""Tests of send pacing and 429 handling with a fake clock and a rate-limiting Bot API stub."""
+
+import threading
+
+import pytest
+
+from sibyl_telegram_interface.config import settings
+from sibyl_telegram_interface.telegram import bot as bot_module
+from sibyl_telegram_interface.telegram.bot import TelegramBot
+from sibyl_telegram_interface.telegram.scheduler import SendQueueTimeout, SendScheduler, TokenBucket
+
+BOT_TOKEN = "123456:scheduler"
+
+
+class ClockCondition(threading.Condition):
+    """Condition whose waits advance the fake clock instead of sleeping."""
+
+    def __init__(self, clock):
+        super().__init__()
+        self.clock = clock
+        self.waited = 0.0
+
+    def wait(self, timeout=None):
+        self.clock.advance(timeout)
+        self.waited += timeout
+        return False
+
+
+@pytest.fixture
+def scheduler(clock):
+    scheduler = SendScheduler(global_rate=30, global_burst=30, chat_rate=1, chat_burst=3, clock=clock)
+    scheduler._cond = ClockCondition(clock)
+    return scheduler
+
+
+@pytest.fixture
+def bot(telegram, scheduler, monkeypatch):
+    sleeps = []
+    monkeypatch.setattr(bot_module.time, "sleep", sleeps.append)
+    bot = TelegramBot(BOT_TOKEN, scheduler=scheduler)
+    bot.sleeps = sleeps
+    yield bot
+    telegram.rate_limit(0, 0)
+    telegram.bad_gateway(0)
+
+
+def test_bucket_allows_burst_then_refills(clock):
+    bucket = TokenBucket(rate=2, capacity=3, now=clock())
+    for _ in range(3):
+        assert bucket.wait_time(clock()) == 0
+        bucket.take(clock())
+
+    assert bucket.wait_time(clock()) == pytest.approx(0.5)
+    clock.advance(0.5)
+    assert bucket.wait_time(clock()) == 0
+
+
+def test_chat_burst_then_one_per_second(scheduler, clock):
+    for _ in range(3):
+        assert scheduler.acquire(1) == 0
+
+    with pytest.raises(SendQueueTimeout):
+        scheduler.acquire(1, timeout=0.5)
+    assert scheduler.acquire(1) == pytest.approx(1.0)
+    assert scheduler.acquire(2) == 0
+
+
+def test_global_limit_spans_chats(scheduler, clock):
+    for chat_id in range(30):
+        assert scheduler.acquire(chat_id) == 0
+
+    assert scheduler.acquire(30) == pytest.approx(1 / 30)
+    assert scheduler.stats()["sent"] == 31
+
+
+def test_penalize_chat_blocks_only_that_chat(scheduler, clock):
+    scheduler.penalize(1, 5)
+
+    assert scheduler.acquire(2) == 0
+    with pytest.raises(SendQueueTimeout):
+        scheduler.acquire(1, timeout=4)
+    assert scheduler.acquire(1) == pytest.approx(5)
+
+
+def test_penalize_without_chat_blocks_all_chats(scheduler, clock):
+    scheduler.penalize(None, 2)
+
+    assert scheduler.acquire(1) == pytest.approx(2)
+    scheduler.penalize(None, 2)
+    with pytest.raises(SendQueueTimeout):
+        scheduler.acquire(2, timeout=1)
+
+
+def test_429_waits_retry_after_in_scheduler(bot, telegram, scheduler):
+    telegram.rate_limit(1, 3)
+    sent = telegram.calls.get("sendMessage", 0)
+
+    response = bot.send_message(7, "hello")
+
+    assert response["ok"]
+    assert telegram.calls["sendMessage"] - sent == 2
+    assert scheduler._cond.waited == pytest.approx(3)
+    assert bot.sleeps == []
+
+
+def test_long_retry_after_is_returned_and_penalizes_the_chat(bot, telegram, scheduler):
+    telegram.rate_limit(1, 30)
+    sent = telegram.calls.get("sendMessage", 0)
+
+    response = bot.send_message(8, "hello")
+
+    assert response["error_code"] == 429
+    assert telegram.calls["sendMessage"] - sent == 1
+    assert scheduler._cond.waited == 0
+    with pytest.raises(SendQueueTimeout):
+        scheduler.acquire(8, timeout=settings.TELEGRAM_MAX_RETRY_WAIT)
+    assert scheduler.acquire(8) == pytest.approx(30)
+
+
+def test_429_after_last_retry_is_returned(bot, telegram):
+    telegram.rate_limit(bot.max_retries + 1, 1)
+    sent = telegram.calls.get("sendMessage", 0)
+
+    response = bot.send_message(9, "hello")
+
+    assert response["error_code"] == 429
+    assert telegram.calls["sendMessage"] - sent == bot.max_retries + 1
+
+
+def test_429_without_chat_sleeps_retry_after(bot, telegram):
+    telegram.rate_limit(1, 2)
+
+    assert bot.delete_webhook()["ok"]
+    assert bot.sleeps == [2]
+
+
+def test_html_error_page_is_returned_as_an_error(bot, telegram):
+    telegram.bad_gateway(bot.max_retries + 1)
+    sent = telegram.calls.get("sendMessage", 0)
+
+    response = bot.send_message(10, "hello")
+
+    assert response == {"ok": False, "error_code": 502, "description": "Non-JSON response with HTTP status 502"}
+    assert telegram.calls["sendMessage"] - sent == bot.max_retries + 1
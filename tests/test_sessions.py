@@ -0,0 +1,150 @@
+"""Tests of agent session management against a stubbed bedrock-agent-runtime client."""
+
+import boto3
+import pytest
+from moto import mock_aws
+from tests.support.fakes import FakeAgentRuntime
+
+from sibyl_telegram_interface.services.bedrock import Bedrock
+from sibyl_telegram_interface.services.resilience import AgentEndpoint, AgentRouter
+from sibyl_telegram_interface.services.sessions import (
+    DynamoDBSessionStore,
+    InMemorySessionStore,
+    SessionManager,
+    session_key,
+)
+
+TABLE = "sessions"
+
+
+@pytest.fixture
+def agent():
+    return FakeAgentRuntime(first_chunk_latency=0, chunk_interval=0, chunks=2)
+
+
+@pytest.fixture
+def sessions(clock):
+    return SessionManager(InMemorySessionStore(), idle_seconds=1800, max_turns=3, clock=clock)
+
+
+@pytest.fixture
+def bedrock(agent, sessions):
+    endpoint = AgentEndpoint("us-east-1", "agent", "alias", client_factory=lambda region: agent)
+    return Bedrock(router=AgentRouter([endpoint]), sessions=sessions)
+
+
+@pytest.fixture
+def dynamodb():
+    with mock_aws():
+        client = boto3.client("dynamodb", region_name="us-east-1")
+        client.create_table(
+            TableName=TABLE,
+            KeySchema=[{"AttributeName": "session_key", "KeyType": "HASH"}],
+            AttributeDefinitions=[{"AttributeName": "session_key", "AttributeType": "S"}],
+            BillingMode="PAY_PER_REQUEST",
+        )
+        yield client
+
+
+def session_ids(agent):
+    return [request["sessionId"] for request in agent.requests]
+
+
+def test_session_key_separates_groups():
+    assert session_key(7, 7) == session_key(7) == "7"
+    assert session_key(7, -100) == "-100:7"
+
+
+def test_turns_share_a_session(bedrock, agent):
+    assert bedrock.invoke_agent("7", "hello", chat_id=7)
+    bedrock.invoke_agent("7", "and then?", chat_id=7)
+
+    first, second = session_ids(agent)
+    assert first == second
+    assert all(request["agentId"] == "agent" for request in agent.requests)
+
+
+def test_attributes_sent_only_when_they_change(bedrock, agent):
+    bedrock.invoke_agent("7", "hello", chat_id=7)
+    bedrock.invoke_agent("7", "and then?", chat_id=7)
+
+    assert agent.requests[0]["sessionState"] == {"sessionAttributes": {"user_id": "7"}}
+    assert "sessionState" not in agent.requests[1]
+
+
+def test_rotates_after_max_turns(bedrock, agent, sessions):
+    for _ in range(4):
+        bedrock.invoke_agent("7", "hello", chat_id=7)
+
+    ids = session_ids(agent)
+    assert ids[0] == ids[1] == ids[2] != ids[3]
+    assert "sessionState" in agent.requests[3]
+    assert sessions.stats()["rotations_turns"] == 1
+
+
+def test_rotates_after_idle_time(bedrock, agent, sessions, clock):
+    bedrock.invoke_agent("7", "hello", chat_id=7)
+    clock.advance(1799)
+    bedrock.invoke_agent("7", "still there?", chat_id=7)
+    clock.advance(1800)
+    bedrock.invoke_agent("7", "back again", chat_id=7)
+
+    ids = session_ids(agent)
+    assert ids[0] == ids[1] != ids[2]
+    assert sessions.stats()["rotations_idle"] == 1
+
+
+def test_reset_starts_a_new_session(bedrock, agent, sessions):
+    bedrock.invoke_agent("7", "hello", chat_id=7)
+    bedrock.reset_session("7", chat_id=7)
+    bedrock.invoke_agent("7", "hello again", chat_id=7)
+
+    first, second = session_ids(agent)
+    assert first != second
+    assert "sessionState" in agent.requests[1]
+    assert sessions.stats()["resets"] == 1
+
+
+def test_chats_get_separate_sessions(bedrock, agent):
+    bedrock.invoke_agent("7", "hello", chat_id=7)
+    bedrock.invoke_agent("7", "hello", chat_id=-100)
+
+    first, second = session_ids(agent)
+    assert first != second
+
+
+def test_records_turns_and_latency(bedrock, sessions):
+    bedrock.invoke_agent("7", "hello", chat_id=7)
+    bedrock.invoke_agent("7", "and then?", chat_id=7)
+
+    session = sessions.acquire("7", 7)
+    assert session.turns == 2
+    assert session.latency_total >= session.latency_max >= 0
+    stats = sessions.stats()
+    assert stats["turns"] == 2
+    assert stats["sessions_started"] == 1
+    assert stats["turns_per_session"] == 2
+
+
+def test_dynamodb_sessions_are_shared(dynamodb, agent, clock):
+    def container():
+        sessions = SessionManager(DynamoDBSessionStore(TABLE, client=dynamodb), clock=clock)
+        endpoint = AgentEndpoint("us-east-1", "agent", "alias", client_factory=lambda region: agent)
+        return Bedrock(router=AgentRouter([endpoint]), sessions=sessions)
+
+    container().invoke_agent("7", "hello", chat_id=7)
+    other = container()
+    other.invoke_agent("7", "and then?", chat_id=7)
+
+    first, second = session_ids(agent)
+    assert first == second
+    assert "sessionState" not in agent.requests[1]
+    other.reset_session("7", chat_id=7)
+    assert dynamodb.scan(TableName=TABLE)["Count"] == 0
+
+
+def test_repeated_prompt_reaches_the_agent(bedrock, agent):
+    bedrock.invoke_agent("7", "yes", chat_id=7)
+    bedrock.invoke_agent("7", "yes", chat_id=7)
+
+    assert agent.calls == 2
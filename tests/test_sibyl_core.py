@@ -0,0 +1,164 @@
+"""User lookup cache of SibylCoreService against a fake DefaultApi."""
+
+import threading
+
+import pytest
+
+from tests.support.fakes import install_fake_sibyl_core_sdk
+
+install_fake_sibyl_core_sdk()
+
+from sibyl_telegram_interface.config import settings  # noqa: E402
+from sibyl_telegram_interface.services.sibyl_core import SibylCoreService  # noqa: E402
+from sibyl_telegram_interface.utils.cache import LRUCache  # noqa: E402
+
+
+class ApiError(Exception):
+    """Error the generated SDK raises, with the HTTP status."""
+
+    def __init__(self, status):
+        super().__init__(f"HTTP {status}")
+        self.status = status
+
+
+class FakeDefaultApi:
+    """DefaultApi keeping users in memory and counting lookups."""
+
+    def __init__(self):
+        self.users = {}
+        self.lookups = 0
+        self.error = None
+        self.started = threading.Event()
+        self.release = threading.Event()
+        self.release.set()
+
+    def users_telegram_telegram_id_get(self, telegram_id, **kwargs):
+        self.lookups += 1
+        self.started.set()
+        self.release.wait(5)
+        if self.error is not None:
+            raise self.error
+        for user in self.users.values():
+            if str(user["telegram_id"]) == telegram_id:
+                return user
+        raise ApiError(404)
+
+    def users_post(self, users_post_request, **kwargs):
+        user = {
+            "id": f"user-{len(self.users) + 1}",
+            "telegram_id": users_post_request.telegram_id,
+            "name": users_post_request.name,
+        }
+        self.users[user["id"]] = user
+        return user
+
+    def users_id_put(self, id, users_post_request, **kwargs):
+        user = {"id": id, "telegram_id": users_post_request.telegram_id, "name": users_post_request.name}
+        self.users[id] = user
+        return user
+
+    def users_id_delete(self, id, **kwargs):
+        del self.users[id]
+
+
+@pytest.fixture
+def api():
+    return FakeDefaultApi()
+
+
+@pytest.fixture
+def service(api, clock):
+    cache = LRUCache(maxsize=100, ttl=settings.USER_CACHE_TTL, clock=clock)
+    return SibylCoreService(api=api, user_cache=cache)
+
+
+def test_repeated_lookup_is_served_from_cache(service, api):
+    api.users["user-1"] = {"id": "user-1", "telegram_id": 42, "name": "Ada"}
+
+    assert service.get_user_by_telegram_id(42)["id"] == "user-1"
+    assert service.get_user_by_telegram_id(42)["id"] == "user-1"
+
+    assert api.lookups == 1
+    assert service.user_cache.stats()["hits"] == 1
+
+
+def test_lookup_is_repeated_after_ttl(service, api, clock):
+    api.users["user-1"] = {"id": "user-1", "telegram_id": 42, "name": "Ada"}
+    service.get_user_by_telegram_id(42)
+
+    clock.advance(settings.USER_CACHE_TTL + 1)
+    service.get_user_by_telegram_id(42)
+
+    assert api.lookups == 2
+
+
+def test_not_found_is_cached_for_the_negative_ttl(service, api, clock):
+    assert service.get_user_by_telegram_id(42) is None
+    assert service.get_user_by_telegram_id(42) is None
+    assert api.lookups == 1
+
+    clock.advance(settings.USER_CACHE_NEGATIVE_TTL + 1)
+    assert service.get_user_by_telegram_id(42) is None
+    assert api.lookups == 2
+
+
+def test_other_errors_are_not_cached(service, api):
+    api.error = ApiError(500)
+
+    assert service.get_user_by_telegram_id(42) is None
+    assert service.get_user_by_telegram_id(42) is None
+
+    assert api.lookups == 2
+
+
+def test_create_user_writes_through(service, api):
+    assert service.get_user_by_telegram_id(42) is None
+
+    created = service.create_user(telegram_id=42, name="Ada")
+
+    assert service.get_user_by_telegram_id(42) == created
+    assert api.lookups == 1
+
+
+def test_update_user_forgets_the_old_telegram_id(service, api):
+    user = service.create_user(telegram_id=42, name="Ada")
+
+    service.update_user(user["id"], telegram_id=43, name="Ada")
+
+    assert service.get_user_by_telegram_id(43)["id"] == user["id"]
+    assert service.get_user_by_telegram_id(42) is None
+    assert api.lookups == 1
+
+
+def test_delete_user_forgets_cached_lookups(service, api):
+    user = service.create_user(telegram_id=42, name="Ada")
+
+    assert service.delete_user(user["id"])
+
+    assert service.get_user_by_telegram_id(42) is None
+    assert api.lookups == 1
+
+
+def test_concurrent_lookups_share_one_call(service, api):
+    api.users["user-1"] = {"id": "user-1", "telegram_id": 42, "name": "Ada"}
+    api.release.clear()
+    results = []
+
+    def lookup():
+        results.append(service.get_user_by_telegram_id(42))
+
+    leader = threading.Thread(target=lookup)
+    leader.start()
+    assert api.started.wait(5)
+    followers = [threading.Thread(target=lookup) for _ in range(4)]
+    for thread in followers:
+        thread.start()
+    # Followers join the lookup in flight before it returns
+    while service._lookups.shared < len(followers):
+        threading.Event().wait(0.001)
+    api.release.set()
+    for thread in [leader] + followers:
+        thread.join()
+
+    assert api.lookups == 1
+    assert [user["id"] for user in results] == ["user-1"] * 5
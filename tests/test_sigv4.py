@@ -0,0 +1,83 @@
+"""SigV4 signing across credential rotation."""
+
+from botocore.auth import SigV4Auth
+from botocore.awsrequest import AWSRequest
+from botocore.credentials import ReadOnlyCredentials
+
+from sibyl_telegram_interface.utils.sigv4 import CachingSigV4Auth, RequestSigner
+
+URL = "https://api.example.com/prod/users/telegram/42"
+
+
+class RotatingCredentials:
+    """Refreshable credentials whose keys change when a test rotates them."""
+
+    def __init__(self):
+        self.generation = 1
+
+    def rotate(self):
+        self.generation += 1
+
+    def get_frozen_credentials(self):
+        return ReadOnlyCredentials(
+            f"AKID{self.generation}", f"secret-{self.generation}", f"token-{self.generation}"
+        )
+
+
+class FakeSession:
+    def __init__(self, credentials):
+        self.credentials = credentials
+
+    def get_credentials(self):
+        return self.credentials
+
+
+def request():
+    return AWSRequest(method="GET", url=URL, headers={})
+
+
+def signed_with(signed):
+    """Get the access key and session token a request was signed with."""
+    authorization = signed.headers["Authorization"]
+    access_key = authorization.split("Credential=", 1)[1].split("/", 1)[0]
+    return access_key, signed.headers["X-Amz-Security-Token"]
+
+
+def test_signs_with_rotated_credentials():
+    credentials = RotatingCredentials()
+    signer = RequestSigner("execute-api", "us-east-1", session=FakeSession(credentials))
+
+    first = request()
+    signer.sign(first)
+    credentials.rotate()
+    second = request()
+    signer.sign(second)
+
+    assert signed_with(first) == ("AKID1", "token-1")
+    assert signed_with(second) == ("AKID2", "token-2")
+    assert signer.stats()["rotations"] == 1
+    assert signer.stats()["sign_count"] == 2
+
+
+def test_reuses_signer_within_a_generation():
+    signer = RequestSigner("execute-api", "us-east-1", session=FakeSession(RotatingCredentials()))
+
+    signer.sign(request())
+    auth = signer._auth
+    signer.sign(request())
+
+    assert signer._auth is auth
+    assert signer.stats()["rotations"] == 0
+
+
+def test_cached_signing_key_matches_botocore():
+    credentials = ReadOnlyCredentials("AKID", "secret", None)
+    cached = CachingSigV4Auth(credentials, "execute-api", "eu-west-1")
+    reference = SigV4Auth(credentials, "execute-api", "eu-west-1")
+
+    for timestamp in ("20260101T000000Z", "20260101T235959Z", "20260102T000000Z"):
+        signed = request()
+        signed.context["timestamp"] = timestamp
+        string_to_sign = f"AWS4-HMAC-SHA256\n{timestamp}\nscope\nhash"
+        assert cached.signature(string_to_sign, signed) == reference.signature(string_to_sign, signed)
+    assert cached._signing_key[0] == "20260102"
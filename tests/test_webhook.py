@@ -0,0 +1,50 @@
+"""Tests of webhook request validation."""
+
+import json
+
+import pytest
+from tests.support.fakes import FakeSQS, FakeSSM
+from tests.support.workload import BOT_TOKEN, TELEGRAM_IP, synthetic_trace
+
+from sibyl_telegram_interface.config import settings
+from sibyl_telegram_interface.handlers.admission import AdmissionController
+from sibyl_telegram_interface.handlers.lambda_handler import handle_webhook
+from sibyl_telegram_interface.services.queue import UpdateQueue
+from sibyl_telegram_interface.utils import ssm
+
+QUEUE_URL = "https://sqs.us-east-1.amazonaws.com/000000000000/queue"
+PROXY_IP = "10.0.0.7"
+
+
+@pytest.fixture
+def deliver(telegram, monkeypatch):
+    """Send an update to the webhook from the given peer and headers."""
+    monkeypatch.setattr(ssm, "_CLIENT", FakeSSM({settings.BOT_TOKEN_PARAM_PATH: BOT_TOKEN}))
+    monkeypatch.setattr(settings, "TRUSTED_PROXY_HOPS", 1)
+    queue = UpdateQueue(QUEUE_URL, FakeSQS())
+    controller = AdmissionController(None, enabled=False)
+
+    def deliver(source_ip=None, forwarded_for=None):
+        headers = {"x-forwarded-port": "443"}
+        if forwarded_for:
+            headers["x-forwarded-for"] = forwarded_for
+        event = {
+            "headers": headers,
+            "requestContext": {"http": {"sourceIp": source_ip}},
+            "body": json.dumps(next(synthetic_trace(1, chats=1))),
+        }
+        return handle_webhook(event, queue, controller)["statusCode"]
+
+    return deliver
+
+
+def test_source_ip_is_not_stripped_of_proxy_hops(deliver):
+    assert deliver(source_ip=TELEGRAM_IP) == 200
+    assert deliver(source_ip=PROXY_IP) == 403
+
+
+def test_forwarded_for_skips_trusted_proxy_hops(deliver):
+    assert deliver(forwarded_for=f"{TELEGRAM_IP}, {PROXY_IP}") == 200
+    assert deliver(forwarded_for=f"{PROXY_IP}, {TELEGRAM_IP}") == 403
+    # With one trusted proxy, a lone entry is client-supplied
+    assert deliver(forwarded_for=TELEGRAM_IP) == 403